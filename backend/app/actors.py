@@ -0,0 +1,130 @@
+"""
+Per-table actors.
+
+Every command for a table (client messages, disconnects) runs on that table's actor,
+one at a time in arrival order, so handlers for the same table never interleave at an
+await even when many sockets hit it at once.
+
+Handlers only mark the table dirty. A FlushTicker broadcasts each dirty table once per
+flush window, so all the changes made within a window (a betting round closing, a
+reconnect storm) go out as one frame at the latest version. Private frames that must
+follow the state they belong to (a joiner's snapshot, HOLE_CARDS) are queued with
+after_flush() and sent right after that broadcast. Without a ticker, the actor flushes
+after each drained batch instead.
+
+The consumer task only exists while there is work: an idle table costs an empty deque.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+# commands run per batch before the actor yields to the loop
+MAX_BATCH = 64
+# default flush window; mutations within it are broadcast together
+FLUSH_MS = 20.0
+
+Command = Callable[[], Awaitable[None]]
+
+log = logging.getLogger(__name__)
+
+# process-wide counters, exposed by the stats endpoint
+ACTOR_STATS: Dict[str, int] = {"commands": 0, "batches": 0, "flushes": 0, "failed": 0}
+
+
+class TableActor:
+    def __init__(self, table_id: str, flush: Callable[[str], None], ticker: Optional["FlushTicker"] = None):
+        """flush(tableId) broadcasts the table's current state to its subscribers."""
+        self.table_id = table_id
+        self.flush = flush
+        self.ticker = ticker
+        self.inbox: Deque[Command] = deque()
+        self.dirty = False
+        self._after: list[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self.inbox)
+
+    def submit(self, command: Command):
+        self.inbox.append(command)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def mark_dirty(self):
+        self.dirty = True
+        if self.ticker is not None:
+            self.ticker.schedule(self)
+
+    def after_flush(self, callback: Callable[[], None]):
+        """Run callback right after the next broadcast of this table."""
+        self._after.append(callback)
+        if self.ticker is not None:
+            self.ticker.schedule(self)
+
+    def flush_now(self):
+        """Broadcast pending changes now, then run the after_flush callbacks."""
+        if self.dirty:
+            self.dirty = False
+            ACTOR_STATS["flushes"] += 1
+            self.flush(self.table_id)
+        if self._after:
+            callbacks, self._after = self._after, []
+            for callback in callbacks:
+                callback()
+
+    async def _run(self):
+        try:
+            while self.inbox:
+                for _ in range(min(len(self.inbox), MAX_BATCH)):
+                    command = self.inbox.popleft()
+                    ACTOR_STATS["commands"] += 1
+                    try:
+                        await command()
+                    except Exception:
+                        ACTOR_STATS["failed"] += 1
+                        log.exception("table %s: command failed", self.table_id)
+                ACTOR_STATS["batches"] += 1
+                if self.ticker is None:
+                    self.flush_now()
+                else:
+                    # let other tables' actors and the ticker run
+                    await asyncio.sleep(0)
+        finally:
+            self._task = None
+
+
+class FlushTicker:
+    """
+    One timer for all tables: the first table marked after a tick arms it, and when it
+    fires every table marked since is flushed. Nothing is armed while all tables are idle.
+    """
+
+    def __init__(self, window_ms: float = FLUSH_MS):
+        self.window_ms = window_ms
+        self._due: Dict[str, TableActor] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def schedule(self, actor: TableActor):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_ms / 1000.0, self.tick)
+        self._due[actor.table_id] = actor
+
+    def tick(self):
+        self._timer = None
+        due, self._due = self._due, {}
+        for actor in due.values():
+            try:
+                actor.flush_now()
+            except Exception:
+                log.exception("table %s: flush failed", actor.table_id)
+
+    def close(self):
+        """Flush whatever is pending now (shutdown)."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self.tick()
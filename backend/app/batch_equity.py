@@ -0,0 +1,132 @@
+"""
+Vectorized equity for many heroes (and many tables) in one pass.
+
+Each job is one hero: 2 int hole cards, 0-5 int board cards, number of opponents.
+Jobs with the same board length share a single numpy pass per chunk of trials:
+
+  * random keys (jobs, trials, 52), known cards pushed to the end
+  * the `draw` smallest keys per trial are that trial's runout + opponent hands
+  * every hero and opponent 7-card hand goes through evaluate_batch at once
+
+Jobs with fewer opponents than the widest job in the group just mask the extra
+opponent slots. Spots small enough to enumerate exactly use equity.estimate_equity.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .equity import DEFAULT_SIMULATIONS, estimate_equity, odds_payload, outcome_count
+from .evaluator import HAND_NAMES, evaluate_batch
+
+# trials per vectorized pass; the time budget is checked between passes
+CHUNK = 512
+
+_N_CATEGORIES = len(HAND_NAMES)
+
+
+@dataclass
+class EquityJob:
+    hero: Sequence[int]
+    board: Sequence[int]
+    n_opponents: int
+
+
+def _run_group(
+    jobs: list[EquityJob],
+    simulations: int,
+    deadline: Optional[float],
+    rng: np.random.Generator,
+) -> list[Dict[str, Any]]:
+    g = len(jobs)
+    board_len = len(jobs[0].board)
+    needed = 5 - board_len
+    opps = np.array([max(1, j.n_opponents) for j in jobs])
+    max_opp = int(opps.max())
+    draw = needed + 2 * max_opp
+
+    hero = np.array([list(j.hero) for j in jobs], dtype=np.intp)  # (g, 2)
+    board = np.array([list(j.board) for j in jobs], dtype=np.intp).reshape(g, board_len)
+    known = np.zeros((g, 52), dtype=bool)
+    np.put_along_axis(known, hero, True, axis=1)
+    if board_len:
+        np.put_along_axis(known, board, True, axis=1)
+    # opponent slots beyond a job's own n_opponents never win
+    absent = np.arange(max_opp)[None, :] >= opps[:, None]  # (g, max_opp)
+
+    wins = np.zeros(g, dtype=np.int64)
+    ties = np.zeros(g, dtype=np.int64)
+    losses = np.zeros(g, dtype=np.int64)
+    hands = np.zeros((g, _N_CATEGORIES), dtype=np.int64)
+    win_hands = np.zeros((g, _N_CATEGORIES), dtype=np.int64)
+    row = np.arange(g)[:, None]
+
+    done = 0
+    while done < simulations:
+        if done and deadline is not None and time.perf_counter() > deadline:
+            break
+        n = min(CHUNK, simulations - done)
+
+        keys = rng.random((g, n, 52), dtype=np.float32)
+        keys[np.broadcast_to(known[:, None, :], keys.shape)] = 2.0
+        picked = np.argpartition(keys, draw, axis=2)[:, :, :draw]
+        # argpartition leaves the picked cards in index order; re-order them by key
+        order = np.argsort(np.take_along_axis(keys, picked, axis=2), axis=2)
+        picked = np.take_along_axis(picked, order, axis=2)
+
+        full_board = np.concatenate([np.broadcast_to(board[:, None, :], (g, n, board_len)), picked[:, :, :needed]], axis=2)
+        hero_hands = np.concatenate([full_board, np.broadcast_to(hero[:, None, :], (g, n, 2))], axis=2)
+        opp_hole = picked[:, :, needed:].reshape(g, n, max_opp, 2)
+        opp_hands = np.concatenate(
+            [np.broadcast_to(full_board[:, :, None, :], (g, n, max_opp, 5)), opp_hole], axis=3
+        )
+
+        hero_scores = evaluate_batch(hero_hands.reshape(-1, 7)).reshape(g, n)
+        opp_scores = evaluate_batch(opp_hands.reshape(-1, 7)).reshape(g, n, max_opp)
+        opp_scores[np.broadcast_to(absent[:, None, :], opp_scores.shape)] = -1
+        best_opp = opp_scores.max(axis=2)
+
+        won = hero_scores > best_opp
+        tied = hero_scores == best_opp
+        wins += won.sum(axis=1)
+        ties += tied.sum(axis=1)
+        losses += n - won.sum(axis=1) - tied.sum(axis=1)
+
+        category = hero_scores >> 20
+        np.add.at(hands, (np.broadcast_to(row, category.shape), category), 1)
+        np.add.at(win_hands, (np.broadcast_to(row, category.shape)[won], category[won]), 1)
+        done += n
+
+    return [
+        odds_payload(int(wins[i]), int(ties[i]), int(losses[i]), hands[i].tolist(), win_hands[i].tolist())
+        for i in range(g)
+    ]
+
+
+def batch_equity(
+    jobs: Sequence[EquityJob],
+    simulations: int = DEFAULT_SIMULATIONS,
+    time_budget_ms: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> list[Dict[str, Any]]:
+    """Equity for every job, in job order. Same payload shape as estimate_equity."""
+    deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000.0
+    rng = np.random.default_rng(seed)
+    results: list[Optional[Dict[str, Any]]] = [None] * len(jobs)
+
+    groups: Dict[int, list[int]] = {}
+    for i, job in enumerate(jobs):
+        n_unknown = 52 - 2 - len(job.board)
+        if outcome_count(n_unknown, 5 - len(job.board), max(1, job.n_opponents)) <= simulations:
+            results[i] = estimate_equity(job.hero, job.board, job.n_opponents, simulations)
+        else:
+            groups.setdefault(len(job.board), []).append(i)
+
+    for indexes in groups.values():
+        for i, payload in zip(indexes, _run_group([jobs[i] for i in indexes], simulations, deadline, rng)):
+            results[i] = payload
+    return results  # type: ignore[return-value]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+# Card encoding ----------------------------
+#
+# Cards are small ints 0..51: card = rank * 4 + suit
+# rank 0..12 = '2'..'A', suit 0..3 = 'h', 'd', 'c', 's' (same order as create_deck).
+
+RANKS = "23456789TJQKA"
+SUITS = "hdcs"
+
+CARD_STRS: list[str] = [f"{r}{s}" for r in RANKS for s in SUITS]
+CARD_INTS: dict[str, int] = {code: i for i, code in enumerate(CARD_STRS)}
+# accept upper-case suits too ("AS" in the protocol examples)
+CARD_INTS.update({code[0] + code[1].upper(): i for code, i in list(CARD_INTS.items())})
+
+
+def card_to_int(code: str) -> int:
+    """'Ah' -> int. Raises KeyError on unknown codes."""
+    return CARD_INTS[code]
+
+
+def int_to_card(card: int) -> str:
+    return CARD_STRS[card]
+
+
+def cards_to_ints(codes: Iterable[str]) -> list[int]:
+    return [CARD_INTS[c] for c in codes]
+
+
+def ints_to_cards(cards: Iterable[int]) -> list[str]:
+    return [CARD_STRS[c] for c in cards]
+
+
+def card_rank(card: int) -> int:
+    return card >> 2
+
+
+def card_suit(card: int) -> int:
+    return card & 3
@@ -0,0 +1,115 @@
+"""
+Shuffled decks.
+
+Decks are lists of card ints (cards.py). They are shuffled with Fisher-Yates driven by
+os.urandom: entropy is read ENTROPY_BYTES at a time and consumed as 16-bit draws, with
+rejection so every ordering is equally likely. random.shuffle's Mersenne Twister is
+predictable from its output and has far fewer states than there are deck orderings.
+
+DeckPool keeps up to `size` decks shuffled ahead of time and a task tops it up whenever
+take() leaves it below half full, so starting a hand only pops a deck. If the pool runs
+dry, take() shuffles one inline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import deque
+from typing import Deque, Optional
+
+ENTROPY_BYTES = 8192
+POOL_SIZE = 256
+# decks shuffled per refill step before yielding to the loop
+REFILL_BATCH = 32
+
+DECK_SIZE = 52
+# draws at or above LIMITS[bound] are rejected so `draw % bound` is uniform
+LIMITS = [0] + [65536 - 65536 % bound for bound in range(1, DECK_SIZE + 1)]
+
+
+class Entropy:
+    """os.urandom read in bulk, handed out as 16-bit words."""
+
+    def __init__(self, chunk: int = ENTROPY_BYTES):
+        self.chunk = chunk
+        self._words = memoryview(b"").cast("H")
+        self._pos = 0
+
+    def shuffle(self, deck: list[int]) -> list[int]:
+        """Fisher-Yates, in place."""
+        words, pos, limits = self._words, self._pos, LIMITS
+        for i in range(len(deck) - 1, 0, -1):
+            bound = i + 1
+            while True:
+                if pos == len(words):
+                    words = self._words = memoryview(os.urandom(self.chunk)).cast("H")
+                    pos = 0
+                w = words[pos]
+                pos += 1
+                if w < limits[bound]:
+                    break
+            j = w % bound
+            deck[i], deck[j] = deck[j], deck[i]
+        self._pos = pos
+        return deck
+
+
+ENTROPY = Entropy()
+
+
+def new_deck() -> list[int]:
+    """A freshly shuffled deck."""
+    return ENTROPY.shuffle(list(range(DECK_SIZE)))
+
+
+class DeckPool:
+    def __init__(self, size: int = POOL_SIZE, entropy: Optional[Entropy] = None):
+        self.size = size
+        self.entropy = entropy or ENTROPY
+        self._decks: Deque[list[int]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"taken": 0, "misses": 0, "shuffled": 0}
+
+    def __len__(self) -> int:
+        return len(self._decks)
+
+    def _shuffle(self) -> list[int]:
+        self.stats["shuffled"] += 1
+        return self.entropy.shuffle(list(range(DECK_SIZE)))
+
+    def take(self) -> list[int]:
+        """A shuffled deck, owned by the caller."""
+        self.stats["taken"] += 1
+        if self._decks:
+            deck = self._decks.popleft()
+        else:
+            self.stats["misses"] += 1
+            deck = self._shuffle()
+        if self._wakeup is not None and len(self._decks) < self.size // 2:
+            self._wakeup.set()
+        return deck
+
+    def fill(self):
+        while len(self._decks) < self.size:
+            self._decks.append(self._shuffle())
+
+    def start(self):
+        self.fill()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while len(self._decks) < self.size:
+                for _ in range(min(REFILL_BATCH, self.size - len(self._decks))):
+                    self._decks.append(self._shuffle())
+                await asyncio.sleep(0)
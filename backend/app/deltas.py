@@ -0,0 +1,50 @@
+"""
+Recent STATE_DELTA frames per table, for clients resuming after a reconnect.
+
+Each broadcast delta is kept, already encoded (protocol.Frame), in a ring of the last `size` ones. The
+deltas chain (every fromVersion is the previous version), so a client that last saw
+version v can be brought up to date with the frames from the one starting at v. When v
+has already left the ring, or the chain was broken by a full STATE broadcast, since()
+returns None and the caller sends a snapshot instead.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from itertools import islice
+from typing import Deque, Optional
+
+from .protocol import Frame
+
+# deltas kept per table: a few seconds of a busy hand
+DELTA_LOG_SIZE = 32
+
+
+class DeltaLog:
+    def __init__(self, size: int = DELTA_LOG_SIZE):
+        # (fromVersion, version, frame), oldest first
+        self._entries: Deque[tuple[int, int, Frame]] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, from_version: int, version: int, frame: Frame):
+        if self._entries and self._entries[-1][1] != from_version:
+            # not a continuation of what we have
+            self._entries.clear()
+        self._entries.append((from_version, version, frame))
+
+    def clear(self):
+        self._entries.clear()
+
+    def since(self, version: int, current: int) -> Optional[list[Frame]]:
+        """Frames taking a client from `version` to `current`, or None if they aren't all here."""
+        if version == current:
+            return []
+        entries = self._entries
+        if not entries or entries[-1][1] != current:
+            return None
+        for i, (from_version, _, _) in enumerate(entries):
+            if from_version == version:
+                return [frame for _, _, frame in islice(entries, i, None)]
+        return None
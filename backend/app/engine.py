@@ -0,0 +1,300 @@
+"""
+Headless game engine.
+
+The rules in game.py driven directly, with no sockets, actors, history or clocks:
+step(state, action) applies one START_HAND or betting action to a copy of a TableState
+and returns the copy with the events it raised; apply_step() is the same thing in place,
+for loops that own their table. Bots are policies, policy(state, seatIndex, rng) -> Action,
+registered by name in POLICIES so a run can be described with plain strings.
+
+simulate() plays hands in a tight loop and returns mergeable tallies (pot sizes, stack
+distribution, chips won per policy, and with check=True any rule invariant broken along
+the way); run_parallel() splits a run across worker processes and merges the results.
+The CLI is bench/engine.py.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from .game import Seat, TableState, apply_action, create_deck, index_hand, seat_player, start_hand
+
+# actions past this many in one hand mean the rules stopped making progress
+MAX_ACTIONS_PER_HAND = 500
+# violations kept verbatim per run (the rest are only counted)
+MAX_EXAMPLES = 20
+
+
+class IllegalAction(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+
+@dataclass(frozen=True, slots=True)
+class Action:
+    kind: str  # START_HAND | FOLD | CHECK | CALL | BET | RAISE
+    seat: int = -1
+    amount: int = 0
+    deck: Optional[tuple[int, ...]] = None  # START_HAND only, shuffled card ints (cards pop from the end)
+
+
+Event = Dict[str, Any]
+Policy = Callable[[TableState, int, random.Random], Action]
+
+
+# Engine ----------------------------
+
+def new_table(stacks: Sequence[int], names: Optional[Sequence[str]] = None, table_id: str = "sim") -> TableState:
+    """A table with one bot seated per stack, in seat order."""
+    table = TableState(tableId=table_id, maxSeats=len(stacks), seats=[Seat(i) for i in range(len(stacks))])
+    for i, chips in enumerate(stacks):
+        name = names[i] if names else f"bot{i}"
+        seat_player(table, i, f"bot{i}", name, chips)
+    table.dealerUserId = "bot0"
+    return table
+
+
+def deal(rng: random.Random) -> Action:
+    """START_HAND with a deck shuffled by rng, so a seeded run plays the same hands again."""
+    deck = create_deck()
+    rng.shuffle(deck)
+    return Action("START_HAND", deck=tuple(deck))
+
+
+def copy_state(state: TableState) -> TableState:
+    """A copy the rules can change without touching `state` (what they mutate is copied)."""
+    new = copy.copy(state)
+    new.seats = [copy.copy(s) for s in state.seats]
+    new.communityCards = list(state.communityCards)
+    new.playersInHand = list(state.playersInHand)
+    new.playerState = [copy.copy(ps) for ps in state.playerState]
+    new.holeCards = dict(state.holeCards)
+    new.deck = list(state.deck)
+    index_hand(new)
+    return new
+
+
+def step(state: TableState, action: Action) -> tuple[TableState, list[Event]]:
+    """
+    Apply one action to a copy of `state` and return the copy with the events it raised,
+    in order. `state` itself is never changed. Raises IllegalAction if the action isn't
+    allowed now.
+    """
+    state = copy_state(state)
+    return state, apply_step(state, action)
+
+
+def apply_step(state: TableState, action: Action) -> list[Event]:
+    """
+    step() without the copy: `state` is updated in place and the events are returned.
+    Raises IllegalAction (and leaves the state untouched) if the action isn't allowed now.
+    """
+    events: list[Event] = []
+    state.events = events
+    try:
+        if action.kind == "START_HAND":
+            if state.status == "IN_HAND":
+                raise IllegalAction("INVALID_STATE", "A hand is already in progress.")
+            if sum(s.userId is not None for s in state.seats) < 2:
+                raise IllegalAction("INVALID_STATE", "Need at least 2 players seated.")
+            if action.deck is None:
+                raise IllegalAction("INVALID_REQUEST", "START_HAND needs a deck.")
+            start_hand(state, list(action.deck), "engine")
+        else:
+            if state.status != "IN_HAND":
+                raise IllegalAction("HAND_NOT_ACTIVE", "No hand is active.")
+            if state.actingSeatIndex != action.seat:
+                raise IllegalAction("NOT_YOUR_TURN", "It is not your turn.")
+            name = state.seats[action.seat].displayName or ""
+            error = apply_action(state, action.seat, action.kind, action.amount, name)
+            if error is not None:
+                raise IllegalAction(*error)
+    finally:
+        state.events = None
+    return events
+
+
+def to_call(state: TableState, seat_index: int) -> int:
+    ps = state.seatStates[seat_index]
+    return max(0, state.currentBet - ps.betThisStreet)
+
+
+def invariants(state: TableState, chips: int) -> list[str]:
+    """Broken rules for a table whose players hold `chips` in total (empty when all is well)."""
+    problems = []
+    if state.status == "IN_HAND":
+        held = sum(ps.stack for ps in state.playerState) + state.pot
+        if state.pot != sum(ps.betThisHand for ps in state.playerState):
+            problems.append(f"pot {state.pot} != bets {sum(ps.betThisHand for ps in state.playerState)}")
+        acting = state.actingSeatIndex
+        ps = state.seatStates[acting] if acting is not None else None
+        if ps is None or not (ps.inHand and not ps.hasFolded):
+            problems.append(f"acting seat {acting} is not in the hand")
+        if any(ps.stack < 0 for ps in state.playerState):
+            problems.append("negative stack")
+    else:
+        held = sum(s.chips for s in state.seats)
+        if state.pot or state.playerState:
+            problems.append("hand state left over after the hand")
+    if held != chips:
+        problems.append(f"chips not conserved: {held} != {chips}")
+    return problems
+
+
+# Policies ----------------------------
+
+def check_or_call(state: TableState, seat: int) -> Action:
+    return Action("CALL" if to_call(state, seat) else "CHECK", seat)
+
+
+def passive(state: TableState, seat: int, rng: random.Random) -> Action:
+    """Never folds, never raises."""
+    return check_or_call(state, seat)
+
+
+def loose(state: TableState, seat: int, rng: random.Random) -> Action:
+    """Mostly calls; folds to some bets, sometimes bets half the pot."""
+    owed = to_call(state, seat)
+    roll = rng.random()
+    if owed and roll < 0.15:
+        return Action("FOLD", seat)
+    if roll > 0.85:
+        return Action("RAISE" if owed else "BET", seat, owed + max(1, state.pot // 2))
+    return check_or_call(state, seat)
+
+
+def aggressive(state: TableState, seat: int, rng: random.Random) -> Action:
+    """Bets or raises the pot often, and folds more when it doesn't."""
+    owed = to_call(state, seat)
+    roll = rng.random()
+    if roll < 0.4:
+        return Action("RAISE" if owed else "BET", seat, owed + max(1, state.pot))
+    if owed and roll > 0.8:
+        return Action("FOLD", seat)
+    return check_or_call(state, seat)
+
+
+POLICIES: Dict[str, Policy] = {"passive": passive, "loose": loose, "aggressive": aggressive}
+
+
+# Runner ----------------------------
+
+def empty_result() -> Dict[str, Any]:
+    return {
+        "hands": 0,
+        "actions": 0,
+        "showdowns": 0,
+        "rebuys": 0,
+        "seconds": 0.0,
+        # policy name -> chips won (net) and hands played
+        "won": Counter(),
+        "played": Counter(),
+        # pot sizes and stacks after each hand, in buckets of a tenth of the starting stack
+        "pots": Counter(),
+        "stacks": Counter(),
+        "violations": 0,
+        "examples": [],
+    }
+
+
+def simulate(
+    hands: int,
+    policies: Sequence[str] = ("passive", "loose", "aggressive", "loose", "passive", "aggressive"),
+    stack: int = 1000,
+    seed: Optional[int] = None,
+    check: bool = False,
+) -> Dict[str, Any]:
+    """
+    Play `hands` hands at one table, one seat per policy. A bust player rebuys for `stack`.
+    With check=True every step is checked against invariants().
+    """
+    rng = random.Random(seed)
+    bots = [POLICIES[name] for name in policies]
+    table = new_table([stack] * len(bots), [f"{name}{i}" for i, name in enumerate(policies)])
+    result = empty_result()
+    won, played, pots, stacks = result["won"], result["played"], result["pots"], result["stacks"]
+    bucket = max(1, stack // 10)
+    chips = stack * len(bots)
+    started = time.perf_counter()
+
+    def flag(problem: str):
+        result["violations"] += 1
+        if len(result["examples"]) < MAX_EXAMPLES:
+            result["examples"].append(f"hand {table.handNumber}: {problem}")
+
+    for _ in range(hands):
+        for seat in table.seats:
+            if seat.chips == 0:
+                seat.chips = stack
+                chips += stack
+                result["rebuys"] += 1
+        before = [seat.chips for seat in table.seats]
+        apply_step(table, deal(rng))
+        actions = 0
+        while table.status == "IN_HAND":
+            seat = table.actingSeatIndex
+            if actions == MAX_ACTIONS_PER_HAND or seat is None:
+                flag(f"stuck on {table.street} (acting seat {seat})")
+                table = new_table(before, [s.displayName for s in table.seats])
+                break
+            # the pot as the hand ends is the pot before its last action plus what that paid
+            ps = table.seatStates[seat]
+            pot, paid = table.pot, ps.stack
+            try:
+                events = apply_step(table, bots[seat](table, seat, rng))
+            except IllegalAction as exc:
+                # a bot's illegal move is a bot bug, but don't let it wedge the table
+                flag(f"seat {seat} {exc}")
+                events = apply_step(table, check_or_call(table, seat))
+            actions += 1
+            if check:
+                for problem in invariants(table, chips):
+                    flag(problem)
+        else:
+            pots[(pot + paid - ps.stack) // bucket * bucket] += 1
+            if any(e["type"] == "SHOWDOWN" for e in events):
+                result["showdowns"] += 1
+        result["actions"] += actions
+        for name, seat, chips_before in zip(policies, table.seats, before):
+            won[name] += seat.chips - chips_before
+            played[name] += 1
+            stacks[seat.chips // bucket * bucket] += 1
+
+    result["hands"] = hands
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def merge(into: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+    for key in ("hands", "actions", "showdowns", "rebuys", "violations"):
+        into[key] += other[key]
+    for key in ("won", "played", "pots", "stacks"):
+        into[key].update(other[key])
+    into["seconds"] = max(into["seconds"], other["seconds"])
+    into["examples"] = (into["examples"] + other["examples"])[:MAX_EXAMPLES]
+    return into
+
+
+def run_parallel(hands: int, workers: Optional[int] = None, seed: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+    """simulate() split into one chunk per worker process (seeds seed, seed+1, ...), merged."""
+    workers = workers or os.cpu_count() or 1
+    sizes = [hands // workers + (i < hands % workers) for i in range(workers)]
+    seeds = [None if seed is None else seed + i for i in range(workers)]
+    started = time.perf_counter()
+    result = empty_result()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(simulate, n, seed=s, **kwargs) for n, s in zip(sizes, seeds) if n]
+        for future in futures:
+            merge(result, future.result())
+    # wall clock, including process start-up
+    result["seconds"] = time.perf_counter() - started
+    return result
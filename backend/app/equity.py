@@ -0,0 +1,172 @@
+"""
+Hero equity (win/tie/lose + final hand histogram) for ODDS_UPDATE.
+
+Cards are ints (see cards.py). The unknown cards are everything the hero cannot see:
+the remaining deck plus the opponents' hole cards. Small spots (river, or any spot
+whose exact outcome count fits in the simulation budget) are enumerated exactly;
+everything else is sampled by a partial Fisher-Yates over one working list, so no
+trial copies the deck.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from itertools import combinations
+from math import comb
+from typing import Any, Dict, Optional, Sequence
+
+from .evaluator import HAND_NAMES, evaluate7
+
+DEFAULT_SIMULATIONS = 2000
+TOP_OUTCOMES = 3
+
+# how often (in trials) the sampler looks at the clock
+_CLOCK_EVERY = 128
+
+
+def unknown_cards(hero: Sequence[int], board: Sequence[int]) -> list[int]:
+    known = set(hero) | set(board)
+    return [c for c in range(52) if c not in known]
+
+
+def outcome_count(n_unknown: int, board_needed: int, n_opponents: int) -> int:
+    """Number of distinct (runout, opponent hands) outcomes."""
+    total = comb(n_unknown, board_needed)
+    left = n_unknown - board_needed
+    for _ in range(n_opponents):
+        total *= comb(left, 2)
+        left -= 2
+    return total
+
+
+class _Tally:
+    __slots__ = ("wins", "ties", "losses", "hands", "win_hands")
+
+    def __init__(self):
+        self.wins = 0
+        self.ties = 0
+        self.losses = 0
+        self.hands = [0] * len(HAND_NAMES)
+        self.win_hands = [0] * len(HAND_NAMES)
+
+    def add(self, hero_score: int, best_opp: int):
+        category = hero_score >> 20
+        self.hands[category] += 1
+        if hero_score > best_opp:
+            self.wins += 1
+            self.win_hands[category] += 1
+        elif hero_score == best_opp:
+            self.ties += 1
+        else:
+            self.losses += 1
+
+    def to_payload(self) -> Dict[str, Any]:
+        return odds_payload(self.wins, self.ties, self.losses, self.hands, self.win_hands)
+
+
+def odds_payload(
+    wins: int,
+    ties: int,
+    losses: int,
+    hands: Sequence[int],
+    win_hands: Sequence[int],
+) -> Dict[str, Any]:
+    """ODDS_UPDATE fields from raw counts (hands/win_hands are indexed by hand category)."""
+    n = (wins + ties + losses) or 1
+    ranked = sorted(range(len(HAND_NAMES)), key=lambda c: -hands[c])
+    top = [
+        {"hand": HAND_NAMES[c], "pct": round(100.0 * hands[c] / n, 1)}
+        for c in ranked[:TOP_OUTCOMES]
+        if hands[c]
+    ]
+    best_win = max(range(len(HAND_NAMES)), key=lambda c: win_hands[c])
+    return {
+        "winPct": round(100.0 * wins / n, 1),
+        "tiePct": round(100.0 * ties / n, 1),
+        "losePct": round(100.0 * losses / n, 1),
+        "mostLikelyWinMethod": HAND_NAMES[best_win] if win_hands[best_win] else None,
+        "topOutcomes": top,
+        "simulations": wins + ties + losses,
+    }
+
+
+def _enumerate(tally: _Tally, hero: list[int], board: list[int], unknown: list[int], n_opponents: int):
+    needed = 5 - len(board)
+
+    def deal_opponents(full_board: list[int], pool: list[int], seats_left: int, best: int, hero_score: int):
+        if seats_left == 0:
+            tally.add(hero_score, best)
+            return
+        for x, y in combinations(pool, 2):
+            rest = [c for c in pool if c != x and c != y]
+            score = evaluate7(*full_board, x, y)
+            deal_opponents(full_board, rest, seats_left - 1, max(best, score), hero_score)
+
+    for runout in combinations(unknown, needed):
+        full_board = board + list(runout)
+        pool = [c for c in unknown if c not in runout]
+        deal_opponents(full_board, pool, n_opponents, -1, evaluate7(*full_board, *hero))
+
+
+def _sample(
+    tally: _Tally,
+    hero: list[int],
+    board: list[int],
+    unknown: list[int],
+    n_opponents: int,
+    simulations: int,
+    deadline: Optional[float],
+    rng: random.Random,
+):
+    needed = 5 - len(board)
+    draw = needed + 2 * n_opponents
+    pool = list(unknown)  # the one working copy; shuffled in place below
+    n = len(pool)
+    rand = rng.random
+    h0, h1 = hero
+
+    for trial in range(simulations):
+        if deadline is not None and trial % _CLOCK_EVERY == 0 and trial and time.perf_counter() > deadline:
+            break
+
+        # partial Fisher-Yates: pool[:draw] becomes a uniform random draw
+        for i in range(draw):
+            j = i + int(rand() * (n - i))
+            pool[i], pool[j] = pool[j], pool[i]
+
+        b0, b1, b2, b3, b4 = board + pool[:needed]
+        hero_score = evaluate7(b0, b1, b2, b3, b4, h0, h1)
+        best = -1
+        for k in range(needed, draw, 2):
+            score = evaluate7(b0, b1, b2, b3, b4, pool[k], pool[k + 1])
+            if score > best:
+                best = score
+        tally.add(hero_score, best)
+
+
+def estimate_equity(
+    hero: Sequence[int],
+    board: Sequence[int],
+    n_opponents: int,
+    simulations: int = DEFAULT_SIMULATIONS,
+    time_budget_ms: Optional[float] = None,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, Any]:
+    """
+    Equity of `hero` (2 int cards) on `board` (0-5 int cards) against `n_opponents`
+    random hands. Returns the ODDS_UPDATE fields: winPct/tiePct/losePct,
+    mostLikelyWinMethod, topOutcomes and simulations (outcomes actually counted).
+    """
+    hero = list(hero)
+    board = list(board)
+    n_opponents = max(1, int(n_opponents))
+    unknown = unknown_cards(hero, board)
+
+    tally = _Tally()
+    if outcome_count(len(unknown), 5 - len(board), n_opponents) <= simulations:
+        _enumerate(tally, hero, board, unknown, n_opponents)
+    else:
+        deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000.0
+        _sample(tally, hero, board, unknown, n_opponents, simulations, deadline, rng or random.Random())
+    return tally.to_payload()
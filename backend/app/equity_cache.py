@@ -0,0 +1,143 @@
+"""
+Equity cache in front of the odds engine.
+
+Equity only depends on (hero cards, board, opponent count) up to a relabelling of
+suits, so lookups go through a canonical key: the lexicographically smallest
+(sorted hero, sorted board) over all 24 suit permutations.
+
+Preflop spots never touch the engine at all: they come from a shipped table for all
+169 starting-hand classes against 1-5 opponents (data/preflop_equity.json), loaded on
+first use. Rebuild it with `python -m app.equity_cache` from backend/.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import OrderedDict
+from itertools import permutations
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from .cards import RANKS
+
+PREFLOP_TABLE_PATH = os.path.join(os.path.dirname(__file__), "data", "preflop_equity.json")
+PREFLOP_MAX_OPPONENTS = 5
+
+CacheKey = Tuple[Tuple[int, ...], Tuple[int, ...], int]
+
+# every suit relabelling as a 52-entry card -> card map
+_SUIT_PERMS: list[list[int]] = [
+    [(c & ~3) | perm[c & 3] for c in range(52)] for perm in permutations(range(4))
+]
+
+
+def canonical_key(hero: Sequence[int], board: Sequence[int], n_opponents: int) -> CacheKey:
+    best: Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]] = None
+    for perm in _SUIT_PERMS:
+        cand = (tuple(sorted(perm[c] for c in hero)), tuple(sorted(perm[c] for c in board)))
+        if best is None or cand < best:
+            best = cand
+    return best[0], best[1], n_opponents  # type: ignore[index]
+
+
+def preflop_class(hero: Sequence[int]) -> str:
+    """Starting-hand class: 'AA', 'AKs', 'T9o', ... (higher rank first)."""
+    a, b = sorted(hero, reverse=True)
+    high, low = RANKS[a >> 2], RANKS[b >> 2]
+    if high == low:
+        return high + low
+    return high + low + ("s" if (a & 3) == (b & 3) else "o")
+
+
+_PREFLOP: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+
+
+def preflop_odds(hero: Sequence[int], n_opponents: int) -> Optional[Dict[str, Any]]:
+    """Precomputed preflop payload, or None if out of the table's range (or no table)."""
+    global _PREFLOP
+    if not 1 <= n_opponents <= PREFLOP_MAX_OPPONENTS:
+        return None
+    if _PREFLOP is None:
+        try:
+            with open(PREFLOP_TABLE_PATH, "r", encoding="utf-8") as f:
+                _PREFLOP = json.load(f)
+        except FileNotFoundError:
+            _PREFLOP = {}
+    entry = _PREFLOP.get(preflop_class(hero))
+    return entry.get(str(n_opponents)) if entry else None
+
+
+class EquityCache:
+    """Bounded LRU of odds payloads keyed by canonical_key, plus the preflop table."""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.preflop_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, hero: Sequence[int], board: Sequence[int], n_opponents: int) -> Optional[Dict[str, Any]]:
+        if not board:
+            odds = preflop_odds(hero, n_opponents)
+            if odds is not None:
+                self.preflop_hits += 1
+                return odds
+
+        key = canonical_key(hero, board, n_opponents)
+        odds = self._entries.get(key)
+        if odds is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return odds
+
+    def put(self, hero: Sequence[int], board: Sequence[int], n_opponents: int, odds: Dict[str, Any]):
+        key = canonical_key(hero, board, n_opponents)
+        self._entries[key] = odds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "preflopHits": self.preflop_hits,
+        }
+
+
+# Preflop table builder ----------------------------
+
+def build_preflop_table(simulations: int = 50_000) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    from .batch_equity import EquityJob, batch_equity
+
+    table: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for i in range(12, -1, -1):
+        for j in range(i, -1, -1):
+            # representative hands; suits are irrelevant beyond suited/offsuit
+            hands = {RANKS[i] + RANKS[j]: [i * 4, j * 4 + 1]} if i == j else {
+                RANKS[i] + RANKS[j] + "s": [i * 4, j * 4],
+                RANKS[i] + RANKS[j] + "o": [i * 4, j * 4 + 1],
+            }
+            for name, hero in hands.items():
+                jobs = [EquityJob(hero, [], n) for n in range(1, PREFLOP_MAX_OPPONENTS + 1)]
+                results = batch_equity(jobs, simulations)
+                table[name] = {str(n): odds for n, odds in zip(range(1, PREFLOP_MAX_OPPONENTS + 1), results)}
+    return table
+
+
+if __name__ == "__main__":
+    import sys
+
+    sims = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    data = build_preflop_table(sims)
+    os.makedirs(os.path.dirname(PREFLOP_TABLE_PATH), exist_ok=True)
+    with open(PREFLOP_TABLE_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True)
+    print(f"wrote {len(data)} classes to {PREFLOP_TABLE_PATH}")
@@ -0,0 +1,260 @@
+"""
+Lookup-table hand evaluator (5 to 7 cards).
+
+Every card gets a precomputed additive key: the rank part is 5**rank (rank counts
+never exceed 4, so the base-5 sum identifies the rank multiset) and the suit part is
+a 3-bit counter per suit. Summing the keys of a hand gives both at once:
+
+  * suit counter -> FLUSH_SUIT table says which suit (if any) has 5+ cards
+  * no flush     -> NOFLUSH[rank_key] is the final score
+  * flush        -> FLUSH_TABLE[13-bit rank mask of the flush suit] is the final score
+
+With 7 cards a flush can never coexist with quads or a full house, so the flush
+lookup is always the answer when a flush suit exists.
+
+Scores are ints, higher is better: category << 20 | five 4-bit kicker ranks.
+"""
+
+from __future__ import annotations
+
+from itertools import combinations_with_replacement
+from math import comb
+from typing import Dict, Sequence
+
+import numpy as np
+
+from .cards import cards_to_ints
+
+# Hand categories ----------------------------
+
+HIGH_CARD = 0
+PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+# names used on the wire (ODDS_UPDATE topOutcomes / mostLikelyWinMethod)
+HAND_NAMES = [
+    "HIGH_CARD",
+    "PAIR",
+    "TWO_PAIR",
+    "THREE_OF_A_KIND",
+    "STRAIGHT",
+    "FLUSH",
+    "FULL_HOUSE",
+    "FOUR_OF_A_KIND",
+    "STRAIGHT_FLUSH",
+]
+
+_SUIT_BITS = 12
+_SUIT_MASK = (1 << _SUIT_BITS) - 1
+
+
+def hand_category(score: int) -> int:
+    return score >> 20
+
+
+def hand_name(score: int) -> str:
+    return HAND_NAMES[score >> 20]
+
+
+def _score(category: int, kickers: Sequence[int]) -> int:
+    value = category
+    for i in range(5):
+        value = (value << 4) | (kickers[i] if i < len(kickers) else 0)
+    return value
+
+
+def _straight_high(rank_mask: int) -> int:
+    """Highest straight in a 13-bit rank mask, or -1. Wheel (A-5) counts as 5-high."""
+    for high in range(12, 3, -1):
+        run = 0b11111 << (high - 4)
+        if rank_mask & run == run:
+            return high
+    wheel = (1 << 12) | 0b1111
+    if rank_mask & wheel == wheel:
+        return 3
+    return -1
+
+
+# Table construction ----------------------------
+
+def _best_flush(rank_mask: int) -> int:
+    high = _straight_high(rank_mask)
+    if high >= 0:
+        return _score(STRAIGHT_FLUSH, [high])
+    ranks = [r for r in range(12, -1, -1) if rank_mask & (1 << r)]
+    return _score(FLUSH, ranks[:5])
+
+
+def _best_no_flush(counts: Sequence[int]) -> int:
+    by_rank = range(12, -1, -1)
+    quads = [r for r in by_rank if counts[r] == 4]
+    trips = [r for r in by_rank if counts[r] == 3]
+    pairs = [r for r in by_rank if counts[r] == 2]
+    singles = [r for r in by_rank if counts[r] == 1]
+
+    if quads:
+        q = quads[0]
+        kicker = [r for r in by_rank if counts[r] and r != q][:1]
+        return _score(FOUR_OF_A_KIND, [q] + kicker)
+
+    if trips and (len(trips) > 1 or pairs):
+        t = trips[0]
+        p = max(trips[1:] + pairs)
+        return _score(FULL_HOUSE, [t, p])
+
+    rank_mask = 0
+    for r in range(13):
+        if counts[r]:
+            rank_mask |= 1 << r
+    high = _straight_high(rank_mask)
+    if high >= 0:
+        return _score(STRAIGHT, [high])
+
+    if trips:
+        return _score(THREE_OF_A_KIND, [trips[0]] + singles[:2])
+    if len(pairs) >= 2:
+        kicker = max(pairs[2:] + singles[:1])
+        return _score(TWO_PAIR, [pairs[0], pairs[1], kicker])
+    if pairs:
+        return _score(PAIR, [pairs[0]] + singles[:3])
+    return _score(HIGH_CARD, singles[:5])
+
+
+def _build_noflush() -> Dict[int, int]:
+    table: Dict[int, int] = {}
+    counts = [0] * 13
+
+    def walk(rank: int, left: int, key: int):
+        if rank == 13:
+            if left <= 2:
+                table[key] = _best_no_flush(counts)
+            return
+        for c in range(min(4, left) + 1):
+            counts[rank] = c
+            walk(rank + 1, left - c, key + c * 5 ** rank)
+        counts[rank] = 0
+
+    walk(0, 7, 0)
+    return table
+
+
+def _build_flush() -> list[int]:
+    table = [0] * (1 << 13)
+    for mask in range(1 << 13):
+        if bin(mask).count("1") >= 5:
+            table[mask] = _best_flush(mask)
+    return table
+
+
+def _build_flush_suit() -> list[int]:
+    table = [-1] * (1 << _SUIT_BITS)
+    for packed in range(1 << _SUIT_BITS):
+        for suit in range(4):
+            if (packed >> (3 * suit)) & 7 >= 5:
+                table[packed] = suit
+                break
+    return table
+
+
+CARD_KEYS: list[int] = [((5 ** (c >> 2)) << _SUIT_BITS) | (1 << (3 * (c & 3))) for c in range(52)]
+RANK_BITS: list[int] = [1 << (c >> 2) for c in range(52)]
+
+NOFLUSH: Dict[int, int] = _build_noflush()
+FLUSH_TABLE: list[int] = _build_flush()
+FLUSH_SUIT: list[int] = _build_flush_suit()
+
+# numpy mirrors of the tables for evaluate_batch
+_NP_CARD_KEYS = np.array(CARD_KEYS, dtype=np.int64)
+_NP_RANK_BITS = np.array(RANK_BITS, dtype=np.int64)
+_NP_FLUSH = np.array(FLUSH_TABLE, dtype=np.int32)
+_NP_FLUSH_SUIT = np.array(FLUSH_SUIT, dtype=np.int8)
+_NP_NF_KEYS = np.array(sorted(NOFLUSH), dtype=np.int64)
+_NP_NF_VALUES = np.array([NOFLUSH[k] for k in _NP_NF_KEYS.tolist()], dtype=np.int32)
+_NP_SUIT_KEYS = np.array([1 << (3 * (c & 3)) for c in range(52)], dtype=np.int64)
+
+
+def _build_dense7() -> tuple[np.ndarray, np.ndarray]:
+    """
+    Dense non-flush table for 7 cards, indexed by the combinatorial rank of the
+    sorted rank multiset: sum(comb(r_i + i, i + 1)). Avoids a binary search per hand.
+    """
+    offsets = np.arange(7)
+    terms = np.array([[comb(r + i, i + 1) for i in range(7)] for r in range(13)], dtype=np.int64)
+    dense = np.zeros(comb(19, 7), dtype=np.int32)
+    for ranks in combinations_with_replacement(range(13), 7):
+        key = sum(5 ** r for r in ranks)
+        if key in NOFLUSH:  # skips multisets with a count above 4
+            dense[sum(int(terms[r, i]) for i, r in enumerate(ranks))] = NOFLUSH[key]
+    return terms[:, offsets], dense
+
+
+_NP_COMB_TERMS, _NP_DENSE7 = _build_dense7()
+_OFFSETS7 = np.arange(7)
+
+
+# Evaluation ----------------------------
+
+def evaluate7(a: int, b: int, c: int, d: int, e: int, f: int, g: int) -> int:
+    """Score exactly 7 int cards. This is the showdown / simulation hot path."""
+    keys = CARD_KEYS
+    k = keys[a] + keys[b] + keys[c] + keys[d] + keys[e] + keys[f] + keys[g]
+    suit = FLUSH_SUIT[k & _SUIT_MASK]
+    if suit < 0:
+        return NOFLUSH[k >> _SUIT_BITS]
+    bits = RANK_BITS
+    mask = 0
+    for card in (a, b, c, d, e, f, g):
+        if card & 3 == suit:
+            mask |= bits[card]
+    return FLUSH_TABLE[mask]
+
+
+def evaluate(cards: Sequence[int]) -> int:
+    """Score 5, 6 or 7 int cards."""
+    keys = CARD_KEYS
+    k = 0
+    for card in cards:
+        k += keys[card]
+    suit = FLUSH_SUIT[k & _SUIT_MASK]
+    if suit < 0:
+        return NOFLUSH[k >> _SUIT_BITS]
+    mask = 0
+    for card in cards:
+        if card & 3 == suit:
+            mask |= RANK_BITS[card]
+    return FLUSH_TABLE[mask]
+
+
+def evaluate_codes(codes: Sequence[str]) -> int:
+    """Score 'Ah'-style card codes."""
+    return evaluate(cards_to_ints(codes))
+
+
+def evaluate_batch(hands) -> np.ndarray:
+    """
+    Score many hands in one call.
+    hands: int array of shape (N, k) with 5 <= k <= 7. Returns int32 scores of shape (N,).
+    """
+    hands = np.asarray(hands, dtype=np.intp)
+    if hands.shape[1] == 7:
+        ranks = np.sort(hands >> 2, axis=1)
+        scores = _NP_DENSE7[_NP_COMB_TERMS[ranks, _OFFSETS7].sum(axis=1)]
+        flush_suit = _NP_FLUSH_SUIT[_NP_SUIT_KEYS[hands].sum(axis=1)]
+    else:
+        keys = _NP_CARD_KEYS[hands].sum(axis=1)
+        scores = _NP_NF_VALUES[np.searchsorted(_NP_NF_KEYS, keys >> _SUIT_BITS)]
+        flush_suit = _NP_FLUSH_SUIT[keys & _SUIT_MASK]
+
+    flushed = flush_suit >= 0
+    if flushed.any():
+        sub = hands[flushed]
+        in_suit = (sub & 3) == flush_suit[flushed, None]
+        masks = (_NP_RANK_BITS[sub] * in_suit).sum(axis=1)
+        scores[flushed] = _NP_FLUSH[masks]
+    return scores
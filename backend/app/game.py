@@ -0,0 +1,514 @@
+"""
+Table state and game rules.
+
+Everything here only touches the TableState it is given: no sockets, no module-level
+registries, no odds/lobby side effects. The websocket handlers in main.py validate a
+request, call into this module and then broadcast; the hand history replays the same
+functions to rebuild a table.
+"""
+
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from .cards import ints_to_cards
+from .decks import DECK_SIZE, ENTROPY
+from .evaluator import hand_name
+from .settlement import award, build_pots, score_hands
+
+
+def now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def make_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:8]}"
+
+
+def create_deck() -> list[int]:
+    """Create a standard 52-card deck of card ints (cards.py; 'Ah' codes only on the wire)."""
+    return list(range(DECK_SIZE))
+
+
+def shuffle_deck(deck: list[int]) -> list[int]:
+    """Shuffle in place from os.urandom (decks.py). The server takes pre-shuffled decks from a DeckPool."""
+    return ENTROPY.shuffle(deck)
+
+
+# default per-turn clock for new tables
+ACTION_CLOCK_MS = 30_000
+
+
+@dataclass
+class Seat:
+    seatIndex: int
+    userId: Optional[str] = None
+    displayName: Optional[str] = None
+    chips: int = 0
+    isConnected: bool = False
+    isSittingOut: bool = False
+
+    def to_public(self) -> Dict[str, Any]:
+        return {
+            "seatIndex": self.seatIndex,
+            "userId": self.userId,
+            "displayName": self.displayName,
+            "chips": self.chips,
+            "isConnected": self.isConnected,
+            "isSittingOut": self.isSittingOut,
+        }
+
+
+@dataclass(slots=True)
+class PlayerHandState:
+    """Per-seat state for the current hand. Serialized to the protocol dict only in to_public()."""
+    seatIndex: int
+    stack: int = 0
+    inHand: bool = True
+    hasFolded: bool = False
+    isAllIn: bool = False
+    betThisStreet: int = 0
+    betThisHand: int = 0
+    actedThisStreet: bool = False
+
+    @property
+    def can_act(self) -> bool:
+        return self.inHand and not self.hasFolded and not self.isAllIn
+
+    def to_public(self) -> Dict[str, Any]:
+        return {
+            "seatIndex": self.seatIndex,
+            "inHand": self.inHand,
+            "hasFolded": self.hasFolded,
+            "isAllIn": self.isAllIn,
+            "stack": self.stack,
+            "betThisStreet": self.betThisStreet,
+            "betThisHand": self.betThisHand,
+            "actedThisStreet": self.actedThisStreet,
+        }
+
+
+@dataclass
+class TableState:
+    tableId: str
+    name: str = "Friday Night Poker"
+    status: str = "LOBBY"  # LOBBY | IN_HAND
+    maxSeats: int = 6
+    createdAt: str = field(default_factory=now_iso)
+
+    dealerUserId: Optional[str] = None
+    handNumber: int = 0
+
+    seats: list[Seat] = field(default_factory=list)
+
+    # gameplay fields
+    buttonSeatIndex: Optional[int] = None
+    smallBlindSeatIndex: Optional[int] = None
+    bigBlindSeatIndex: Optional[int] = None
+
+    street: str = "NONE"  # NONE|PREFLOP|FLOP|TURN|RIVER|SHOWDOWN
+    # cards are ints (cards.py) everywhere in here; to_public() and HOLE_CARDS send 'Ah' codes
+    communityCards: list[int] = field(default_factory=list)
+
+    pot: int = 0
+    currentBet: int = 0
+    minRaiseTo: int = 0
+
+    actingSeatIndex: Optional[int] = None
+    # time the acting player gets per turn before the server checks/folds for them (0 = no clock)
+    actionClockMs: int = ACTION_CLOCK_MS
+
+    playersInHand: list[int] = field(default_factory=list)
+    playerState: list[PlayerHandState] = field(default_factory=list)
+
+    # same PlayerHandState objects indexed by seatIndex (None = not in this hand)
+    seatStates: list[Optional[PlayerHandState]] = field(default_factory=list)
+    # action-order ring: nextSeat[i] is the seat after i among playersInHand (-1 = not in hand)
+    nextSeat: list[int] = field(default_factory=list)
+
+    # hole cards stored by userId (private messages send these)
+    holeCards: Dict[str, list[int]] = field(default_factory=dict)
+
+    # persisted deck for the current hand
+    deck: list[int] = field(default_factory=list)
+
+    lastEvent: Dict[str, Any] = field(default_factory=dict)
+    version: int = 1
+
+    # when set, every event is appended here too (the headless engine collects them); not state
+    events: Optional[list[Dict[str, Any]]] = field(default=None, repr=False, compare=False)
+
+    def to_public(self) -> Dict[str, Any]:
+        return {
+            "tableId": self.tableId,
+            "name": self.name,
+            "status": self.status,
+            "maxSeats": self.maxSeats,
+            "createdAt": self.createdAt,
+            "dealerUserId": self.dealerUserId,
+            "handNumber": self.handNumber,
+            "seats": [s.to_public() for s in self.seats],
+            "buttonSeatIndex": self.buttonSeatIndex,
+            "smallBlindSeatIndex": self.smallBlindSeatIndex,
+            "bigBlindSeatIndex": self.bigBlindSeatIndex,
+            "street": self.street,
+            "communityCards": ints_to_cards(self.communityCards),
+            "pot": self.pot,
+            "currentBet": self.currentBet,
+            "minRaiseTo": self.minRaiseTo,
+            "actingSeatIndex": self.actingSeatIndex,
+            "actionClockMs": self.actionClockMs,
+            "playersInHand": list(self.playersInHand),
+            "playerState": [ps.to_public() for ps in self.playerState],
+            "lastEvent": dict(self.lastEvent),
+            "version": self.version,
+        }
+
+
+# Game rules ----------------------------
+
+def bump_event(table: TableState, event_type: str, summary: str):
+    table.version += 1
+    table.lastEvent = {
+        "eventId": make_id("evt"),
+        "at": now_iso(),
+        "type": event_type,
+        "summary": summary,
+    }
+    if table.events is not None:
+        table.events.append(table.lastEvent)
+
+
+def find_ps(table: TableState, seat_index: int) -> Optional[PlayerHandState]:
+    if 0 <= seat_index < len(table.seatStates):
+        return table.seatStates[seat_index]
+    return None
+
+
+def deal_in(table: TableState, seats: list[Seat]):
+    """Fresh hand state for `seats` (in seat order), plus the seat index and action ring."""
+    table.playersInHand = [s.seatIndex for s in seats]
+    table.playerState = [PlayerHandState(seatIndex=s.seatIndex, stack=s.chips) for s in seats]
+    index_hand(table)
+
+
+def next_button(current: Optional[int], seats: list[int]) -> int:
+    """The first of `seats` (ascending) left of `current`; the lowest one for a table's first hand."""
+    if current is None:
+        return seats[0]
+    return next((seat for seat in seats if seat > current), seats[0])
+
+
+def index_hand(table: TableState):
+    """(Re)build seatStates and nextSeat from playerState."""
+    if not table.playerState:
+        table.seatStates = []
+        table.nextSeat = []
+        return
+    table.seatStates = [None] * table.maxSeats
+    table.nextSeat = [-1] * table.maxSeats
+    order = table.playersInHand
+    for i, ps in enumerate(table.playerState):
+        table.seatStates[ps.seatIndex] = ps
+        table.nextSeat[ps.seatIndex] = order[(i + 1) % len(order)]
+
+
+def next_seat_in_hand(table: TableState, current: int) -> Optional[int]:
+    """Next seat eligible to act (inHand, not folded, not all-in)."""
+    if not table.playersInHand:
+        return None
+
+    ring = table.nextSeat
+    states = table.seatStates
+    if not (0 <= current < len(ring)) or ring[current] < 0:
+        # not in the hand: first eligible seat in seat order
+        for idx in table.playersInHand:
+            if states[idx].can_act:
+                return idx
+        return None
+
+    idx = current
+    for _ in range(len(table.playersInHand)):
+        idx = ring[idx]
+        if states[idx].can_act:
+            return idx
+
+    return None
+
+
+def active_players(table: TableState) -> list[PlayerHandState]:
+    """Players still in the hand (not folded). All-in counts as active."""
+    return [ps for ps in table.playerState if ps.inHand and (not ps.hasFolded)]
+
+
+def reset_street_bets_and_actions(table: TableState):
+    for ps in table.playerState:
+        ps.betThisStreet = 0
+        ps.actedThisStreet = False
+    table.currentBet = 0
+    table.minRaiseTo = 0
+
+
+def betting_round_complete(table: TableState) -> bool:
+    """
+    Betting round is complete when every player who can act (inHand, not folded, not all-in)
+    has acted this street AND is not facing an unmatched bet.
+    """
+    for ps in table.playerState:
+        if not ps.can_act:
+            continue
+        if not ps.actedThisStreet:
+            return False
+        if ps.betThisStreet != table.currentBet:
+            return False
+    return True
+
+
+def advance_street(table: TableState):
+    """Advance street and deal community cards. Expects table.deck to be populated."""
+    # reset per-street bets/actions
+    reset_street_bets_and_actions(table)
+
+    if table.street == "PREFLOP":
+        table.street = "FLOP"
+        table.communityCards.extend([table.deck.pop(), table.deck.pop(), table.deck.pop()])
+        bump_event(table, "FLOP_DEALT", "Flop dealt")
+
+    elif table.street == "FLOP":
+        table.street = "TURN"
+        table.communityCards.append(table.deck.pop())
+        bump_event(table, "TURN_DEALT", "Turn dealt")
+
+    elif table.street == "TURN":
+        table.street = "RIVER"
+        table.communityCards.append(table.deck.pop())
+        bump_event(table, "RIVER_DEALT", "River dealt")
+
+    elif table.street == "RIVER":
+        table.street = "SHOWDOWN"
+        bump_event(table, "SHOWDOWN", "Showdown")
+
+
+def settle_showdown(table: TableState) -> tuple[Dict[int, int], int]:
+    """Payouts (seatIndex -> chips) for the whole pot at showdown, and the best score (-1 if none)."""
+    holes = {}
+    for ps in active_players(table):
+        hole = table.holeCards.get(table.seats[ps.seatIndex].userId or "", [])
+        if len(hole) == 2:
+            holes[ps.seatIndex] = hole
+    board = table.communityCards
+    scores = score_hands(holes, board) if holes and len(board) >= 3 else {}
+    pots = build_pots([(ps.seatIndex, ps.betThisHand, ps.hasFolded or not ps.inHand) for ps in table.playerState])
+    return award(pots, scores, table.buttonSeatIndex), max(scores.values(), default=-1)
+
+
+def apply_player_stacks_to_seats(table: TableState):
+    """Write current in-hand stacks back to seat chips (so losses persist)."""
+    for ps in table.playerState:
+        seat = table.seats[ps.seatIndex]
+        seat.chips = int(ps.stack)
+
+
+def end_hand_and_cleanup(table: TableState, payouts: Dict[int, int], win_reason: str):
+    """Pay out the pot (seatIndex -> chips) and reset hand state."""
+    # persist current stacks to seats first (so other players lose chips)
+    apply_player_stacks_to_seats(table)
+
+    # award winnings
+    winners = []
+    for seat_index, amount in sorted(payouts.items()):
+        seat = table.seats[seat_index]
+        seat.chips = int(seat.chips) + int(amount)
+        winners.append(f"{seat.displayName} wins {amount}")
+
+    bump_event(table, "HAND_ENDED", f"{', '.join(winners)} ({win_reason})")
+
+    # reset hand fields
+    table.status = "LOBBY"
+    table.street = "NONE"
+    table.communityCards = []
+    table.currentBet = 0
+    table.minRaiseTo = 0
+    table.actingSeatIndex = None
+    table.playersInHand = []
+    table.playerState = []
+    table.seatStates = []
+    table.nextSeat = []
+    table.pot = 0
+    table.holeCards = {}
+    table.deck = []
+
+
+# events raised by table/seat management (not by the hand itself): type -> summary
+TABLE_EVENTS = {
+    "PLAYER_JOINED_TABLE": "{name} joined table",
+    "PLAYER_LEFT_TABLE": "{name} left table",
+    "PLAYER_TOOK_SEAT": "{name} took seat {seat}",
+    "PLAYER_LEFT_SEAT": "{name} left their seat",
+    "PLAYER_DISCONNECTED": "{name} disconnected",
+    "PLAYER_RECONNECTED": "{name} reconnected",
+    "DEALER_ASSIGNED": "{name} is dealer",
+    "DEALER_REASSIGNED": "{name} is now dealer",
+}
+
+
+def bump_table_event(table: TableState, event_type: str, display_name: Optional[str], seat_index: int = -1):
+    bump_event(table, event_type, TABLE_EVENTS[event_type].format(name=display_name, seat=seat_index))
+
+
+def seat_player(table: TableState, seat_index: int, user_id: str, display_name: str, chips: int):
+    seat = table.seats[seat_index]
+    seat.userId = user_id
+    seat.displayName = display_name
+    seat.chips = chips
+    seat.isConnected = True
+
+
+def clear_seat(table: TableState, seat_index: int):
+    seat = table.seats[seat_index]
+    seat.userId = None
+    seat.displayName = None
+    seat.chips = 0
+    seat.isConnected = False
+    seat.isSittingOut = False
+
+
+def start_hand(table: TableState, deck: list[int], started_by: str):
+    """Deal a hand to every seated player from `deck` (already shuffled; cards are popped from the end)."""
+    seated = [s for s in table.seats if s.userId is not None]
+
+    # reset hand state
+    table.status = "IN_HAND"
+    table.handNumber += 1
+    table.street = "PREFLOP"
+    table.pot = 0
+    table.currentBet = 0
+    table.minRaiseTo = 0
+    table.communityCards = []
+
+    # the button moves one seated player to the left every hand (odd chips start after it)
+    table.buttonSeatIndex = next_button(table.buttonSeatIndex, [s.seatIndex for s in seated])
+    deal_in(table, seated)
+
+    # persist deck
+    table.deck = deck
+
+    # deal 2 hole cards per player (stored by userId)
+    table.holeCards = {}
+    for s in seated:
+        c1 = table.deck.pop()
+        c2 = table.deck.pop()
+        table.holeCards[s.userId] = [c1, c2]
+
+    # v1 acting seat: smallest seat index in hand
+    table.actingSeatIndex = min(table.playersInHand)
+
+    bump_event(table, "HAND_STARTED", f"Hand #{table.handNumber} started by {started_by}")
+
+
+def apply_action(
+    table: TableState,
+    seat_index: int,
+    action: Optional[str],
+    amount: Any,
+    display_name: str,
+) -> Optional[tuple[str, str]]:
+    """
+    One betting action by the acting seat, then street progression / end of hand.
+    Returns (code, message) and leaves the table untouched if the action is illegal.
+    Whose turn it is is the caller's check.
+    """
+    ps = find_ps(table, seat_index)
+    if not ps or ps.hasFolded or (not ps.inHand):
+        return "INVALID_ACTION", "You cannot act right now."
+
+    to_call = max(0, int(table.currentBet) - int(ps.betThisStreet))
+
+    if action == "FOLD":
+        ps.hasFolded = True
+        ps.actedThisStreet = True
+        bump_event(table, "PLAYER_ACTION", f"{display_name} folded")
+
+    elif action == "CHECK":
+        if to_call != 0:
+            return "INVALID_ACTION", "Cannot check when facing a bet."
+        ps.actedThisStreet = True
+        bump_event(table, "PLAYER_ACTION", f"{display_name} checked")
+
+    elif action == "CALL":
+        pay = min(int(ps.stack), to_call)
+        ps.stack -= pay
+        ps.betThisStreet += pay
+        ps.betThisHand += pay
+        table.pot += pay
+        if ps.stack == 0:
+            ps.isAllIn = True
+        ps.actedThisStreet = True
+        bump_event(table, "PLAYER_ACTION", f"{display_name} called {pay}")
+
+    elif action in ("BET", "RAISE"):
+        if not isinstance(amount, int) or amount <= 0:
+            return "INVALID_AMOUNT", "amount must be a positive integer."
+
+        add = min(int(amount), int(ps.stack))
+        ps.stack -= add
+        ps.betThisStreet += add
+        ps.betThisHand += add
+        table.pot += add
+
+        # update currentBet if this is now the highest
+        raised_bet_to = table.currentBet
+        if ps.betThisStreet > table.currentBet:
+            raised_bet_to = ps.betThisStreet
+            table.currentBet = raised_bet_to
+
+        if ps.stack == 0:
+            ps.isAllIn = True
+
+        # when someone bets/raises, everyone else needs to respond again:
+        for other in table.playerState:
+            if other.seatIndex != seat_index and other.can_act:
+                other.actedThisStreet = False
+
+        ps.actedThisStreet = True
+        bump_event(table, "PLAYER_ACTION", f"{display_name} raised {add}")
+
+    else:
+        return "INVALID_ACTION", "Unknown action."
+
+    # If only one active player remains (everyone else folded), end immediately
+    actives = active_players(table)
+    if len(actives) == 1:
+        end_hand_and_cleanup(table, {actives[0].seatIndex: int(table.pot)}, "everyone folded")
+        return None
+
+    # Street progression: if betting round is complete, advance street / showdown
+    if betting_round_complete(table):
+        advance_street(table)
+        # nobody left to bet against (the rest are all-in): deal out the board
+        while table.street != "SHOWDOWN" and sum(ps.can_act for ps in table.playerState) < 2:
+            advance_street(table)
+
+        if table.street == "SHOWDOWN":
+            # main and side pots to their best hands, split on ties
+            payouts, best_score = settle_showdown(table)
+            end_hand_and_cleanup(
+                table,
+                payouts,
+                f"showdown, {hand_name(best_score)}" if best_score >= 0 else "showdown",
+            )
+            return None
+
+        # after advancing street, set next actor to first eligible from current
+        next_seat = next_seat_in_hand(table, seat_index)
+        if next_seat is not None:
+            table.actingSeatIndex = next_seat
+        return None
+
+    # rotate turn normally
+    table.actingSeatIndex = next_seat_in_hand(table, seat_index)
+    table.version += 1
+    return None
@@ -0,0 +1,430 @@
+"""
+Append-only hand history.
+
+Every change to a table is logged as one or more fixed-width 32-byte records: seat and
+dealer changes, table events, the shuffled deck of each hand and every betting action.
+That is enough to rebuild any table at any version by running the same game rules
+again (see replay()).
+
+Writes stay off the action path: the recording methods only pack bytes into a buffer, and a
+background flusher appends whole batches to the current segment file, with one fsync per
+batch when durability is on (group commit). The log doubles as the write-ahead log for
+table snapshots (persistence.py): position() marks where a snapshot was taken. Segments rotate
+at SEGMENT_BYTES and are self-contained (strings are re-interned per segment), so each
+can be read on its own; the reader mmaps them.
+
+Record layout (little-endian):
+  kind u8 | code u8 | seat i8 | n u8 | table u32 | version u32 | amount i32 | at_ms i64 | data 8s
+Strings (table ids, user ids, names) are interned per segment by STRING records and
+referenced by u32 ids in `table` and `data`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from .game import (
+    TABLE_EVENTS,
+    Seat,
+    TableState,
+    apply_action,
+    bump_table_event,
+    clear_seat,
+    seat_player,
+    start_hand,
+)
+
+RECORD = struct.Struct("<BBbBIIiq8s")
+REFS = struct.Struct("<II")
+
+FORMAT_VERSION = 1
+MAGIC = b"PKRHIST\0"
+
+SEGMENT_BYTES = 64 * 1024 * 1024
+FLUSH_MS = 50
+
+# record kinds
+SEGMENT = 0
+STRING = 1
+TABLE = 2
+SEAT = 3
+UNSEAT = 4
+CONNECTED = 5
+DEALER = 6
+EVENT = 7
+DECK = 8
+HAND_START = 9
+ACTION = 10
+
+EVENT_TYPES = list(TABLE_EVENTS)
+ACTIONS = ["FOLD", "CHECK", "CALL", "BET", "RAISE"]
+
+_MAX_AMOUNT = 2**31 - 1
+
+
+def _segment_name(seq: int) -> str:
+    return f"{seq:08d}.hh"
+
+
+class HandHistory:
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = SEGMENT_BYTES,
+        flush_ms: float = FLUSH_MS,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_ms = flush_ms
+        self.fsync = fsync
+
+        os.makedirs(directory, exist_ok=True)
+        existing = [int(name[:-3]) for name in os.listdir(directory) if name.endswith(".hh")]
+        # every process run starts a fresh segment
+        self._seq = max(existing, default=0)
+        self._size = 0
+        self._strings: Dict[str, int] = {}
+
+        # (segment seq, packed records) not yet written
+        self._pending: list[tuple[int, bytearray]] = []
+        self._file = None
+        self._file_seq = -1
+        self._write_lock = threading.Lock()
+        # batches must reach the file in the order they were taken
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {"records": 0, "bytes": 0, "flushes": 0, "segments": 0}
+        self._rotate()
+
+    # Recording ----------------------------
+
+    def _reserve(self, *strings: Optional[str], records: int = 1):
+        """Rotate now if the next records (plus any new string definitions) won't fit: refs are per segment."""
+        needed = records
+        for value in strings:
+            if value is not None and value not in self._strings:
+                needed += len(value.encode("utf-8")) // 8 + 1
+        if self._size + needed * RECORD.size > self.segment_bytes:
+            self._rotate()
+
+    def _pack(self, kind: int, table: int, version: int, seat: int = -1, code: int = 0, n: int = 0, amount: int = 0, data: bytes = b""):
+        buf = self._pending[-1][1]
+        buf += RECORD.pack(kind, code, seat, n, table, version, amount, int(time.time() * 1000), data)
+        self._size += RECORD.size
+        self.stats["records"] += 1
+
+    def _rotate(self):
+        self._seq += 1
+        self._size = 0
+        self._strings = {}
+        self._pending.append((self._seq, bytearray()))
+        self.stats["segments"] += 1
+        self._pack(SEGMENT, 0, 0, amount=FORMAT_VERSION, data=MAGIC)
+
+    def position(self) -> tuple[int, int]:
+        """(segment, byte offset) just past the last record appended so far."""
+        return self._seq, self._size
+
+    def _ref(self, value: Optional[str]) -> int:
+        """Interned id of value in the current segment (0 = None)."""
+        if value is None:
+            return 0
+        ref = self._strings.get(value)
+        if ref is not None:
+            return ref
+        raw = value.encode("utf-8")
+        ref = len(self._strings) + 1
+        self._strings[value] = ref
+        for i in range(0, max(len(raw), 1), 8):
+            self._pack(STRING, ref, 0, n=i // 8, amount=len(raw), data=raw[i : i + 8])
+        return ref
+
+    def _refs(self, first: Optional[str], second: Optional[str] = None) -> bytes:
+        return REFS.pack(self._ref(first), self._ref(second))
+
+    def table(self, table: TableState):
+        self._reserve(table.tableId, table.name)
+        data = self._refs(table.name)
+        self._pack(TABLE, self._ref(table.tableId), table.version, amount=table.maxSeats, data=data)
+
+    def seat(self, table: TableState, seat_index: int):
+        seat = table.seats[seat_index]
+        self._reserve(table.tableId, seat.userId, seat.displayName)
+        data = self._refs(seat.userId, seat.displayName)
+        self._pack(SEAT, self._ref(table.tableId), table.version, seat=seat_index, amount=seat.chips, data=data)
+
+    def unseat(self, table: TableState, seat_index: int):
+        self._reserve(table.tableId)
+        self._pack(UNSEAT, self._ref(table.tableId), table.version, seat=seat_index)
+
+    def connected(self, table: TableState, seat_index: int):
+        flag = int(table.seats[seat_index].isConnected)
+        self._reserve(table.tableId)
+        self._pack(CONNECTED, self._ref(table.tableId), table.version, seat=seat_index, code=flag)
+
+    def dealer(self, table: TableState):
+        self._reserve(table.tableId, table.dealerUserId)
+        data = self._refs(table.dealerUserId)
+        self._pack(DEALER, self._ref(table.tableId), table.version, data=data)
+
+    def event(self, table: TableState, event_type: str, display_name: Optional[str], seat_index: int = -1):
+        self._reserve(table.tableId, display_name)
+        data = self._refs(display_name)
+        code = EVENT_TYPES.index(event_type)
+        self._pack(EVENT, self._ref(table.tableId), table.version, seat=seat_index, code=code, data=data)
+
+    def hand_start(self, table: TableState, deck: list[int], started_by: str):
+        """deck as it was before dealing (start_hand pops from it)."""
+        self._reserve(table.tableId, started_by, records=len(deck) // 8 + 2)
+        ref = self._ref(table.tableId)
+        data = self._refs(started_by)
+        cards = bytes(deck)
+        for i in range(0, len(cards), 8):
+            chunk = cards[i : i + 8]
+            self._pack(DECK, ref, table.version, code=i // 8, n=len(chunk), data=chunk)
+        self._pack(HAND_START, ref, table.version, amount=table.handNumber, data=data)
+
+    def action(self, table: TableState, seat_index: int, action: str, amount: Any, display_name: str):
+        amount = min(amount, _MAX_AMOUNT) if isinstance(amount, int) else 0
+        self._reserve(table.tableId, display_name)
+        data = self._refs(display_name)
+        code = ACTIONS.index(action)
+        self._pack(ACTION, self._ref(table.tableId), table.version, seat=seat_index, code=code, amount=amount, data=data)
+
+    # Flushing ----------------------------
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_ms / 1000.0)
+            await self.flush()
+
+    async def flush(self):
+        """Write (and fsync, if enabled) everything appended so far."""
+        async with self._flush_lock:
+            batch = self._take()
+            if batch:
+                await asyncio.to_thread(self._write, batch)
+
+    def _take(self) -> list[tuple[int, bytearray]]:
+        batch = [(seq, buf) for seq, buf in self._pending if buf]
+        # keep appending to the current segment's (now empty) buffer
+        self._pending = [(self._seq, bytearray())]
+        return batch
+
+    def _write(self, batch: list[tuple[int, bytearray]]):
+        with self._write_lock:
+            self._write_locked(batch)
+
+    def _write_locked(self, batch: list[tuple[int, bytearray]]):
+        for seq, buf in batch:
+            if seq != self._file_seq:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(os.path.join(self.directory, _segment_name(seq)), "ab")
+                self._file_seq = seq
+            self._file.write(buf)
+            self.stats["bytes"] += len(buf)
+            if self.fsync and seq != batch[-1][0]:
+                # finished segment
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.stats["flushes"] += 1
+
+    def close(self):
+        """Stop the flusher and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        batch = self._take()
+        with self._write_lock:
+            if batch:
+                self._write_locked(batch)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._file_seq = -1
+
+
+# Reading ----------------------------
+
+@dataclass
+class HistoryRecord:
+    kind: int
+    tableId: str
+    version: int
+    seat: int
+    code: int
+    amount: int
+    atMs: int
+    # data resolved per kind: interned strings, or card ints for DECK
+    strings: tuple[Optional[str], Optional[str]] = (None, None)
+    cards: list[int] = field(default_factory=list)
+
+
+class HistoryReader:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def segments(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".hh"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def records(
+        self,
+        table_id: Optional[str] = None,
+        after: Optional[tuple[int, int]] = None,
+    ) -> Iterator[HistoryRecord]:
+        """Every record in log order, optionally only one table's / only those past a position()."""
+        for path in self.segments():
+            seq = int(os.path.basename(path)[:-3])
+            offset = 0
+            if after is not None:
+                if seq < after[0]:
+                    continue
+                if seq == after[0]:
+                    offset = after[1]
+            yield from self._read_segment(path, table_id, offset)
+
+    def _read_segment(self, path: str, table_id: Optional[str], offset: int = 0) -> Iterator[HistoryRecord]:
+        size = os.path.getsize(path)
+        # a torn write at the tail leaves a partial record; ignore it
+        usable = size - size % RECORD.size
+        if usable == 0:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)[:usable]
+            try:
+                head = RECORD.unpack_from(view)
+                if head[0] != SEGMENT or head[8] != MAGIC or head[6] != FORMAT_VERSION:
+                    raise ValueError(f"{path}: not a version {FORMAT_VERSION} history segment")
+                strings: Dict[int, str] = {}
+                chunks: Dict[int, bytearray] = {}
+
+                # before `offset` only the string definitions matter (records after it use
+                # them): find those by their kind byte instead of unpacking everything
+                offset = min(offset - offset % RECORD.size, usable)
+                kinds = mm[0:offset:RECORD.size]
+                i = kinds.find(STRING)
+                while i >= 0:
+                    _, _, _, _, table, _, amount, _, data = RECORD.unpack_from(view, i * RECORD.size)
+                    _add_string(strings, chunks, table, amount, data)
+                    i = kinds.find(STRING, i + 1)
+
+                for kind, code, seat, n, table, version, amount, at_ms, data in RECORD.iter_unpack(view[offset:]):
+                    if kind == SEGMENT:
+                        continue
+                    if kind == STRING:
+                        _add_string(strings, chunks, table, amount, data)
+                        continue
+
+                    tid = strings.get(table, "")
+                    if table_id is not None and tid != table_id:
+                        continue
+                    record = HistoryRecord(kind, tid, version, seat, code, amount, at_ms)
+                    if kind == DECK:
+                        record.cards = list(data[:n])
+                    else:
+                        a, b = REFS.unpack(data)
+                        record.strings = (strings.get(a), strings.get(b))
+                    yield record
+            finally:
+                view.release()
+
+
+def _add_string(strings: Dict[int, str], chunks: Dict[int, bytearray], ref: int, length: int, data: bytes):
+    """Collect one STRING record; long strings span several."""
+    buf = chunks.setdefault(ref, bytearray())
+    buf += data
+    if len(buf) >= length:
+        strings[ref] = bytes(buf[:length]).decode("utf-8")
+        del chunks[ref]
+
+
+# Replay ----------------------------
+
+def _iso(at_ms: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(at_ms / 1000.0))
+
+
+def apply_record(table: Optional[TableState], record: HistoryRecord, deck: list[int]) -> Optional[TableState]:
+    """Apply one record to `table` (TABLE records start a new one). DECK cards collect in `deck`."""
+    kind = record.kind
+    name = record.strings[0]
+
+    if kind == TABLE:
+        table = TableState(tableId=record.tableId, name=name or "", maxSeats=record.amount, createdAt=_iso(record.atMs))
+        table.seats = [Seat(seatIndex=i) for i in range(table.maxSeats)]
+    elif table is None:
+        # log starts mid-table (older segments gone); nothing to apply it to
+        return None
+    elif kind == SEAT:
+        seat_player(table, record.seat, record.strings[0], record.strings[1], record.amount)
+    elif kind == UNSEAT:
+        clear_seat(table, record.seat)
+    elif kind == CONNECTED:
+        table.seats[record.seat].isConnected = bool(record.code)
+    elif kind == DEALER:
+        table.dealerUserId = name
+    elif kind == EVENT:
+        bump_table_event(table, EVENT_TYPES[record.code], name, record.seat)
+    elif kind == DECK:
+        deck.extend(record.cards)
+        return table
+    elif kind == HAND_START:
+        start_hand(table, list(deck), name or "")
+        deck.clear()
+    elif kind == ACTION:
+        apply_action(table, record.seat, ACTIONS[record.code], record.amount, name or "")
+
+    if kind in (EVENT, HAND_START, ACTION) and table.lastEvent:
+        table.lastEvent["at"] = _iso(record.atMs)
+    table.version = record.version
+    return table
+
+
+# records that change the table without bumping its version; the bump that follows
+# (an EVENT in the same handler) is what publishes them
+_SILENT = (SEAT, UNSEAT, CONNECTED, DEALER, DECK)
+
+
+def replay(directory: str, table_id: str, version: Optional[int] = None) -> Optional[TableState]:
+    """
+    The table as subscribers saw it at `version` (its latest logged state if None),
+    rebuilt from the log. A version between two broadcasts resolves to the earlier one.
+    None if the table is not in the log.
+    """
+    table: Optional[TableState] = None
+    deck: list[int] = []
+    silent: list[HistoryRecord] = []
+    for record in HistoryReader(directory).records(table_id):
+        if record.kind in _SILENT:
+            silent.append(record)
+            continue
+        if version is not None and record.version > version and record.kind != TABLE:
+            break
+        for pending in silent:
+            table = apply_record(table, pending, deck)
+        silent = []
+        table = apply_record(table, record, deck)
+    if version is None:
+        for pending in silent:
+            table = apply_record(table, pending, deck)
+    return table
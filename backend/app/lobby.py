@@ -0,0 +1,117 @@
+"""
+Lobby index.
+
+One summary entry per table (the TABLES_LIST row), refreshed only when that table's
+seating or status changes, so listing tables never walks every seat of every table.
+TABLES_LIST payloads (dict and JSON) are cached per query and thrown away on the next change.
+
+Changes since the last flush are kept as a pending diff; take_delta() turns them into
+one LOBBY_DELTA payload for lobby subscribers and bumps the lobby version.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# queries cached at once (distinct filter/page combinations)
+MAX_CACHED_QUERIES = 64
+
+Entry = Dict[str, Any]
+Query = Tuple[Optional[str], int, int, Optional[int]]
+
+
+def table_entry(table: Any) -> Entry:
+    players = [s.displayName for s in table.seats if s.userId is not None]
+    return {
+        "tableId": table.tableId,
+        "name": table.name,
+        "status": table.status,
+        "playerCount": len(players),
+        "maxSeats": table.maxSeats,
+        "players": players,
+    }
+
+
+class LobbyIndex:
+    def __init__(self, dumps: Callable[[Any], str]):
+        """dumps encodes a payload dict to a JSON string."""
+        self.dumps = dumps
+        self.version = 0
+        self._entries: Dict[str, Entry] = {}
+        self._pending: Dict[str, Entry] = {}
+        # query -> (payload, payload encoded)
+        self._payloads: Dict[Query, Tuple[Dict[str, Any], str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, table_id: str) -> bool:
+        return table_id in self._entries
+
+    def update(self, table: Any) -> bool:
+        """Refresh one table's entry. Returns True if it changed."""
+        entry = table_entry(table)
+        if self._entries.get(table.tableId) == entry:
+            return False
+        self._entries[table.tableId] = entry
+        self._pending[table.tableId] = entry
+        self._payloads.clear()
+        return True
+
+    def merge(self, entries: Dict[str, Entry]) -> bool:
+        """Take entries maintained elsewhere (tables owned by another node). True if any changed."""
+        changed = False
+        for table_id, entry in entries.items():
+            if self._entries.get(table_id) != entry:
+                self._entries[table_id] = entry
+                self._pending[table_id] = entry
+                changed = True
+        if changed:
+            self._payloads.clear()
+        return changed
+
+    def entries(self) -> Dict[str, Entry]:
+        return dict(self._entries)
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        min_open_seats: int = 0,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        rows = [
+            e
+            for e in self._entries.values()
+            if (status is None or e["status"] == status) and e["maxSeats"] - e["playerCount"] >= min_open_seats
+        ]
+        page = rows[offset:] if limit is None else rows[offset : offset + limit]
+        return {"tables": page, "total": len(rows), "offset": offset, "lobbyVersion": self.version}
+
+    def query_encoded(
+        self,
+        status: Optional[str] = None,
+        min_open_seats: int = 0,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """query() and its JSON, cached until the next change."""
+        key = (status, min_open_seats, offset, limit)
+        cached = self._payloads.get(key)
+        if cached is None:
+            if len(self._payloads) >= MAX_CACHED_QUERIES:
+                self._payloads.clear()
+            payload = self.query(status, min_open_seats, offset, limit)
+            cached = self._payloads[key] = (payload, self.dumps(payload))
+        return cached
+
+    def take_delta(self) -> Optional[Dict[str, Any]]:
+        """Pending changes as a LOBBY_DELTA payload (None if nothing changed)."""
+        if not self._pending:
+            return None
+        changed, self._pending = self._pending, {}
+        from_version = self.version
+        self.version += 1
+        # cached payloads carry the old lobbyVersion
+        self._payloads.clear()
+        return {"fromVersion": from_version, "version": self.version, "tables": changed}
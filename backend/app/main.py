@@ -1,19 +1,76 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import random
+import os
 import time
 import uuid
 import hashlib
-from dataclasses import dataclass, field
-from typing import Any, Dict, Optional, Set, List
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, List
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from .actors import ACTOR_STATS, FLUSH_MS, FlushTicker, TableActor
+from .batch_equity import EquityJob
+from .cards import ints_to_cards
+from .decks import DeckPool
+from .deltas import DeltaLog
+from .game import (
+    Seat,
+    TableState,
+    active_players,
+    apply_action,
+    bump_table_event,
+    clear_seat,
+    find_ps,
+    seat_player,
+    start_hand,
+)
+from .history import HandHistory
+from .lobby import LobbyIndex
+from .odds import OddsService
+from .metrics import SIZE_BUCKETS, Counter, Gauge, Histogram, LoopLag, Registry
+from .outbound import OUTBOUND_STATS, TABLE_BYTES, Outbox
+from .persistence import SnapshotStore, Snapshotter, restore
+from .protocol import Frame, diff_public, dumps, encode_message, encode_raw_message
+from .sharding import BrokerUnavailable, RemoteSocket, router_from_env
+from .timers import TimerWheel
+from .wire import JSON, WIRE_STATS, encodings, unpack
+from .workers import JobDropped, PoolBusy
 
 # App setup ----------------------------
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ODDS.start()
+    HISTORY.start()
+    SNAPSHOTS.start()
+    TURN_CLOCK.start()
+    DECKS.start()
+    LOOP_LAG.start()
+    # restored hands: whoever is to act gets a fresh clock
+    for table in TABLES.values():
+        arm_turn_clock(table)
+    await SHARDS.start(on_shard_message)
+    # announce our tables; peers already up answer with theirs
+    await publish_lobby(local_lobby_entries(), hello=True)
+    yield
+    await SHARDS.close()
+    TURN_CLOCK.close()
+    DECKS.close()
+    LOOP_LAG.close()
+    if TICKER is not None:
+        TICKER.close()
+    await SNAPSHOTS.close()
+    HISTORY.close()
+    ODDS.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,148 +89,361 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def stats():
+    depths = [s["outbox"].depth for s in SESSIONS.values() if s.get("outbox")]
+    return {
+        "sessions": len(SESSIONS),
+        "outbound": {
+            **OUTBOUND_STATS,
+            "queued": sum(depths),
+            "maxQueueDepth": max(depths, default=0),
+        },
+        "lobby": {"tables": len(LOBBY), "version": LOBBY.version, "subscribers": len(LOBBY_SUBSCRIBERS)},
+        "turnClock": {**TURN_CLOCK.stats, "armed": len(TURN_CLOCK)},
+        "decks": {**DECKS.stats, "pooled": len(DECKS)},
+        "resume": {**RESUME_STATS, "logs": len(DELTA_LOGS), "loggedDeltas": sum(len(log) for log in DELTA_LOGS.values())},
+        "wire": {
+            **WIRE_STATS,
+            "binarySessions": sum(1 for s in SESSIONS.values() if s["outbox"].encoding != JSON),
+        },
+        "actors": {**ACTOR_STATS, "tables": len(ACTORS), "queued": sum(a.depth for a in ACTORS.values())},
+        "persistence": {
+            "history": HISTORY.stats,
+            "snapshots": SNAPSHOTS.store.stats,
+            "lastSnapshot": SNAPSHOTS.last,
+        },
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
 # In-memory data ----------------------------
 
-def now_iso() -> str:
-    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-
-
-def make_id(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4().hex[:8]}"
-
-
-def create_deck() -> list[str]:
-    """Create a standard 52-card deck. Uses 'Ah'/'Td' style codes."""
-    suits = ["h", "d", "c", "s"]
-    ranks = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
-    return [f"{rank}{suit}" for suit in suits for rank in ranks]
-
-
-def shuffle_deck(deck: list[str]) -> list[str]:
-    random.shuffle(deck)
-    return deck
-
-
-@dataclass
-class Seat:
-    seatIndex: int
-    userId: Optional[str] = None
-    displayName: Optional[str] = None
-    chips: int = 0
-    isConnected: bool = False
-    isSittingOut: bool = False
-
-    def to_public(self) -> Dict[str, Any]:
-        return {
-            "seatIndex": self.seatIndex,
-            "userId": self.userId,
-            "displayName": self.displayName,
-            "chips": self.chips,
-            "isConnected": self.isConnected,
-            "isSittingOut": self.isSittingOut,
-        }
-
-
-@dataclass
-class TableState:
-    tableId: str
-    name: str = "Friday Night Poker"
-    status: str = "LOBBY"  # LOBBY | IN_HAND
-    maxSeats: int = 6
-    createdAt: str = field(default_factory=now_iso)
-
-    dealerUserId: Optional[str] = None
-    handNumber: int = 0
-
-    seats: list[Seat] = field(default_factory=list)
-
-    # gameplay fields
-    buttonSeatIndex: Optional[int] = None
-    smallBlindSeatIndex: Optional[int] = None
-    bigBlindSeatIndex: Optional[int] = None
-
-    street: str = "NONE"  # NONE|PREFLOP|FLOP|TURN|RIVER|SHOWDOWN
-    communityCards: list[str] = field(default_factory=list)
-
-    pot: int = 0
-    currentBet: int = 0
-    minRaiseTo: int = 0
-
-    actingSeatIndex: Optional[int] = None
-    actionClockMs: int = 0
-
-    playersInHand: list[int] = field(default_factory=list)
-    playerState: list[Dict[str, Any]] = field(default_factory=list)
-
-    # hole cards stored by userId (private messages send these)
-    holeCards: Dict[str, list[str]] = field(default_factory=dict)
-
-    # persisted deck for the current hand
-    deck: list[str] = field(default_factory=list)
-
-    lastEvent: Dict[str, Any] = field(default_factory=dict)
-    version: int = 1
-
-    def to_public(self) -> Dict[str, Any]:
-        return {
-            "tableId": self.tableId,
-            "name": self.name,
-            "status": self.status,
-            "maxSeats": self.maxSeats,
-            "createdAt": self.createdAt,
-            "dealerUserId": self.dealerUserId,
-            "handNumber": self.handNumber,
-            "seats": [s.to_public() for s in self.seats],
-            "buttonSeatIndex": self.buttonSeatIndex,
-            "smallBlindSeatIndex": self.smallBlindSeatIndex,
-            "bigBlindSeatIndex": self.bigBlindSeatIndex,
-            "street": self.street,
-            "communityCards": self.communityCards,
-            "pot": self.pot,
-            "currentBet": self.currentBet,
-            "minRaiseTo": self.minRaiseTo,
-            "actingSeatIndex": self.actingSeatIndex,
-            "actionClockMs": self.actionClockMs,
-            "playersInHand": self.playersInHand,
-            "playerState": self.playerState,
-            "lastEvent": self.lastEvent,
-            "version": self.version,
-        }
-
-
-# tableId -> TableState
+# REQUEST_ODDS budget: max outcomes per hero and a wall-clock cap per batch
+ODDS_SIMULATIONS = 2000
+ODDS_TIME_BUDGET_MS = 250
+# odds requests arriving within this window run as one vectorized batch
+ODDS_BATCH_WINDOW_MS = 5
+# worker processes for odds, and how many table jobs may wait for one
+ODDS_WORKERS = 2
+ODDS_MAX_QUEUE = 256
+# canonical (suit-isomorphic) odds results kept in the LRU cache
+ODDS_CACHE_ENTRIES = 50_000
+
+ODDS = OddsService(
+    simulations=ODDS_SIMULATIONS,
+    time_budget_ms=ODDS_TIME_BUDGET_MS,
+    max_workers=ODDS_WORKERS,
+    max_queue=ODDS_MAX_QUEUE,
+    window_ms=ODDS_BATCH_WINDOW_MS,
+    cache_entries=ODDS_CACHE_ENTRIES,
+)
+
+# this worker's place in the cluster (POKER_NODE_ID / POKER_NODES); one node by default
+SHARDS = router_from_env()
+
+# on-disk state (hand history, snapshots) lives under POKER_DATA_DIR/<node id>
+DATA_DIR = os.path.join(os.environ.get("POKER_DATA_DIR", "var"), SHARDS.node_id)
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+
+# append-only log of every table change; replay() rebuilds a table at any version.
+# Also the write-ahead log for snapshots, so batches are fsynced (group commit).
+HISTORY = HandHistory(HISTORY_DIR, fsync=True)
+
+# tableId -> TableState (only tables this node owns)
 TABLES: Dict[str, TableState] = {}
 
 # tableId -> set of WebSocket connections currently subscribed
 TABLE_SUBSCRIBERS: Dict[str, Set[WebSocket]] = {}
 
+# tableId -> last public state broadcast to subscribers (base for STATE_DELTA)
+TABLE_SNAPSHOTS: Dict[str, Dict[str, Any]] = {}
+
+# tableId -> (STATE payload of the base, that payload encoded); joiners in a storm share one encode
+STATE_PAYLOADS: Dict[str, tuple[Dict[str, Any], str]] = {}
+
+# tableId -> recent STATE_DELTA frames up to the base, replayed to clients that RESUME
+DELTA_LOGS: Dict[str, DeltaLog] = {}
+
+# process-wide RESUME counters, exposed by the stats endpoint
+RESUME_STATS: Dict[str, int] = {"replayed": 0, "snapshots": 0, "frames": 0}
+
+# table changes are broadcast at most once per window (POKER_FLUSH_MS; 0 = after every batch of commands)
+STATE_FLUSH_MS = float(os.environ.get("POKER_FLUSH_MS", FLUSH_MS))
+TICKER = FlushTicker(STATE_FLUSH_MS) if STATE_FLUSH_MS > 0 else None
+
+# one timing wheel runs every table's action clock (keyed by tableId)
+TURN_CLOCK = TimerWheel(lambda table_id: on_turn_expired(table_id))
+
+# decks shuffled ahead of time (CSPRNG); START_HAND pops one
+DECKS = DeckPool()
+
 # websocket -> session info
 SESSIONS: Dict[WebSocket, Dict[str, Any]] = {}
 
+# userId -> {tableId: seatIndex}; kept in step with Seat.userId by sit()/unseat()
+USER_SEATS: Dict[str, Dict[str, int]] = {}
+
+# userId -> live authenticated sockets
+USER_SOCKETS: Dict[str, Set[WebSocket]] = {}
+
+# sockets receiving LOBBY_DELTA pushes
+LOBBY_SUBSCRIBERS: Set[WebSocket] = set()
+
+# connId -> websocket connected to this node (frames from table owners come back by connId)
+LOCAL_CONNS: Dict[str, WebSocket] = {}
+
+# (origin node, connId) -> stand-in for a client connected to another node
+REMOTE_SOCKETS: Dict[tuple[str, str], RemoteSocket] = {}
+
+
+# Metrics ----------------------------
+
+# recorded on the hot paths: one clock read and a dict add per message / broadcast
+METRICS = Registry()
+MESSAGE_SECONDS = METRICS.add(Histogram(
+    "poker_message_seconds",
+    "Client message received until its handler finished, incl. waiting on the table actor.",
+    ("type",),
+))
+BROADCAST_FANOUT = METRICS.add(Histogram(
+    "poker_broadcast_fanout", "Subscribers per table-state broadcast.", buckets=SIZE_BUCKETS
+))
+BROADCAST_ENCODE_SECONDS = METRICS.add(Histogram(
+    "poker_broadcast_encode_seconds", "Time to diff and encode one table-state broadcast."
+))
+HANDS = METRICS.add(Counter("poker_hands_total", "Hands started and finished.", ("event",)))
+LOOP_LAG = LoopLag(
+    METRICS.add(Histogram("poker_event_loop_lag_seconds", "How late the event loop woke a sleeping task.")),
+    METRICS.add(Gauge("poker_event_loop_lag_last_seconds", "Most recent event loop lag sample.")),
+)
+
+# read at scrape time
+METRICS.add(Gauge("poker_sessions", "Open client sessions.", fn=lambda: len(SESSIONS)))
+METRICS.add(Gauge("poker_tables", "Tables owned by this node, by status.", ("status",), fn=lambda: table_counts()))
+METRICS.add(Gauge(
+    "poker_table_subscribers", "Sockets subscribed to table state.",
+    fn=lambda: sum(len(s) for s in TABLE_SUBSCRIBERS.values()),
+))
+METRICS.add(Gauge("poker_lobby_subscribers", "Sockets subscribed to lobby deltas.", fn=lambda: len(LOBBY_SUBSCRIBERS)))
+METRICS.add(Counter(
+    "poker_table_sent_bytes_total",
+    "Table-state (STATE / STATE_DELTA) bytes sent, per default table (client-created ones summed as other).",
+    ("table",),
+    fn=lambda: table_bytes(),
+))
+METRICS.add(Counter(
+    "poker_outbound_frames_total", "Frames sent, dropped (coalesced) and evicted-consumer counts.", ("result",),
+    fn=lambda: {(k,): v for k, v in OUTBOUND_STATS.items()},
+))
+METRICS.add(Counter(
+    "poker_resumes_total", "RESUME requests answered by replaying deltas or with a snapshot.", ("result",),
+    fn=lambda: {("replayed",): RESUME_STATS["replayed"], ("snapshot",): RESUME_STATS["snapshots"]},
+))
+
+
+def table_counts() -> Dict[tuple, int]:
+    counts: Dict[tuple, int] = {}
+    for table in TABLES.values():
+        counts[(table.status,)] = counts.get((table.status,), 0) + 1
+    return counts
+
+
+def table_bytes() -> Dict[tuple, int]:
+    """TABLE_BYTES by label. Any JOIN_TABLE id creates a table, so only the default ones get their own."""
+    totals: Dict[tuple, int] = {}
+    for table_id, n in TABLE_BYTES.items():
+        label = (table_id if table_id in DEFAULT_TABLE_IDS else "other",)
+        totals[label] = totals.get(label, 0) + n
+    return totals
+
+
+# tableId -> TABLES_LIST row, refreshed by lobby_touch()
+LOBBY = LobbyIndex(dumps)
+_lobby_flush_scheduled = False
+
+
+def lobby_touch(table: TableState):
+    """Call after changing a table's seating or status."""
+    if LOBBY.update(table):
+        schedule_lobby_flush()
+
+
+def schedule_lobby_flush():
+    global _lobby_flush_scheduled
+    if _lobby_flush_scheduled:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # startup: nobody is subscribed yet
+        return
+    # one LOBBY_DELTA per handler, however many tables it touched
+    _lobby_flush_scheduled = True
+    loop.call_soon(flush_lobby)
+
+
+def flush_lobby():
+    global _lobby_flush_scheduled
+    _lobby_flush_scheduled = False
+    delta = LOBBY.take_delta()
+    if delta is None:
+        return
+    # other nodes mirror the tables we own
+    owned = {tid: e for tid, e in delta["tables"].items() if SHARDS.is_local(tid)}
+    if owned and SHARDS.peers:
+        asyncio.ensure_future(publish_lobby(owned))
+    if not LOBBY_SUBSCRIBERS:
+        return
+    frame = encode_message("LOBBY_DELTA", delta)
+    for ws in list(LOBBY_SUBSCRIBERS):
+        outbox_put(ws, frame)
+
+
+def local_lobby_entries() -> Dict[str, Dict[str, Any]]:
+    return {tid: e for tid, e in LOBBY.entries().items() if SHARDS.is_local(tid)}
+
+
+async def publish_lobby(entries: Dict[str, Dict[str, Any]], hello: bool = False, to: Optional[list[str]] = None):
+    for node in to or SHARDS.peers:
+        try:
+            await SHARDS.send(node, {"op": "lobby", "from": SHARDS.node_id, "tables": entries, "hello": hello})
+        except BrokerUnavailable:
+            # not up yet; it gets our tables in reply to its own hello
+            pass
+
+
+def get_or_create_table(table_id: str) -> TableState:
+    if table_id not in TABLES:
+        t = TableState(tableId=table_id)
+        t.seats = [Seat(seatIndex=i) for i in range(t.maxSeats)]
+        TABLES[table_id] = t
+        TABLE_SUBSCRIBERS[table_id] = set()
+        HISTORY.table(t)
+        lobby_touch(t)
+    return TABLES[table_id]
+
+
+def tables_list_frame(payload: Dict[str, Any], request_id: Optional[str] = None) -> Optional[Frame]:
+    """TABLES_LIST for LIST_TABLES filters/paging, or None if they are invalid."""
+    status = payload.get("status")
+    min_open_seats = payload.get("minOpenSeats", 0)
+    offset = payload.get("offset", 0)
+    limit = payload.get("limit")
+    if status not in (None, "LOBBY", "IN_HAND"):
+        return None
+    for value in (min_open_seats, offset) + (() if limit is None else (limit,)):
+        if not isinstance(value, int) or value < 0:
+            return None
+    return encode_raw_message("TABLES_LIST", *LOBBY.query_encoded(status, min_open_seats, offset, limit), request_id)
+
+
+def outbox_put(ws: WebSocket, frame: Frame, table_id: Optional[str] = None) -> bool:
+    session = SESSIONS.get(ws)
+    if not session:
+        return False
+    return session["outbox"].put(frame, table_id)
+
+
+def seat_of(table_id: str, user_id: Optional[str]) -> Optional[int]:
+    """seatIndex of user_id at table_id, or None. O(1)."""
+    if user_id is None:
+        return None
+    return USER_SEATS.get(user_id, {}).get(table_id)
+
+
+def sit(table: TableState, seat_index: int, user_id: str, display_name: str, chips: int):
+    seat_player(table, seat_index, user_id, display_name, chips)
+    USER_SEATS.setdefault(user_id, {})[table.tableId] = seat_index
+    HISTORY.seat(table, seat_index)
+    lobby_touch(table)
+
+
+def unseat(table: TableState, seat_index: int):
+    seat = table.seats[seat_index]
+    seats = USER_SEATS.get(seat.userId or "")
+    if seats is not None:
+        seats.pop(table.tableId, None)
+        if not seats:
+            del USER_SEATS[seat.userId]
+    clear_seat(table, seat_index)
+    HISTORY.unseat(table, seat_index)
+    lobby_touch(table)
+
+
+def set_connected(table: TableState, seat_index: int, connected: bool):
+    table.seats[seat_index].isConnected = connected
+    HISTORY.connected(table, seat_index)
+
+
+def set_dealer(table: TableState, user_id: Optional[str]):
+    table.dealerUserId = user_id
+    HISTORY.dealer(table)
+
+
+def table_event(table: TableState, event_type: str, display_name: Optional[str], seat_index: int = -1):
+    """Seat/table management event (game.TABLE_EVENTS): bumps the version and logs it."""
+    bump_table_event(table, event_type, display_name, seat_index)
+    HISTORY.event(table, event_type, display_name, seat_index)
+
+
+# Restore tables from the last run (newest snapshot + log tail)
+for table_id, t in restore(SNAPSHOT_DIR, HISTORY_DIR).items():
+    if not SHARDS.is_local(table_id):
+        # owned by another node under the current POKER_NODES
+        continue
+    TABLES[table_id] = t
+    TABLE_SUBSCRIBERS[table_id] = set()
+    for seat in t.seats:
+        if seat.userId is None:
+            continue
+        USER_SEATS.setdefault(seat.userId, {})[table_id] = seat.seatIndex
+        if seat.isConnected:
+            # nobody is connected to a fresh process
+            set_connected(t, seat.seatIndex, False)
+            table_event(t, "PLAYER_DISCONNECTED", seat.displayName)
+    lobby_touch(t)
+
+SNAPSHOTS = Snapshotter(SnapshotStore(SNAPSHOT_DIR), HISTORY, lambda: TABLES.values())
+
 # Initialize 3 default tables
 DEFAULT_TABLES = ["Table 1", "Table 2", "Table 3"]
+DEFAULT_TABLE_IDS = {f"tbl_{i+1}" for i in range(len(DEFAULT_TABLES))}
 for i, name in enumerate(DEFAULT_TABLES):
     table_id = f"tbl_{i+1}"
+    if not SHARDS.is_local(table_id) or table_id in TABLES:
+        continue
     t = TableState(tableId=table_id, name=name)
     t.seats = [Seat(seatIndex=j) for j in range(t.maxSeats)]
     TABLES[table_id] = t
     TABLE_SUBSCRIBERS[table_id] = set()
+    HISTORY.table(t)
+    lobby_touch(t)
 
 
-def get_or_create_table(table_id: str) -> TableState:
-    if table_id not in TABLES:
-        t = TableState(tableId=table_id)
-        t.seats = [Seat(seatIndex=i) for i in range(t.maxSeats)]
-        TABLES[table_id] = t
-        TABLE_SUBSCRIBERS[table_id] = set()
-    return TABLES[table_id]
+def bind_user_socket(ws: WebSocket, user_id: str):
+    previous = SESSIONS[ws].get("userId")
+    if previous and previous != user_id:
+        unbind_user_socket(ws, previous)
+    USER_SOCKETS.setdefault(user_id, set()).add(ws)
+
+
+def unbind_user_socket(ws: WebSocket, user_id: Optional[str]):
+    sockets = USER_SOCKETS.get(user_id or "")
+    if sockets is not None:
+        sockets.discard(ws)
+        if not sockets:
+            del USER_SOCKETS[user_id]
 
 
 async def send(ws: WebSocket, msg_type: str, payload: Dict[str, Any], request_id: Optional[str] = None):
-    msg = {"type": msg_type, "payload": payload}
-    if request_id is not None:
-        msg["requestId"] = request_id
-    await ws.send_text(json.dumps(msg))
+    # queued on the socket's own writer; never waits on the client's network
+    outbox_put(ws, encode_message(msg_type, payload, request_id))
 
 
 async def send_error(
@@ -191,601 +461,765 @@ async def send_error(
     )
 
 
-async def broadcast_state(table_id: str):
-    table = TABLES[table_id]
-    payload = {"table": table.to_public()}
-    dead: list[WebSocket] = []
-    for ws in TABLE_SUBSCRIBERS.get(table_id, set()):
-        try:
-            await send(ws, "STATE", payload)
-        except Exception:
-            dead.append(ws)
-
-    for ws in dead:
-        TABLE_SUBSCRIBERS[table_id].discard(ws)
+def state_frame(table_id: str) -> Frame:
+    """
+    Frame for the table's subscribers: a STATE_DELTA against the last broadcast, or a
+    full STATE when there is no base yet. Records the new base.
+    """
+    public = TABLES[table_id].to_public()
+    prev = TABLE_SNAPSHOTS.get(table_id)
+    TABLE_SNAPSHOTS[table_id] = public
+
+    if prev is None or prev["version"] == public["version"]:
+        if prev is None:
+            # a new base: older deltas don't lead to it
+            DELTA_LOGS.pop(table_id, None)
+        return encode_message("STATE", {"table": public})
+
+    changed, items = diff_public(prev, public)
+    frame = encode_message(
+        "STATE_DELTA",
+        {
+            "tableId": table_id,
+            "fromVersion": prev["version"],
+            "version": public["version"],
+            "set": changed,
+            "items": items,
+        },
+    )
+    log = DELTA_LOGS.get(table_id)
+    if log is None:
+        log = DELTA_LOGS[table_id] = DeltaLog()
+    log.append(prev["version"], public["version"], frame)
+    return frame
 
 
-def bump_event(table: TableState, event_type: str, summary: str):
-    table.version += 1
-    table.lastEvent = {
-        "eventId": make_id("evt"),
-        "at": now_iso(),
-        "type": event_type,
-        "summary": summary,
-    }
+def snapshot_message(table_id: str, request_id: Optional[str] = None) -> Frame:
+    """
+    Full STATE at the current broadcast base: the version the table's next STATE_DELTA
+    starts from (which is the latest version once pending changes are flushed).
+    """
+    public = TABLE_SNAPSHOTS.get(table_id)
+    if public is None:
+        # first holder of a base for this table
+        public = TABLE_SNAPSHOTS[table_id] = TABLES[table_id].to_public()
+    cached = STATE_PAYLOADS.get(table_id)
+    if cached is None or cached[0]["table"] is not public:
+        payload = {"table": public}
+        cached = STATE_PAYLOADS[table_id] = (payload, dumps(payload))
+    return encode_raw_message("STATE", *cached, request_id)
+
+
+async def send_snapshot(ws: WebSocket, table_id: str, request_id: Optional[str] = None):
+    """Full STATE to one socket (resync)."""
+    # pending changes go out first, so the snapshot is at the latest version
+    flush_state(table_id)
+    outbox_put(ws, snapshot_message(table_id, request_id))
+
+
+def broadcast_state(table_id: str):
+    subscribers = list(TABLE_SUBSCRIBERS.get(table_id, ()))
+
+    # encode once; each subscriber's writer task delivers it at its own pace. Done even
+    # with nobody watching: the base and delta log are what clients RESUME from.
+    started = time.perf_counter()
+    frame = state_frame(table_id)
+    BROADCAST_ENCODE_SECONDS.observe(time.perf_counter() - started)
+    if not subscribers:
+        return
+    BROADCAST_FANOUT.observe(len(subscribers))
+    for ws in subscribers:
+        if not outbox_put(ws, frame, table_id):
+            TABLE_SUBSCRIBERS[table_id].discard(ws)
 
 
-def find_ps(table: TableState, seat_index: int) -> Optional[Dict[str, Any]]:
-    for ps in table.playerState:
-        if ps["seatIndex"] == seat_index:
-            return ps
+def snapshot_frame(ws: Any, table_id: str) -> Optional[Frame]:
+    """Full STATE for an outbox that had to drop this table's queued state frames."""
+    if table_id in TABLES:
+        return snapshot_message(table_id)
+    if not SHARDS.is_local(table_id):
+        # relayed from the owner: it resyncs the client, and the STATE comes back relayed too
+        asyncio.ensure_future(forward_message(ws, "RESYNC", None, {"tableId": table_id}))
     return None
 
 
-def next_seat_in_hand(table: TableState, current: int) -> Optional[int]:
-    """Next seat eligible to act (inHand, not folded, not all-in)."""
-    if not table.playersInHand:
-        return None
+def odds_jobs(table: TableState) -> Dict[int, EquityJob]:
+    """One equity job per hero still in the hand, keyed by seatIndex."""
+    actives = active_players(table)
+    board = list(table.communityCards)
+    jobs: Dict[int, EquityJob] = {}
+    for ps in actives:
+        seat = table.seats[ps.seatIndex]
+        hole = table.holeCards.get(seat.userId or "")
+        if hole:
+            jobs[ps.seatIndex] = EquityJob(list(hole), board, len(actives) - 1)
+    return jobs
 
-    ordered = sorted(table.playersInHand)
-    if current not in ordered:
-        for idx in ordered:
-            ps = find_ps(table, idx)
-            if ps and ps["inHand"] and (not ps["hasFolded"]) and (not ps["isAllIn"]):
-                return idx
-        return None
 
-    start_i = ordered.index(current)
-    for offset in range(1, len(ordered) + 1):
-        idx = ordered[(start_i + offset) % len(ordered)]
-        ps = find_ps(table, idx)
-        if ps and ps["inHand"] and (not ps["hasFolded"]) and (not ps["isAllIn"]):
-            return idx
+# Table actors ----------------------------
 
-    return None
+# tableId -> actor running that table's commands one at a time
+ACTORS: Dict[str, TableActor] = {}
+
+
+def actor_for(table_id: str) -> TableActor:
+    actor = ACTORS.get(table_id)
+    if actor is None:
+        actor = ACTORS[table_id] = TableActor(table_id, broadcast_state, TICKER)
+    return actor
+
+
+def mark_dirty(table: TableState):
+    """Table changed: broadcast at the end of the flush window."""
+    actor_for(table.tableId).mark_dirty()
+
+
+def after_flush(table: TableState, callback: Callable[[], None]):
+    """Private frames that must follow the pending changes: sent right after their broadcast."""
+    actor_for(table.tableId).after_flush(callback)
 
 
-def active_players(table: TableState) -> list[Dict[str, Any]]:
-    """Players still in the hand (not folded). All-in counts as active."""
-    return [ps for ps in table.playerState if ps.get("inHand") and (not ps.get("hasFolded"))]
+def flush_state(table_id: str):
+    """Broadcast pending changes now."""
+    actor = ACTORS.get(table_id)
+    if actor is not None:
+        actor.flush_now()
 
 
-def reset_street_bets_and_actions(table: TableState):
-    for ps in table.playerState:
-        ps["betThisStreet"] = 0
-        ps["actedThisStreet"] = False
-    table.currentBet = 0
-    table.minRaiseTo = 0
+# Session messages ----------------------------
 
+# answered by the node the client is connected to
 
-def betting_round_complete(table: TableState) -> bool:
+async def on_auth(ws: Any, request_id: Optional[str], payload: Dict[str, Any]):
+    token = payload.get("token")
+    if not token:
+        await send_error(ws, "NOT_AUTHENTICATED", "Missing token.", request_id=request_id)
+        return
+
+    stable = hashlib.sha256(token.encode("utf-8")).hexdigest()[:10]
+    user_id = f"usr_{stable}"
+    display_name = payload.get("displayName") or "Player"
+
+    bind_user_socket(ws, user_id)
+    SESSIONS[ws]["userId"] = user_id
+    SESSIONS[ws]["displayName"] = display_name
+
+    # frames from AUTH_OK on use the requested encoding, if this server has it
+    encoding = payload.get("encoding")
+    if encoding not in encodings():
+        encoding = JSON
+    SESSIONS[ws]["outbox"].encoding = encoding
+
+    await send(
+        ws,
+        "AUTH_OK",
+        {"userId": user_id, "displayName": display_name, "encoding": encoding},
+        request_id=request_id,
+    )
+
+
+async def on_list_tables(ws: Any, request_id: Optional[str], payload: Dict[str, Any]):
+    frame = tables_list_frame(payload, request_id)
+    if frame is None:
+        await send_error(ws, "INVALID_REQUEST", "Invalid lobby filter.", request_id=request_id)
+    else:
+        outbox_put(ws, frame)
+
+
+async def on_subscribe_lobby(ws: Any, request_id: Optional[str], payload: Dict[str, Any]):
+    # full list now, LOBBY_DELTA pushes after; flush first so the snapshot's
+    # lobbyVersion is the one the next delta starts from
+    flush_lobby()
+    LOBBY_SUBSCRIBERS.add(ws)
+    outbox_put(ws, encode_raw_message("LOBBY_SNAPSHOT", *LOBBY.query_encoded(), request_id))
+
+
+async def on_unsubscribe_lobby(ws: Any, request_id: Optional[str], payload: Dict[str, Any]):
+    LOBBY_SUBSCRIBERS.discard(ws)
+
+
+# Table messages ----------------------------
+
+# run on the table's actor (owner node), one at a time; they mark_dirty() instead of
+# broadcasting, and anything private that must follow the new state goes via after_flush()
+
+async def on_join_table(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    table_id = table.tableId
+    user_id = SESSIONS[ws]["userId"]
+
+    # If they already have a seat, mark them connected
+    my_seat = seat_of(table_id, user_id)
+    if my_seat is not None:
+        set_connected(table, my_seat, True)
+
+    # Ensure dealer is still seated (connected optional)
+    if table.dealerUserId is not None and seat_of(table_id, table.dealerUserId) is None:
+        set_dealer(table, None)
+
+    table_event(table, "PLAYER_JOINED_TABLE", SESSIONS[ws]["displayName"])
+    mark_dirty(table)
+    # existing subscribers get the window's changes as a delta; the joiner the resulting
+    # state in full, right after that broadcast (a reconnect storm shares one broadcast)
+    TABLE_SUBSCRIBERS[table_id].discard(ws)
+    after_flush(table, partial(finish_join, ws, table, request_id))
+
+
+def finish_join(ws: Any, table: TableState, request_id: Optional[str]):
+    session = SESSIONS.get(ws)
+    if session is None or session["tableId"] != table.tableId:
+        # disconnected or left again before the flush
+        return
+    TABLE_SUBSCRIBERS[table.tableId].add(ws)
+    outbox_put(ws, snapshot_message(table.tableId, request_id))
+
+    # If hand is in progress, resend their hole cards if known
+    user_id = session["userId"]
+    if table.status == "IN_HAND" and user_id in table.holeCards:
+        outbox_put(ws, encode_message("HOLE_CARDS", {"cards": ints_to_cards(table.holeCards[user_id])}))
+
+
+async def on_resume(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
     """
-    Betting round is complete when every player who can act (inHand, not folded, not all-in)
-    has acted this street AND is not facing an unmatched bet.
+    A reconnected client that already has the table up to `version`: it gets only what it
+    missed. Unlike JOIN_TABLE nothing changes for the other subscribers, unless the user's
+    seat had been marked disconnected.
     """
-    for ps in table.playerState:
-        if not ps["inHand"] or ps["hasFolded"] or ps["isAllIn"]:
-            continue
-        if not ps.get("actedThisStreet", False):
-            return False
-        if ps["betThisStreet"] != table.currentBet:
-            return False
-    return True
+    version = payload.get("version")
+    if not isinstance(version, int) or isinstance(version, bool):
+        await send_error(ws, "INVALID_REQUEST", "version must be an integer.", request_id=request_id)
+        return
+
+    my_seat = seat_of(table.tableId, SESSIONS[ws]["userId"])
+    if my_seat is not None and not table.seats[my_seat].isConnected:
+        set_connected(table, my_seat, True)
+        table_event(table, "PLAYER_RECONNECTED", table.seats[my_seat].displayName)
+        mark_dirty(table)
+    # caught up right after the pending changes go out, from the log that now includes them
+    TABLE_SUBSCRIBERS[table.tableId].discard(ws)
+    after_flush(table, partial(finish_resume, ws, table, version, request_id))
+
+
+def finish_resume(ws: Any, table: TableState, version: int, request_id: Optional[str]):
+    session = SESSIONS.get(ws)
+    if session is None or session["tableId"] != table.tableId:
+        return
+    table_id = table.tableId
+    TABLE_SUBSCRIBERS[table_id].add(ws)
+
+    base = TABLE_SNAPSHOTS.get(table_id)
+    frames = None
+    if base is not None:
+        log = DELTA_LOGS.get(table_id)
+        if version == base["version"]:
+            frames = []
+        elif log is not None:
+            frames = log.since(version, base["version"])
+    if frames is None:
+        # too far behind (or nothing to replay from): a full STATE answers the request
+        RESUME_STATS["snapshots"] += 1
+        outbox_put(ws, snapshot_message(table_id, request_id))
+    else:
+        RESUME_STATS["replayed"] += 1
+        RESUME_STATS["frames"] += len(frames)
+        for frame in frames:
+            outbox_put(ws, frame, table_id)
+        outbox_put(
+            ws,
+            encode_message(
+                "RESUMED",
+                {"tableId": table_id, "fromVersion": version, "version": base["version"], "replayed": len(frames)},
+                request_id,
+            ),
+        )
+
+    # a hand may have been dealt while the client was away
+    user_id = session["userId"]
+    if table.status == "IN_HAND" and user_id in table.holeCards:
+        outbox_put(ws, encode_message("HOLE_CARDS", {"cards": ints_to_cards(table.holeCards[user_id])}))
+
+
+async def on_leave_table(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    # Remove player from their seat
+    my_seat = seat_of(table.tableId, SESSIONS[ws]["userId"])
+    if my_seat is not None:
+        unseat(table, my_seat)
+
+    TABLE_SUBSCRIBERS[table.tableId].discard(ws)
+    table_event(table, "PLAYER_LEFT_TABLE", SESSIONS[ws]["displayName"])
+    mark_dirty(table)
+
+    # Send updated table list back to user
+    outbox_put(ws, tables_list_frame({}, request_id))
+
+
+async def on_resync(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    # client saw a version gap in STATE_DELTA (or just wants a snapshot)
+    await send_snapshot(ws, table.tableId, request_id=request_id)
+
+
+async def on_take_seat(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    seat_index = payload.get("seatIndex")
+    if seat_index is None or not isinstance(seat_index, int):
+        await send_error(ws, "INVALID_REQUEST", "seatIndex must be an integer.", request_id=request_id)
+        return
+    if seat_index < 0 or seat_index >= table.maxSeats:
+        await send_error(ws, "SEAT_OUT_OF_RANGE", "seatIndex out of range.", request_id=request_id)
+        return
+
+    user_id = SESSIONS[ws]["userId"]
+    display_name = SESSIONS[ws]["displayName"]
+
+    # block if already seated
+    if seat_of(table.tableId, user_id) is not None:
+        await send_error(ws, "ALREADY_SEATED", "You are already seated.", request_id=request_id)
+        return
+    if table.seats[seat_index].userId is not None:
+        await send_error(ws, "SEAT_TAKEN", "That seat is already taken.", request_id=request_id)
+        return
+
+    sit(table, seat_index, user_id, display_name, 1500)
+    table_event(table, "PLAYER_TOOK_SEAT", display_name, seat_index)
+
+    # assign dealer if none exists or dealer left
+    if seat_of(table.tableId, table.dealerUserId) is None:
+        set_dealer(table, user_id)
+        table_event(table, "DEALER_ASSIGNED", display_name)
+
+    mark_dirty(table)
+
+
+async def on_leave_seat(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    user_id = SESSIONS[ws]["userId"]
+    display_name = SESSIONS[ws]["displayName"]
+
+    my_seat = seat_of(table.tableId, user_id)
+    if my_seat is None:
+        await send_error(ws, "NOT_SEATED", "You are not seated.", request_id=request_id)
+        return
+
+    unseat(table, my_seat)
+    if table.dealerUserId == user_id:
+        successor = next((s for s in table.seats if s.userId is not None), None)
+        set_dealer(table, successor.userId if successor else None)
+        if successor is not None:
+            table_event(table, "DEALER_REASSIGNED", successor.displayName)
+
+    table_event(table, "PLAYER_LEFT_SEAT", display_name)
+    mark_dirty(table)
+
+
+async def on_start_hand(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    user_id = SESSIONS[ws]["userId"]
+    display_name = SESSIONS[ws]["displayName"]
+
+    if table.dealerUserId != user_id:
+        await send_error(ws, "NOT_AUTHORIZED", "Only the dealer can start a hand.", request_id=request_id)
+        return
+
+    seated = [s for s in table.seats if s.userId is not None]
+    if len(seated) < 2:
+        await send_error(ws, "INVALID_STATE", "Need at least 2 players seated.", request_id=request_id)
+        return
+
+    deck = DECKS.take()
+    start_hand(table, list(deck), display_name)
+    HISTORY.hand_start(table, deck, display_name)
+    HANDS.inc(1, ("started",))
+    lobby_touch(table)
+    mark_dirty(table)
+    arm_turn_clock(table)
+    # the new hand's STATE goes out before anyone's cards
+    deal = {s.userId: encode_message("HOLE_CARDS", {"cards": ints_to_cards(table.holeCards[s.userId])}) for s in seated}
+    after_flush(table, partial(send_hole_cards, table.tableId, deal))
+
+
+def send_hole_cards(table_id: str, deal: Dict[str, str]):
+    """Private HOLE_CARDS to every socket of each player that is watching the table."""
+    subscribers = TABLE_SUBSCRIBERS[table_id]
+    for user_id, frame in deal.items():
+        for player_ws in USER_SOCKETS.get(user_id, ()):
+            if player_ws in subscribers:
+                outbox_put(player_ws, frame)
+
+
+async def on_action(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    user_id = SESSIONS[ws]["userId"]
+    display_name = SESSIONS[ws]["displayName"]
+
+    if table.status != "IN_HAND":
+        await send_error(ws, "HAND_NOT_ACTIVE", "No hand is active.", request_id=request_id)
+        return
+
+    # find your seat
+    my_seat = seat_of(table.tableId, user_id)
+    if my_seat is None:
+        await send_error(ws, "NOT_SEATED", "You must be seated to act.", request_id=request_id)
+        return
+
+    if table.actingSeatIndex != my_seat:
+        await send_error(ws, "NOT_YOUR_TURN", "It is not your turn.", request_id=request_id)
+        return
+
+    error = take_action(table, my_seat, payload.get("action"), payload.get("amount", 0), display_name)
+    if error is not None:
+        await send_error(ws, error[0], error[1], request_id=request_id)
+
+
+def take_action(table: TableState, seat_index: int, action: Optional[str], amount: Any, display_name: str) -> Optional[tuple[str, str]]:
+    """The acting seat's action (from the player or their clock). Returns apply_action's error, if any."""
+    street = table.street
+    error = apply_action(table, seat_index, action, amount, display_name)
+    if error is not None:
+        return error
+    HISTORY.action(table, seat_index, action, amount, display_name)
+
+    if table.street != street or table.status != "IN_HAND":
+        # street advanced or hand ended: queued odds for this table are useless
+        ODDS.cancel_table(table.tableId)
+        lobby_touch(table)
+        if table.status != "IN_HAND":
+            HANDS.inc(1, ("finished",))
+    mark_dirty(table)
+    arm_turn_clock(table)
+    return None
+
+
+def arm_turn_clock(table: TableState):
+    """Restart the clock for whoever is to act now (O(1)); stop it when nobody is."""
+    if table.status == "IN_HAND" and table.actingSeatIndex is not None and table.actionClockMs > 0:
+        TURN_CLOCK.set(table.tableId, table.actionClockMs)
+    else:
+        TURN_CLOCK.cancel(table.tableId)
+
 
+def on_turn_expired(table_id: str):
+    """TURN_CLOCK fired: the timed-out move runs on the table's actor like any other command."""
+    table = TABLES.get(table_id)
+    if table is not None and table.actingSeatIndex is not None:
+        actor_for(table_id).submit(partial(act_for_timed_out, table, table.actingSeatIndex))
 
-def advance_street(table: TableState):
-    """Advance street and deal community cards. Expects table.deck to be populated."""
-    # reset per-street bets/actions
-    reset_street_bets_and_actions(table)
 
-    if table.street == "PREFLOP":
-        table.street = "FLOP"
-        table.communityCards.extend([table.deck.pop(), table.deck.pop(), table.deck.pop()])
-        bump_event(table, "FLOP_DEALT", "Flop dealt")
+async def act_for_timed_out(table: TableState, seat_index: int):
+    if table.tableId in TURN_CLOCK or table.status != "IN_HAND" or table.actingSeatIndex != seat_index:
+        # they acted (or the hand moved on) while this was queued
+        return
+    ps = find_ps(table, seat_index)
+    action = "CHECK" if ps is not None and ps.betThisStreet == table.currentBet else "FOLD"
+    take_action(table, seat_index, action, 0, table.seats[seat_index].displayName or "Player")
 
-    elif table.street == "FLOP":
-        table.street = "TURN"
-        table.communityCards.append(table.deck.pop())
-        bump_event(table, "TURN_DEALT", "Turn dealt")
 
-    elif table.street == "TURN":
-        table.street = "RIVER"
-        table.communityCards.append(table.deck.pop())
-        bump_event(table, "RIVER_DEALT", "River dealt")
+async def on_request_odds(ws: Any, table: TableState, request_id: Optional[str], payload: Dict[str, Any]):
+    user_id = SESSIONS[ws]["userId"]
 
-    elif table.street == "RIVER":
-        table.street = "SHOWDOWN"
-        bump_event(table, "SHOWDOWN", "Showdown")
+    if table.status != "IN_HAND":
+        await send_error(ws, "HAND_NOT_ACTIVE", "No hand is active.", request_id=request_id)
+        return
 
+    hero_seat = seat_of(table.tableId, user_id)
+    ps = find_ps(table, hero_seat) if hero_seat is not None else None
+    if not ps or ps.hasFolded or user_id not in table.holeCards:
+        await send_error(ws, "NOT_IN_HAND", "You are not in this hand.", request_id=request_id)
+        return
 
-def apply_player_stacks_to_seats(table: TableState):
-    """Write current in-hand stacks back to seat chips (so losses persist)."""
-    for ps in table.playerState:
-        seat = table.seats[ps["seatIndex"]]
-        seat.chips = int(ps["stack"])
+    # the batch is awaited off the actor, so the table keeps taking commands meanwhile
+    asyncio.ensure_future(send_odds(ws, table, hero_seat, table.street, table.version, odds_jobs(table), request_id))
 
 
-def end_hand_and_cleanup(
+async def send_odds(
+    ws: Any,
     table: TableState,
-    table_id: str,
-    winner_seat_index: int,
-    win_amount: int,
-    win_reason: str,
+    hero_seat: int,
+    street: str,
+    version: int,
+    jobs: Dict[int, EquityJob],
+    request_id: Optional[str],
 ):
-    """Award pot to winner and reset hand state."""
-    # persist current stacks to seats first (so other players lose chips)
-    apply_player_stacks_to_seats(table)
-
-    # award winnings
-    winner_seat = table.seats[winner_seat_index]
-    winner_seat.chips = int(winner_seat.chips) + int(win_amount)
-
-    bump_event(table, "HAND_ENDED", f"{winner_seat.displayName} wins {win_amount} ({win_reason})")
-
-    # reset hand fields
-    table.status = "LOBBY"
-    table.street = "NONE"
-    table.communityCards = []
-    table.currentBet = 0
-    table.minRaiseTo = 0
-    table.actingSeatIndex = None
-    table.playersInHand = []
-    table.playerState = []
-    table.pot = 0
-    table.holeCards = {}
-    table.deck = []
+    # every hero at this table (and any other table asking right now) is
+    # computed in one batch in a worker process; askers at this version share it
+    table_id = table.tableId
+    try:
+        seat_odds = await ODDS.request(
+            table_id,
+            version,
+            jobs,
+            is_current=lambda: TABLES.get(table_id) is table and table.version == version,
+        )
+    except PoolBusy:
+        await send_error(ws, "BUSY", "Odds are busy, try again shortly.", request_id=request_id)
+        return
+    except JobDropped:
+        await send_error(ws, "STALE_REQUEST", "The table moved on before odds were ready.", request_id=request_id)
+        return
+    odds = seat_odds.get(hero_seat)
+    if odds is None:
+        await send_error(ws, "STALE_REQUEST", "The table moved on before odds were ready.", request_id=request_id)
+        return
+    await send(
+        ws,
+        "ODDS_UPDATE",
+        {"tableId": table_id, "street": street, "heroSeatIndex": hero_seat, **odds},
+        request_id=request_id,
+    )
 
 
-# WS endpoint ----------------------------
+async def on_disconnect(ws: Any, table: TableState, user_id: Optional[str]):
+    """Client went away: mark it disconnected but DO NOT remove it from its seat."""
+    my_seat = seat_of(table.tableId, user_id)
+    # another tab of the same user still watching keeps the seat connected
+    still_watching = any(
+        other is not ws and other in TABLE_SUBSCRIBERS[table.tableId]
+        for other in USER_SOCKETS.get(user_id or "", ())
+    )
+    if my_seat is not None and not still_watching:
+        set_connected(table, my_seat, False)
+        table_event(table, "PLAYER_DISCONNECTED", table.seats[my_seat].displayName)
+        mark_dirty(table)
+
+
+# Dispatch ----------------------------
+
+SessionHandler = Callable[[Any, Optional[str], Dict[str, Any]], Awaitable[None]]
+TableHandler = Callable[[Any, TableState, Optional[str], Dict[str, Any]], Awaitable[None]]
+
+SESSION_HANDLERS: Dict[str, SessionHandler] = {
+    "AUTH": on_auth,
+    "LIST_TABLES": on_list_tables,
+    "SUBSCRIBE_LOBBY": on_subscribe_lobby,
+    "UNSUBSCRIBE_LOBBY": on_unsubscribe_lobby,
+}
+
+TABLE_HANDLERS: Dict[str, TableHandler] = {
+    "JOIN_TABLE": on_join_table,
+    "LEAVE_TABLE": on_leave_table,
+    "RESYNC": on_resync,
+    "RESUME": on_resume,
+    "TAKE_SEAT": on_take_seat,
+    "LEAVE_SEAT": on_leave_seat,
+    "START_HAND": on_start_hand,
+    "ACTION": on_action,
+    "REQUEST_ODDS": on_request_odds,
+}
+
+
+async def table_for_message(ws: Any, msg_type: str, request_id: Optional[str], payload: Dict[str, Any]) -> Optional[TableState]:
+    """The table a table message is for (sending the error if there is none)."""
+    session = SESSIONS[ws]
+    if msg_type in ("JOIN_TABLE", "RESUME"):
+        table_id = payload.get("tableId")
+        if not table_id:
+            await send_error(ws, "INVALID_REQUEST", "Missing tableId.", request_id=request_id)
+            return None
+        if msg_type == "RESUME" and table_id not in TABLES:
+            # only JOIN_TABLE creates tables
+            await send_error(ws, "TABLE_NOT_FOUND", "Table not found.", request_id=request_id)
+            return None
+        # set now, not when the actor gets to it: the socket's next messages may omit tableId
+        session["tableId"] = table_id
+        return get_or_create_table(table_id)
+
+    table_id = payload.get("tableId") or session.get("tableId")
+    if not table_id or table_id not in TABLES:
+        if msg_type == "LEAVE_TABLE":
+            await send_error(ws, "TABLE_NOT_FOUND", "Table not found.", request_id=request_id)
+        else:
+            await send_error(ws, "NOT_IN_TABLE", "Join a table first.", request_id=request_id)
+        return None
+    if msg_type == "LEAVE_TABLE" and session.get("tableId") == table_id:
+        session["tableId"] = None
+    return TABLES[table_id]
 
-@app.websocket("/ws")
-async def ws_endpoint(ws: WebSocket):
-    await ws.accept()
 
-    SESSIONS[ws] = {"userId": None, "displayName": None, "tableId": None}
+async def handle_message(ws: Any, msg_type: Optional[str], request_id: Optional[str], payload: Dict[str, Any]):
+    """
+    One client message. ws is the client's WebSocket, or a RemoteSocket when it is connected
+    to another node. Session messages are answered right away; table messages are queued on
+    the table's actor.
+    """
+    if msg_type != "AUTH" and not SESSIONS[ws].get("userId"):
+        await send_error(ws, "NOT_AUTHENTICATED", "Authenticate first using AUTH.", request_id=request_id)
+        return
 
-    try:
-        while True:
-            raw = await ws.receive_text()
-            try:
-                msg = json.loads(raw)
-                msg_type = msg.get("type")
-                request_id = msg.get("requestId")
-                payload = msg.get("payload") or {}
-            except Exception:
-                await send_error(ws, "BAD_MESSAGE", "Invalid JSON message.")
-                continue
+    started = time.perf_counter()
+    session_handler = SESSION_HANDLERS.get(msg_type or "")
+    if session_handler is not None:
+        await session_handler(ws, request_id, payload)
+        MESSAGE_SECONDS.observe(time.perf_counter() - started, (msg_type,))
+        return
 
-            # AUTH ----------------------------
-            if msg_type == "AUTH":
-                token = payload.get("token")
-                if not token:
-                    await send_error(ws, "NOT_AUTHENTICATED", "Missing token.", request_id=request_id)
-                    continue
+    handler = TABLE_HANDLERS.get(msg_type or "")
+    if handler is None:
+        await send_error(ws, "NOT_IMPLEMENTED", f"{msg_type} not implemented yet.", request_id=request_id)
+        return
 
-                stable = hashlib.sha256(token.encode("utf-8")).hexdigest()[:10]
-                user_id = f"usr_{stable}"
-                display_name = payload.get("displayName") or "Player"
+    table = await table_for_message(ws, msg_type, request_id, payload)
+    if table is None:
+        return
 
-                SESSIONS[ws]["userId"] = user_id
-                SESSIONS[ws]["displayName"] = display_name
+    async def command():
+        # the socket may have closed while this waited in the inbox
+        if ws in SESSIONS:
+            await handler(ws, table, request_id, payload)
+        MESSAGE_SECONDS.observe(time.perf_counter() - started, (msg_type,))
 
-                await send(ws, "AUTH_OK", {"userId": user_id, "displayName": display_name}, request_id=request_id)
-                continue
+    actor_for(table.tableId).submit(command)
 
-            # Require auth for everything else
-            if not SESSIONS[ws].get("userId"):
-                await send_error(ws, "NOT_AUTHENTICATED", "Authenticate first using AUTH.", request_id=request_id)
-                continue
 
-            # LIST_TABLES ----------------------------
-            if msg_type == "LIST_TABLES":
-                tables_list = []
-                for table_id, table in TABLES.items():
-                    seated_players = sum(1 for s in table.seats if s.userId is not None)
-                    player_names = [s.displayName for s in table.seats if s.userId is not None]
-                    tables_list.append(
-                        {
-                            "tableId": table_id,
-                            "name": table.name,
-                            "status": table.status,
-                            "playerCount": seated_players,
-                            "maxSeats": table.maxSeats,
-                            "players": player_names,
-                        }
-                    )
-                await send(ws, "TABLES_LIST", {"tables": tables_list}, request_id=request_id)
-                continue
+# Sharding ----------------------------
 
-            # JOIN_TABLE ----------------------------
-            if msg_type == "JOIN_TABLE":
-                table_id = payload.get("tableId")
-                if not table_id:
-                    await send_error(ws, "INVALID_REQUEST", "Missing tableId.", request_id=request_id)
-                    continue
-
-                table = get_or_create_table(table_id)
-                TABLE_SUBSCRIBERS[table_id].add(ws)
-                SESSIONS[ws]["tableId"] = table_id
-
-                user_id = SESSIONS[ws]["userId"]
-
-                # If they already have a seat, mark them connected
-                for seat in table.seats:
-                    if seat.userId == user_id:
-                        seat.isConnected = True
-
-                # Ensure dealer is still seated (connected optional)
-                dealer_valid = False
-                if table.dealerUserId is not None:
-                    for seat in table.seats:
-                        if seat.userId == table.dealerUserId:
-                            dealer_valid = True
-                            break
-                if not dealer_valid:
-                    table.dealerUserId = None
-
-                bump_event(table, "PLAYER_JOINED_TABLE", f"{SESSIONS[ws]['displayName']} joined table")
-                await broadcast_state(table_id)
-
-                # If hand is in progress, resend their hole cards if known
-                if table.status == "IN_HAND" and user_id in table.holeCards:
-                    await send(ws, "HOLE_CARDS", {"cards": table.holeCards[user_id]})
+# answered by whichever node the client is connected to; everything else goes to the table's owner
+NODE_LOCAL_MESSAGES = set(SESSION_HANDLERS)
 
-                continue
 
-            # LEAVE_TABLE ----------------------------
-            if msg_type == "LEAVE_TABLE":
-                table_id = payload.get("tableId") or SESSIONS[ws].get("tableId")
-                if not table_id or table_id not in TABLES:
-                    await send_error(ws, "TABLE_NOT_FOUND", "Table not found.", request_id=request_id)
-                    continue
-
-                table = TABLES[table_id]
-                user_id = SESSIONS[ws]["userId"]
-                display_name = SESSIONS[ws]["displayName"]
-
-                # Remove player from their seat
-                for s in table.seats:
-                    if s.userId == user_id:
-                        s.userId = None
-                        s.displayName = None
-                        s.chips = 0
-                        s.isConnected = False
-                        s.isSittingOut = False
-                        break
-
-                TABLE_SUBSCRIBERS[table_id].discard(ws)
-                if SESSIONS[ws].get("tableId") == table_id:
-                    SESSIONS[ws]["tableId"] = None
-
-                bump_event(table, "PLAYER_LEFT_TABLE", f"{display_name} left table")
-                await broadcast_state(table_id)
-
-                # Send updated table list back to user
-                tables_list = []
-                for tid, t in TABLES.items():
-                    seated_players = sum(1 for s in t.seats if s.userId is not None)
-                    player_names = [s.displayName for s in t.seats if s.userId is not None]
-                    tables_list.append(
-                        {
-                            "tableId": tid,
-                            "name": t.name,
-                            "status": t.status,
-                            "playerCount": seated_players,
-                            "maxSeats": t.maxSeats,
-                            "players": player_names,
-                        }
-                    )
-                await send(ws, "TABLES_LIST", {"tables": tables_list}, request_id=request_id)
-                continue
+def open_session(ws: Any) -> Dict[str, Any]:
+    outbox = Outbox(ws, partial(snapshot_frame, ws))
+    outbox.start()
+    session = {"userId": None, "displayName": None, "tableId": None, "outbox": outbox}
+    SESSIONS[ws] = session
+    return session
 
-            # require that they are in a table
-            table_id = payload.get("tableId") or SESSIONS[ws].get("tableId")
-            if not table_id or table_id not in TABLES:
-                await send_error(ws, "NOT_IN_TABLE", "Join a table first.", request_id=request_id)
-                continue
-            table = TABLES[table_id]
-
-            # TAKE_SEAT ----------------------------
-            if msg_type == "TAKE_SEAT":
-                seat_index = payload.get("seatIndex")
-                if seat_index is None or not isinstance(seat_index, int):
-                    await send_error(ws, "INVALID_REQUEST", "seatIndex must be an integer.", request_id=request_id)
-                    continue
-                if seat_index < 0 or seat_index >= table.maxSeats:
-                    await send_error(ws, "SEAT_OUT_OF_RANGE", "seatIndex out of range.", request_id=request_id)
-                    continue
-
-                user_id = SESSIONS[ws]["userId"]
-                display_name = SESSIONS[ws]["displayName"]
-
-                # block if already seated
-                for s in table.seats:
-                    if s.userId == user_id:
-                        await send_error(ws, "ALREADY_SEATED", "You are already seated.", request_id=request_id)
-                        break
-                else:
-                    seat = table.seats[seat_index]
-                    if seat.userId is not None:
-                        await send_error(ws, "SEAT_TAKEN", "That seat is already taken.", request_id=request_id)
-                    else:
-                        seat.userId = user_id
-                        seat.displayName = display_name
-                        seat.chips = 1500
-                        seat.isConnected = True
-                        bump_event(table, "PLAYER_TOOK_SEAT", f"{display_name} took seat {seat_index}")
-
-                        # assign dealer if none exists or dealer left
-                        dealer_still_seated = False
-                        if table.dealerUserId is not None:
-                            for s in table.seats:
-                                if s.userId == table.dealerUserId:
-                                    dealer_still_seated = True
-                                    break
-                        if table.dealerUserId is None or not dealer_still_seated:
-                            table.dealerUserId = user_id
-                            bump_event(table, "DEALER_ASSIGNED", f"{display_name} is dealer")
-
-                        await broadcast_state(table_id)
 
-                continue
+async def disconnect_session(ws: Any):
+    session = SESSIONS.get(ws, {})
+    table_id = session.get("tableId")
+    if table_id and table_id in TABLE_SUBSCRIBERS:
+        TABLE_SUBSCRIBERS[table_id].discard(ws)
+        table = TABLES.get(table_id)
+        if table is not None:
+            actor_for(table_id).submit(partial(on_disconnect, ws, table, session.get("userId")))
+
+
+def close_session(ws: Any):
+    LOBBY_SUBSCRIBERS.discard(ws)
+    session = SESSIONS.pop(ws, None)
+    if session:
+        unbind_user_socket(ws, session.get("userId"))
+        session["outbox"].close()
+
+
+async def forward_message(ws: WebSocket, msg_type: Optional[str], request_id: Optional[str], payload: Dict[str, Any]) -> bool:
+    """Send a table-scoped message to the node owning the table. False if this node should handle it."""
+    session = SESSIONS[ws]
+    if msg_type in NODE_LOCAL_MESSAGES or not session.get("userId"):
+        return False
+    table_id = payload.get("tableId") or session.get("tableId")
+    if not table_id or SHARDS.is_local(table_id):
+        return False
+    if msg_type == "RESUME" and table_id not in LOBBY:
+        # the owner announces its tables to the lobby; only JOIN_TABLE creates one
+        await send_error(ws, "TABLE_NOT_FOUND", "Table not found.", request_id=request_id)
+        return True
+
+    owner = SHARDS.owner(table_id)
+    message = {
+        "op": "msg",
+        "from": SHARDS.node_id,
+        "conn": session["connId"],
+        "userId": session["userId"],
+        "displayName": session["displayName"],
+        "msg": {"type": msg_type, "requestId": request_id, "payload": {**payload, "tableId": table_id}},
+    }
+    try:
+        await SHARDS.send(owner, message)
+    except BrokerUnavailable:
+        await send_error(ws, "SHARD_UNAVAILABLE", "That table's server is unavailable.", request_id=request_id)
+        return True
+    session["remoteNodes"].add(owner)
+
+    # track which table the connection is at, as the owner does for its stand-in
+    if msg_type in ("JOIN_TABLE", "RESUME"):
+        session["tableId"] = table_id
+    elif msg_type == "LEAVE_TABLE" and session.get("tableId") == table_id:
+        session["tableId"] = None
+    return True
 
-            # LEAVE_SEAT ----------------------------
-            if msg_type == "LEAVE_SEAT":
-                user_id = SESSIONS[ws]["userId"]
-                display_name = SESSIONS[ws]["displayName"]
-
-                removed = False
-                for s in table.seats:
-                    if s.userId == user_id:
-                        s.userId = None
-                        s.displayName = None
-                        s.chips = 0
-                        s.isConnected = False
-                        s.isSittingOut = False
-                        removed = True
-                        break
-
-                if not removed:
-                    await send_error(ws, "NOT_SEATED", "You are not seated.", request_id=request_id)
-                else:
-                    if table.dealerUserId == user_id:
-                        table.dealerUserId = None
-                        for s in table.seats:
-                            if s.userId is not None:
-                                table.dealerUserId = s.userId
-                                bump_event(table, "DEALER_REASSIGNED", f"{s.displayName} is now dealer")
-                                break
-
-                    bump_event(table, "PLAYER_LEFT_SEAT", f"{display_name} left their seat")
-                    await broadcast_state(table_id)
 
-                continue
+async def handle_remote(proxy: RemoteSocket, msg: Dict[str, Any]):
+    await handle_message(proxy, msg.get("type"), msg.get("requestId"), msg.get("payload") or {})
+
+
+async def on_shard_message(message: Dict[str, Any]):
+    """Broker delivery: client traffic for tables we own, frames for our clients, lobby updates."""
+    op = message.get("op")
+
+    if op == "msg":
+        key = (message["from"], message["conn"])
+        proxy = REMOTE_SOCKETS.get(key)
+        if proxy is None:
+            proxy = REMOTE_SOCKETS[key] = RemoteSocket(SHARDS.broker, message["from"], message["conn"], handle_remote)
+            open_session(proxy)
+        session = SESSIONS[proxy]
+        if session["userId"] != message["userId"]:
+            bind_user_socket(proxy, message["userId"])
+            session["userId"] = message["userId"]
+        session["displayName"] = message["displayName"]
+        proxy.inbox.put_nowait(message["msg"])
+
+    elif op == "frame":
+        ws = LOCAL_CONNS.get(message["conn"])
+        if ws is not None:
+            # table-state frames stay droppable on this side too
+            outbox_put(ws, Frame(message["frame"]), message.get("tableId"))
+
+    elif op == "close":
+        # the owner evicted the client's stand-in
+        ws = LOCAL_CONNS.get(message["conn"])
+        if ws is not None:
+            SESSIONS[ws]["outbox"].close()
+            asyncio.ensure_future(ws.close(code=message["code"], reason=message["reason"]))
+
+    elif op == "gone":
+        proxy = REMOTE_SOCKETS.pop((message["from"], message["conn"]), None)
+        if proxy is not None:
+            proxy.stop()
+            await disconnect_session(proxy)
+            close_session(proxy)
+
+    elif op == "lobby":
+        if LOBBY.merge(message["tables"]):
+            schedule_lobby_flush()
+        if message.get("hello"):
+            await publish_lobby(local_lobby_entries(), to=[message["from"]])
 
-            # START_HAND ----------------------------
-            if msg_type == "START_HAND":
-                user_id = SESSIONS[ws]["userId"]
-                display_name = SESSIONS[ws]["displayName"]
-
-                if table.dealerUserId != user_id:
-                    await send_error(ws, "NOT_AUTHORIZED", "Only the dealer can start a hand.", request_id=request_id)
-                    continue
-
-                seated = [s for s in table.seats if s.userId is not None]
-                if len(seated) < 2:
-                    await send_error(ws, "INVALID_STATE", "Need at least 2 players seated.", request_id=request_id)
-                    continue
-
-                # reset hand state
-                table.status = "IN_HAND"
-                table.handNumber += 1
-                table.street = "PREFLOP"
-                table.pot = 0
-                table.currentBet = 0
-                table.minRaiseTo = 0
-                table.communityCards = []
-
-                table.playersInHand = [s.seatIndex for s in seated]
-
-                table.playerState = []
-                for s in seated:
-                    table.playerState.append(
-                        {
-                            "seatIndex": s.seatIndex,
-                            "inHand": True,
-                            "hasFolded": False,
-                            "isAllIn": False,
-                            "stack": s.chips,
-                            "betThisStreet": 0,
-                            "betThisHand": 0,
-                            "actedThisStreet": False,
-                        }
-                    )
-
-                # create and persist deck
-                table.deck = shuffle_deck(create_deck())
-
-                # deal 2 hole cards per player (stored by userId)
-                table.holeCards = {}
-                for s in seated:
-                    c1 = table.deck.pop()
-                    c2 = table.deck.pop()
-                    table.holeCards[s.userId] = [c1, c2]
-
-                # v1 acting seat: smallest seat index in hand
-                table.actingSeatIndex = min(table.playersInHand)
-
-                bump_event(table, "HAND_STARTED", f"Hand #{table.handNumber} started by {display_name}")
-                await broadcast_state(table_id)
-
-                # send hole cards privately
-                for s in seated:
-                    for player_ws in TABLE_SUBSCRIBERS[table_id]:
-                        if SESSIONS.get(player_ws, {}).get("userId") == s.userId:
-                            await send(player_ws, "HOLE_CARDS", {"cards": table.holeCards[s.userId]})
-                            break
 
-                continue
+# WS endpoint ----------------------------
 
-            # ACTION ----------------------------
-            if msg_type == "ACTION":
-                user_id = SESSIONS[ws]["userId"]
-                display_name = SESSIONS[ws]["displayName"]
-
-                if table.status != "IN_HAND":
-                    await send_error(ws, "HAND_NOT_ACTIVE", "No hand is active.", request_id=request_id)
-                    continue
-
-                # find your seat
-                my_seat = None
-                for s in table.seats:
-                    if s.userId == user_id:
-                        my_seat = s.seatIndex
-                        break
-                if my_seat is None:
-                    await send_error(ws, "NOT_SEATED", "You must be seated to act.", request_id=request_id)
-                    continue
-
-                if table.actingSeatIndex != my_seat:
-                    await send_error(ws, "NOT_YOUR_TURN", "It is not your turn.", request_id=request_id)
-                    continue
-
-                ps = find_ps(table, my_seat)
-                if not ps or ps.get("hasFolded") or (not ps.get("inHand")):
-                    await send_error(ws, "INVALID_ACTION", "You cannot act right now.", request_id=request_id)
-                    continue
-
-                action = payload.get("action")
-                amount = payload.get("amount", 0)
-
-                to_call = max(0, int(table.currentBet) - int(ps["betThisStreet"]))
-
-                if action == "FOLD":
-                    ps["hasFolded"] = True
-                    ps["actedThisStreet"] = True
-                    bump_event(table, "PLAYER_ACTION", f"{display_name} folded")
-
-                elif action == "CHECK":
-                    if to_call != 0:
-                        await send_error(ws, "INVALID_ACTION", "Cannot check when facing a bet.", request_id=request_id)
-                        continue
-                    ps["actedThisStreet"] = True
-                    bump_event(table, "PLAYER_ACTION", f"{display_name} checked")
-
-                elif action == "CALL":
-                    pay = min(int(ps["stack"]), to_call)
-                    ps["stack"] -= pay
-                    ps["betThisStreet"] += pay
-                    ps["betThisHand"] += pay
-                    table.pot += pay
-                    if ps["stack"] == 0:
-                        ps["isAllIn"] = True
-                    ps["actedThisStreet"] = True
-                    bump_event(table, "PLAYER_ACTION", f"{display_name} called {pay}")
-
-                elif action in ("BET", "RAISE"):
-                    if not isinstance(amount, int) or amount <= 0:
-                        await send_error(ws, "INVALID_AMOUNT", "amount must be a positive integer.", request_id=request_id)
-                        continue
-
-                    add = min(int(amount), int(ps["stack"]))
-                    ps["stack"] -= add
-                    ps["betThisStreet"] += add
-                    ps["betThisHand"] += add
-                    table.pot += add
-
-                    # update currentBet if this is now the highest
-                    raised_bet_to = table.currentBet
-                    if ps["betThisStreet"] > table.currentBet:
-                        raised_bet_to = ps["betThisStreet"]
-                        table.currentBet = raised_bet_to
-
-                    if ps["stack"] == 0:
-                        ps["isAllIn"] = True
-
-                    # when someone bets/raises, everyone else needs to respond again:
-                    for other in table.playerState:
-                        if other["seatIndex"] != my_seat and other["inHand"] and (not other["hasFolded"]) and (not other["isAllIn"]):
-                            other["actedThisStreet"] = False
-
-                    ps["actedThisStreet"] = True
-                    bump_event(table, "PLAYER_ACTION", f"{display_name} raised {add}")
-
-                else:
-                    await send_error(ws, "INVALID_ACTION", "Unknown action.", request_id=request_id)
-                    continue
-
-                # If only one active player remains (everyone else folded), end immediately
-                actives = active_players(table)
-                if len(actives) == 1:
-                    winner_ps = actives[0]
-                    win_seat = int(winner_ps["seatIndex"])
-                    win_amount = int(table.pot)
-
-                    end_hand_and_cleanup(
-                        table,
-                        table_id,
-                        winner_seat_index=win_seat,
-                        win_amount=win_amount,
-                        win_reason="everyone folded",
-                    )
-                    await broadcast_state(table_id)
-                    continue
-
-                # Street progression: if betting round is complete, advance street / showdown
-                if betting_round_complete(table):
-                    advance_street(table)
-
-                    if table.street == "SHOWDOWN":
-                        # Step 5 placeholder: pick a winner at random among remaining players.
-                        # Step 6: replace with evaluator library + pot-splitting.
-                        remaining = active_players(table)
-                        winner_ps = random.choice(remaining)
-                        win_seat = int(winner_ps["seatIndex"])
-                        win_amount = int(table.pot)
-
-                        end_hand_and_cleanup(
-                            table,
-                            table_id,
-                            winner_seat_index=win_seat,
-                            win_amount=win_amount,
-                            win_reason="showdown (placeholder)",
-                        )
-                        await broadcast_state(table_id)
-                        continue
-
-                    # after advancing street, set next actor to first eligible from current
-                    table.actingSeatIndex = next_seat_in_hand(table, my_seat) or table.actingSeatIndex
-                    await broadcast_state(table_id)
-                    continue
-
-                # rotate turn normally
-                table.actingSeatIndex = next_seat_in_hand(table, my_seat)
-                table.version += 1
-                await broadcast_state(table_id)
+@app.websocket("/ws")
+async def ws_endpoint(ws: WebSocket):
+    await ws.accept()
+
+    session = open_session(ws)
+    session["connId"] = uuid.uuid4().hex
+    session["remoteNodes"] = set()
+    LOCAL_CONNS[session["connId"]] = ws
+
+    try:
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                # text frames are JSON; binary ones are MessagePack (wire.py)
+                raw = message.get("text")
+                msg = json.loads(raw) if raw is not None else unpack(message["bytes"])
+                msg_type = msg.get("type")
+                request_id = msg.get("requestId")
+                payload = msg.get("payload") or {}
+            except Exception:
+                await send_error(ws, "BAD_MESSAGE", "Invalid message.")
                 continue
 
-            # Anything else for now
-            await send_error(ws, "NOT_IMPLEMENTED", f"{msg_type} not implemented yet.", request_id=request_id)
+            if await forward_message(ws, msg_type, request_id, payload):
+                continue
+            await handle_message(ws, msg_type, request_id, payload)
 
     except WebSocketDisconnect:
-        # mark disconnected but DO NOT remove from seat
-        table_id = SESSIONS.get(ws, {}).get("tableId")
-        if table_id and table_id in TABLE_SUBSCRIBERS:
-            TABLE_SUBSCRIBERS[table_id].discard(ws)
-
-            user_id = SESSIONS.get(ws, {}).get("userId")
-            table = TABLES.get(table_id)
-            if table and user_id:
-                for seat in table.seats:
-                    if seat.userId == user_id:
-                        seat.isConnected = False
-                        bump_event(table, "PLAYER_DISCONNECTED", f"{seat.displayName} disconnected")
-                        try:
-                            await broadcast_state(table_id)
-                        except Exception:
-                            pass
+        await disconnect_session(ws)
 
     finally:
-        SESSIONS.pop(ws, None)
+        LOCAL_CONNS.pop(session["connId"], None)
+        for node in session["remoteNodes"]:
+            try:
+                await SHARDS.send(node, {"op": "gone", "from": SHARDS.node_id, "conn": session["connId"]})
+            except BrokerUnavailable:
+                pass
+        close_session(ws)
@@ -0,0 +1,165 @@
+"""
+Prometheus metrics.
+
+Counters, gauges and histograms are plain numbers and lists in dicts keyed by label
+values, rendered in the Prometheus text format only when /metrics is scraped. Recording
+is a dict lookup and an add (a histogram observation adds a bisect over its bucket
+bounds), so the per-message cost stays far below a microsecond; bench/metrics.py
+measures it. Values the server already keeps (sessions, tables, outbound counters) are
+read from callbacks at scrape time instead of being recorded twice.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence, TypeVar, Union
+
+# seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# counts (fan-out)
+SIZE_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# how often the loop-lag task wakes up
+LAG_INTERVAL_S = 0.5
+
+Labels = tuple
+# a callback returns one value, or a value per label tuple
+Sample = Union[float, Dict[Labels, float]]
+M = TypeVar("M", bound="Metric")
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), fn: Optional[Callable[[], Sample]] = None):
+        """fn, if given, is read at scrape time instead of recorded values."""
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.fn = fn
+        self.values: Dict[Labels, float] = {}
+
+    def samples(self) -> Dict[Labels, float]:
+        if self.fn is None:
+            return self.values
+        value = self.fn()
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.samples().items():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_num(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, labels: Labels = ()):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Labels = ()):
+        self.values[labels] = value
+
+
+class _Buckets:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, n: int):
+        self.counts = [0] * n
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.bounds = list(buckets)
+        self.children: Dict[Labels, _Buckets] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = _Buckets(len(self.bounds) + 1)
+        # bucket i counts values <= bounds[i]; the last one is +Inf
+        child.counts[bisect_left(self.bounds, value)] += 1
+        child.sum += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        bounds = [_num(b) for b in self.bounds] + ["+Inf"]
+        for labels, child in self.children.items():
+            total = 0
+            for bound, count in zip(bounds, child.counts):
+                total += count
+                le = _labels(self.label_names, labels, 'le="' + bound + '"')
+                lines.append(f"{self.name}_bucket{le} {total}")
+            suffix = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{suffix} {_num(child.sum)}")
+            lines.append(f"{self.name}_count{suffix} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def add(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class LoopLag:
+    """Samples how late the event loop wakes a sleeping task (a busy loop delays everything)."""
+
+    def __init__(self, histogram: Histogram, gauge: Gauge, interval_s: float = LAG_INTERVAL_S):
+        self.histogram = histogram
+        self.gauge = gauge
+        self.interval_s = interval_s
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval_s)
+            lag = max(0.0, loop.time() - started - self.interval_s)
+            self.histogram.observe(lag)
+            self.gauge.set(lag)
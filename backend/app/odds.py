@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .batch_equity import EquityJob, batch_equity
+from .equity_cache import EquityCache
+from .workers import BatchPool
+
+SeatOdds = Dict[int, Dict[str, Any]]
+
+
+def table_odds_batch(
+    tables: list[Dict[int, EquityJob]],
+    simulations: int,
+    time_budget_ms: Optional[float],
+) -> list[SeatOdds]:
+    """Worker-side: one batch_equity pass over every hero of every queued table."""
+    flat = [job for jobs in tables for job in jobs.values()]
+    results = iter(batch_equity(flat, simulations, time_budget_ms))
+    return [{seat: next(results) for seat in jobs} for jobs in tables]
+
+
+class OddsService:
+    """
+    REQUEST_ODDS front end. Heroes already in the equity cache (or preflop table)
+    are answered directly. The rest is keyed by (tableId, version) and covers every
+    uncached hero at that table, so other players asking at the same version share one
+    job, and queued tables are batched into a single vectorized pass in a worker process.
+    """
+
+    def __init__(
+        self,
+        simulations: int = 2000,
+        time_budget_ms: Optional[float] = None,
+        max_workers: int = 2,
+        max_queue: int = 256,
+        window_ms: float = 5.0,
+        cache_entries: int = 50_000,
+    ):
+        self.pool = BatchPool(
+            partial(table_odds_batch, simulations=simulations, time_budget_ms=time_budget_ms),
+            max_workers=max_workers,
+            max_queue=max_queue,
+            window_ms=window_ms,
+        )
+        self.cache = EquityCache(cache_entries)
+        # tableId -> (version, result) of the last finished request, for late askers
+        self._last: Dict[str, Tuple[int, SeatOdds]] = {}
+
+    async def request(
+        self,
+        table_id: str,
+        version: int,
+        jobs: Dict[int, EquityJob],
+        is_current: Callable[[], bool],
+    ) -> SeatOdds:
+        """Raises workers.PoolBusy when saturated, workers.JobDropped when cancelled/stale."""
+        last = self._last.get(table_id)
+        if last is not None and last[0] == version:
+            return last[1]
+
+        seat_odds: SeatOdds = {}
+        missing: Dict[int, EquityJob] = {}
+        for seat, job in jobs.items():
+            odds = self.cache.get(job.hero, job.board, job.n_opponents)
+            if odds is None:
+                missing[seat] = job
+            else:
+                seat_odds[seat] = odds
+
+        if missing:
+            computed: SeatOdds = await self.pool.submit((table_id, version), table_id, missing, is_current)
+            for seat, job in missing.items():
+                odds = computed.get(seat)
+                if odds is None:
+                    # coalesced onto a job whose own cache lookup had found this seat
+                    odds = self.cache.get(job.hero, job.board, job.n_opponents)
+                    if odds is None:
+                        continue
+                else:
+                    self.cache.put(job.hero, job.board, job.n_opponents, odds)
+                seat_odds[seat] = odds
+
+        self._last[table_id] = (version, seat_odds)
+        return seat_odds
+
+    def cancel_table(self, table_id: str):
+        """Street advanced or hand ended: queued/running odds for this table are useless."""
+        self._last.pop(table_id, None)
+        self.pool.cancel_group(table_id)
+
+    def start(self):
+        self.pool.start()
+
+    def shutdown(self):
+        self.pool.shutdown()
@@ -0,0 +1,189 @@
+"""
+Per-connection outbound queues.
+
+Every socket gets an Outbox: a bounded frame queue drained by its own writer task, so
+handlers never await a client's network. Table-state frames (STATE / STATE_DELTA) are
+droppable: on overflow they are collapsed into a single "snapshot" marker per table,
+which the writer turns into a full STATE of the current table when it gets there.
+Clients recover exactly because STATE is idempotent by version. Private frames
+(HOLE_CARDS, replies, errors) are never dropped; a consumer that can't keep up with
+those, or stays backlogged too long, is disconnected.
+
+Frames are queued as protocol.Frame objects; the writer sends their JSON text, or their
+packed binary form if the client negotiated one at AUTH.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import WebSocket
+
+from .protocol import Frame
+from .wire import JSON
+
+MAX_FRAMES = 256
+# a frame still queued after this long marks a slow consumer
+EVICT_AFTER_S = 10.0
+SEND_TIMEOUT_S = 5.0
+
+# close code for evicted consumers ("try again later")
+EVICT_CLOSE_CODE = 1013
+
+_FRAME = 0
+_STATE = 1
+_SNAPSHOT = 2
+
+# process-wide counters, exposed by the stats endpoint
+OUTBOUND_STATS: Dict[str, int] = {"sent": 0, "dropped": 0, "evicted": 0}
+# tableId -> bytes of the table-state frames sent for it (STATE / STATE_DELTA), for /metrics
+TABLE_BYTES: Dict[str, int] = {}
+
+
+class Outbox:
+    def __init__(
+        self,
+        ws: WebSocket,
+        snapshot: Callable[[str], Optional[Frame]],
+        max_frames: int = MAX_FRAMES,
+    ):
+        """snapshot(tableId) returns an encoded full STATE frame (or None if the table is gone)."""
+        self.ws = ws
+        self.snapshot = snapshot
+        # a sharding.RemoteSocket relays the tableId of state frames to the client's node
+        self._send_table_text = getattr(ws, "send_table_text", None)
+        self.max_frames = max_frames
+
+        # (kind, tableId, frame, queued_at)
+        self._queue: Deque[Tuple[int, Optional[str], Any, float]] = deque()
+        # tables with a snapshot marker waiting in the queue
+        self._snapshots: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        # wire encoding negotiated at AUTH
+        self.encoding = JSON
+
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, frame: Frame, table_id: Optional[str] = None) -> bool:
+        """
+        Queue an encoded frame. Pass table_id for STATE/STATE_DELTA frames to make them
+        droppable. Returns False if the outbox is closed (or just got evicted).
+        """
+        if self.closed:
+            return False
+
+        now = time.monotonic()
+        if self._queue and now - self._queue[0][3] > EVICT_AFTER_S:
+            self.evict("backlogged")
+            return False
+
+        if len(self._queue) >= self.max_frames and not self._conflate():
+            self.evict("queue full")
+            return False
+
+        if table_id is not None and table_id in self._snapshots:
+            # the pending snapshot will already carry this state
+            self._count_drop(1)
+            return True
+
+        self._queue.append((_STATE if table_id is not None else _FRAME, table_id, frame, now))
+        self._wakeup.set()
+        return True
+
+    def _conflate(self) -> bool:
+        """Replace queued state frames with one snapshot marker per table. False if nothing was droppable."""
+        kept: Deque[Tuple[int, Optional[str], Any, float]] = deque()
+        tables: list[str] = []
+        removed = 0
+        for item in self._queue:
+            kind, table_id, _, queued_at = item
+            if kind == _STATE:
+                removed += 1
+                if table_id not in tables and table_id not in self._snapshots:
+                    tables.append(table_id)
+                    kept.append((_SNAPSHOT, table_id, None, queued_at))
+            else:
+                kept.append(item)
+        if not removed or len(kept) >= self.max_frames:
+            return False
+        self._queue = kept
+        self._snapshots.update(tables)
+        self._count_drop(removed - len(tables))
+        return True
+
+    def _count_drop(self, n: int):
+        self.dropped += n
+        OUTBOUND_STATS["dropped"] += n
+
+    async def _run(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+
+                kind, table_id, frame, _ = self._queue.popleft()
+                if kind == _SNAPSHOT:
+                    self._snapshots.discard(table_id)
+                    frame = self.snapshot(table_id)
+                    if frame is None:
+                        continue
+
+                if self.encoding == JSON:
+                    text = frame.text
+                    if table_id is not None and self._send_table_text is not None:
+                        await asyncio.wait_for(self._send_table_text(text, table_id), SEND_TIMEOUT_S)
+                    else:
+                        await asyncio.wait_for(self.ws.send_text(text), SEND_TIMEOUT_S)
+                    # bytes on the wire: UTF-8, so only non-ASCII text needs encoding to measure
+                    size = len(text) if text.isascii() else len(text.encode("utf-8"))
+                else:
+                    data = frame.packed
+                    await asyncio.wait_for(self.ws.send_bytes(data), SEND_TIMEOUT_S)
+                    size = len(data)
+                self.sent += 1
+                OUTBOUND_STATS["sent"] += 1
+                if table_id is not None:
+                    TABLE_BYTES[table_id] = TABLE_BYTES.get(table_id, 0) + size
+        except asyncio.TimeoutError:
+            self.evict("send timeout")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # connection already gone; the endpoint's receive loop cleans up
+            self.close()
+
+    def evict(self, reason: str):
+        if self.closed:
+            return
+        self.close()
+        OUTBOUND_STATS["evicted"] += 1
+        asyncio.ensure_future(self._close_socket(reason))
+
+    async def _close_socket(self, reason: str):
+        try:
+            await self.ws.close(code=EVICT_CLOSE_CODE, reason=f"slow consumer: {reason}")
+        except Exception:
+            pass
+
+    def close(self):
+        """Stop the writer and discard anything still queued."""
+        self.closed = True
+        self._queue.clear()
+        self._snapshots.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
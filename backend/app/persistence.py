@@ -0,0 +1,275 @@
+"""
+Table snapshots.
+
+The hand history (history.py) is the write-ahead log: every table change is already
+appended there and group-committed. A snapshot is the full state of every table at
+one log position(), so a restart loads the newest snapshot and replays only the log
+records after that position instead of the whole history.
+
+Snapshots are compact tuple rows (no dataclass pickling), captured on the event loop in
+one pass so they are consistent with the log position, then compressed and written by a
+thread. Rows are cached per table by version, so tables that haven't changed since the
+previous snapshot are not re-encoded. Files are written to a temp name, fsynced and
+renamed into place; the newest KEEP_SNAPSHOTS are kept.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import logging
+import os
+import pickle
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .game import PlayerHandState, Seat, TableState, index_hand
+from .history import HandHistory, HistoryReader, apply_record
+
+SNAPSHOT_INTERVAL_S = 60.0
+KEEP_SNAPSHOTS = 2
+
+# 2: cards are ints (bytes in the row)
+FORMAT_VERSION = 2
+MAGIC = b"PKRSNAP1"
+
+Row = tuple
+Position = tuple[int, int]
+
+log = logging.getLogger(__name__)
+
+
+# Rows ----------------------------
+
+def encode_table(t: TableState) -> Row:
+    """Immutable snapshot row for one table (safe to hand to a writer thread)."""
+    return (
+        t.tableId,
+        t.name,
+        t.status,
+        t.maxSeats,
+        t.createdAt,
+        t.dealerUserId,
+        t.handNumber,
+        tuple((s.userId, s.displayName, s.chips, s.isConnected, s.isSittingOut) for s in t.seats),
+        t.buttonSeatIndex,
+        t.smallBlindSeatIndex,
+        t.bigBlindSeatIndex,
+        t.street,
+        bytes(t.communityCards),
+        t.pot,
+        t.currentBet,
+        t.minRaiseTo,
+        t.actingSeatIndex,
+        t.actionClockMs,
+        tuple(t.playersInHand),
+        tuple(
+            (p.seatIndex, p.stack, p.inHand, p.hasFolded, p.isAllIn, p.betThisStreet, p.betThisHand, p.actedThisStreet)
+            for p in t.playerState
+        ),
+        {uid: bytes(cards) for uid, cards in t.holeCards.items()},
+        bytes(t.deck),
+        dict(t.lastEvent),
+        t.version,
+    )
+
+
+def decode_table(row: Row) -> TableState:
+    (
+        table_id, name, status, max_seats, created_at, dealer, hand_number, seats,
+        button, small_blind, big_blind, street, community, pot, current_bet, min_raise_to,
+        acting, clock_ms, players_in_hand, player_state, hole_cards, deck, last_event, version,
+    ) = row
+    table = TableState(
+        tableId=table_id,
+        name=name,
+        status=status,
+        maxSeats=max_seats,
+        createdAt=created_at,
+        dealerUserId=dealer,
+        handNumber=hand_number,
+        seats=[Seat(i, *s) for i, s in enumerate(seats)],
+        buttonSeatIndex=button,
+        smallBlindSeatIndex=small_blind,
+        bigBlindSeatIndex=big_blind,
+        street=street,
+        communityCards=list(community),
+        pot=pot,
+        currentBet=current_bet,
+        minRaiseTo=min_raise_to,
+        actingSeatIndex=acting,
+        actionClockMs=clock_ms,
+        playersInHand=list(players_in_hand),
+        playerState=[PlayerHandState(*p) for p in player_state],
+        holeCards={uid: list(cards) for uid, cards in hole_cards.items()},
+        deck=list(deck),
+        lastEvent=dict(last_event),
+        version=version,
+    )
+    index_hand(table)
+    return table
+
+
+# Store ----------------------------
+
+def _snapshot_name(position: Position) -> str:
+    # sorts by log position
+    return f"{position[0]:08d}-{position[1]:012d}.snap"
+
+
+class SnapshotStore:
+    def __init__(self, directory: str, keep: int = KEEP_SNAPSHOTS):
+        self.directory = directory
+        self.keep = keep
+        # tableId -> (table, version, row)
+        self._rows: Dict[str, tuple[TableState, int, Row]] = {}
+        self.stats = {"snapshots": 0, "encoded": 0, "reused": 0, "bytes": 0}
+
+    def capture(self, tables: Iterable[TableState]) -> list[Row]:
+        """Rows for every table as of now. Must run on the event loop, between handlers."""
+        rows = []
+        cache: Dict[str, tuple[TableState, int, Row]] = {}
+        # a cold capture allocates a few tuples per table; keep the cyclic GC from
+        # rescanning the whole heap several times during the pass
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for t in tables:
+                cached = self._rows.get(t.tableId)
+                if cached is not None and cached[0] is t and cached[1] == t.version:
+                    self.stats["reused"] += 1
+                else:
+                    cached = (t, t.version, encode_table(t))
+                    self.stats["encoded"] += 1
+                cache[t.tableId] = cached
+                rows.append(cached[2])
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._rows = cache
+        return rows
+
+    def write(self, position: Position, rows: list[Row]) -> str:
+        """Write one snapshot file (blocking; run it in a thread). Returns its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        body = pickle.dumps((FORMAT_VERSION, position, time.time(), rows), protocol=pickle.HIGHEST_PROTOCOL)
+        data = MAGIC + zlib.compress(body, 1)
+        path = os.path.join(self.directory, _snapshot_name(position))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._fsync_dir()
+        self.stats["snapshots"] += 1
+        self.stats["bytes"] = len(data)
+        self._prune()
+        return path
+
+    def _fsync_dir(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _paths(self) -> list[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, n) for n in sorted(os.listdir(self.directory)) if n.endswith(".snap")]
+
+    def _prune(self):
+        for path in self._paths()[: -self.keep]:
+            os.unlink(path)
+
+    def latest(self) -> Optional[tuple[Position, list[Row]]]:
+        """(log position, rows) of the newest readable snapshot, or None."""
+        for path in reversed(self._paths()):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                if not data.startswith(MAGIC):
+                    continue
+                fmt, position, _, rows = pickle.loads(zlib.decompress(data[len(MAGIC) :]))
+            except (OSError, zlib.error, pickle.UnpicklingError, ValueError, EOFError):
+                # damaged file: fall back to the one before it
+                continue
+            if fmt == FORMAT_VERSION:
+                return tuple(position), rows
+        return None
+
+
+def restore(snapshot_dir: str, history_dir: str) -> Dict[str, TableState]:
+    """Every table as of the end of the log: newest snapshot plus the log records after it."""
+    tables: Dict[str, TableState] = {}
+    after: Optional[Position] = None
+    latest = SnapshotStore(snapshot_dir).latest()
+    if latest is not None:
+        after, rows = latest
+        for row in rows:
+            table = decode_table(row)
+            tables[table.tableId] = table
+
+    # DECK records collect per table until their HAND_START
+    decks: Dict[str, list[int]] = {}
+    for record in HistoryReader(history_dir).records(after=after):
+        table = apply_record(tables.get(record.tableId), record, decks.setdefault(record.tableId, []))
+        if table is not None:
+            tables[record.tableId] = table
+    return tables
+
+
+# Background snapshots ----------------------------
+
+class Snapshotter:
+    """Snapshots tables() every interval_s (and once more on close)."""
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        history: HandHistory,
+        tables: Callable[[], Iterable[TableState]],
+        interval_s: float = SNAPSHOT_INTERVAL_S,
+    ):
+        self.store = store
+        self.history = history
+        self.tables = tables
+        self.interval_s = interval_s
+        self._task: Optional[asyncio.Task] = None
+        self.last: Dict[str, Any] = {}
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.snapshot()
+            except Exception:
+                # keep snapshotting; the next interval may well succeed
+                log.exception("snapshot failed")
+
+    async def snapshot(self) -> str:
+        started = time.perf_counter()
+        position = self.history.position()
+        rows = self.store.capture(self.tables())
+        captured = time.perf_counter()
+        # the log up to `position` goes to disk before the snapshot that points past it
+        await self.history.flush()
+        path = await asyncio.to_thread(self.store.write, position, rows)
+        self.last = {
+            "path": path,
+            "tables": len(rows),
+            "captureMs": round((captured - started) * 1000, 2),
+            "totalMs": round((time.perf_counter() - started) * 1000, 2),
+        }
+        return path
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.snapshot()
@@ -0,0 +1,101 @@
+"""
+Message encoding shared by the server and the benches.
+
+Messages are {"type", "payload", "requestId"?} objects, encoded once into a Frame that is
+queued as-is on every recipient's outbox. A Frame keeps the message dict next to its JSON
+text, so binary sockets (wire.py) pack it straight from the dict, once per frame however
+many of them receive it. STATE_DELTA payloads come from diff_public() between two
+TableState.to_public() dicts. Nothing here touches server state, so importing it has no
+side effects.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+try:  # optional, noticeably faster than json for STATE frames
+    import orjson
+except ImportError:
+    orjson = None
+
+from .wire import WIRE_STATS, pack
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj)
+
+
+class Frame:
+    """
+    One encoded message. `text` is the JSON form; `packed` is the MessagePack form, built
+    from `msg` the first time a binary socket sends it. Frames relayed from another node
+    arrive as JSON text only (msg is None) and are parsed back for packing: each of those
+    goes to a single socket, so nothing is shared to save there.
+    """
+
+    __slots__ = ("text", "msg", "_packed")
+
+    def __init__(self, text: str, msg: Optional[Dict[str, Any]] = None):
+        self.text = text
+        self.msg = msg
+        self._packed: Optional[bytes] = None
+
+    @property
+    def packed(self) -> bytes:
+        if self._packed is not None:
+            WIRE_STATS["reused"] += 1
+            return self._packed
+        msg = self.msg
+        if msg is None:
+            msg = orjson.loads(self.text) if orjson is not None else json.loads(self.text)
+        self._packed = pack(msg)
+        WIRE_STATS["packed"] += 1
+        return self._packed
+
+
+def encode_message(msg_type: str, payload: Dict[str, Any], request_id: Optional[str] = None) -> Frame:
+    msg = {"type": msg_type, "payload": payload}
+    if request_id is not None:
+        msg["requestId"] = request_id
+    return Frame(dumps(msg), msg)
+
+
+def encode_raw_message(
+    msg_type: str, payload: Dict[str, Any], payload_json: str, request_id: Optional[str] = None
+) -> Frame:
+    """encode_message for a payload that is already encoded (cached lobby lists, STATE bases)."""
+    msg = {"type": msg_type, "payload": payload}
+    tail = ""
+    if request_id is not None:
+        msg["requestId"] = request_id
+        tail = f',"requestId":{dumps(request_id)}'
+    return Frame(f'{{"type":{dumps(msg_type)},"payload":{payload_json}{tail}}}', msg)
+
+
+# list fields patched element-wise in STATE_DELTA (when their length is unchanged)
+DELTA_ITEM_FIELDS = ("seats", "playerState")
+
+
+def diff_public(old: Dict[str, Any], new: Dict[str, Any]) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (set, items) between two to_public() dicts: `set` holds top-level fields to replace,
+    `items` holds {field: {index: {key: value}}} patches for seats/playerState entries.
+    """
+    changed: Dict[str, Any] = {}
+    items: Dict[str, Any] = {}
+    for key, value in new.items():
+        before = old.get(key)
+        if before == value:
+            continue
+        if key in DELTA_ITEM_FIELDS and isinstance(before, list) and len(before) == len(value):
+            patches = {}
+            for i, (a, b) in enumerate(zip(before, value)):
+                if a != b:
+                    patches[str(i)] = {f: v for f, v in b.items() if a.get(f) != v}
+            items[key] = patches
+        else:
+            changed[key] = value
+    return changed, items
@@ -0,0 +1,78 @@
+"""
+Showdown settlement: main and side pots, split pots and odd chips.
+
+Pots come from each player's betThisHand in one pass over the contributions sorted by
+size: every live (not folded) player's total closes a pot that holds everyone's chips
+up to that level, and the players who reached it are the ones eligible to win it. Folded
+players' chips go into the pots their contribution reaches; they can't win any of them.
+A top pot with a single eligible player is the uncalled part of their bet coming back.
+
+All live hands are scored once, in a single evaluate_batch call, and each pot is then
+awarded from those scores: split evenly among its best hands, with any odd chips going
+one at a time to the winners nearest the button's left.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .evaluator import evaluate_batch
+
+
+@dataclass(slots=True)
+class Pot:
+    amount: int
+    eligible: list[int]  # seat indexes, in seat order
+
+
+def build_pots(contributions: Sequence[tuple[int, int, bool]]) -> list[Pot]:
+    """Pots, main pot first, from (seatIndex, betThisHand, folded) per player in the hand."""
+    order = sorted(contributions, key=lambda c: c[1])
+    pots: list[Pot] = []
+    level = 0
+    # chips between the last closed level and the current one
+    pending = 0
+    for i, (_, amount, folded) in enumerate(order):
+        # everyone from here on put in at least `amount`
+        pending += (amount - level) * (len(order) - i)
+        level = amount
+        if folded or not pending:
+            continue
+        eligible = sorted(seat for seat, _, is_folded in order[i:] if not is_folded)
+        pots.append(Pot(pending, eligible))
+        pending = 0
+    if not pots:
+        # nothing was bet: the live hands still play for the (empty) pot
+        pots.append(Pot(pending, sorted(seat for seat, _, folded in order if not folded)))
+    elif pending:
+        # folded chips above the biggest live contribution
+        pots[-1].amount += pending
+    return pots
+
+
+def score_hands(holes: Dict[int, Sequence[int]], board: Sequence[int]) -> Dict[int, int]:
+    """seatIndex -> hand score for every seat in `holes` (int cards), in one batch."""
+    seats = list(holes)
+    hands = np.array([list(holes[seat]) + list(board) for seat in seats], dtype=np.intp)
+    return dict(zip(seats, evaluate_batch(hands).tolist()))
+
+
+def award(pots: Sequence[Pot], scores: Dict[int, int], button: Optional[int] = None) -> Dict[int, int]:
+    """seatIndex -> chips won across all pots. Seats without a score can't win."""
+    payouts: Dict[int, int] = {}
+    for pot in pots:
+        contenders = [seat for seat in pot.eligible if seat in scores]
+        if not contenders:
+            contenders = pot.eligible
+        best = max((scores.get(seat, -1) for seat in contenders), default=-1)
+        winners = [seat for seat in contenders if scores.get(seat, -1) == best]
+        share, odd = divmod(pot.amount, len(winners))
+        if odd and button is not None:
+            # odd chips start left of the button
+            winners.sort(key=lambda seat: (seat <= button, seat))
+        for i, seat in enumerate(winners):
+            payouts[seat] = payouts.get(seat, 0) + share + (1 if i < odd else 0)
+    return payouts
@@ -0,0 +1,246 @@
+"""
+Table sharding across worker processes.
+
+Every table is owned by exactly one node (worker process), picked by a consistent-hash
+ring over the node ids, so adding a node only moves ~1/n of the tables. A client may be
+connected to any node: table-scoped messages are forwarded to the owner through a
+Broker, handled there against a RemoteSocket stand-in for the client's websocket, and
+the owner's outgoing frames travel back the same way.
+
+Brokers:
+  * InProcessBroker: every node lives in this process (single-node deployments, tests)
+  * UnixSocketBroker: one unix socket per node in a shared directory (local workers)
+
+Broker messages are small dicts with an "op" field; see main.on_shard_message.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import struct
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+# ring points per node; more points -> more even spread
+VNODES = 64
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_LEN = struct.Struct(">I")
+
+
+class BrokerUnavailable(Exception):
+    """The target node could not be reached."""
+
+
+def _point(key: str) -> int:
+    # stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[str], vnodes: int = VNODES):
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        self.nodes = list(nodes)
+        ring = sorted((_point(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._points = [p for p, _ in ring]
+        self._owners = [n for _, n in ring]
+
+    def owner(self, key: str) -> str:
+        i = bisect.bisect(self._points, _point(key))
+        return self._owners[i % len(self._owners)]
+
+
+# Brokers ----------------------------
+
+class Broker(ABC):
+    """Delivers messages between nodes. Messages from one node to another arrive in order."""
+
+    @abstractmethod
+    async def start(self, node_id: str, handler: Handler):
+        """Start delivering this node's messages to handler."""
+
+    @abstractmethod
+    async def send(self, node_id: str, message: Dict[str, Any]):
+        """Queue message for node_id. Raises BrokerUnavailable if it can't be reached."""
+
+    async def close(self):
+        pass
+
+
+class InProcessBroker(Broker):
+    """All nodes share this object; each node drains its own queue in order."""
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, node_id: str, handler: Handler):
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[node_id] = queue
+        self._tasks.append(asyncio.create_task(self._drain(queue, handler)))
+
+    async def _drain(self, queue: asyncio.Queue, handler: Handler):
+        while True:
+            await handler(await queue.get())
+
+    async def send(self, node_id: str, message: Dict[str, Any]):
+        queue = self._queues.get(node_id)
+        if queue is None:
+            raise BrokerUnavailable(node_id)
+        queue.put_nowait(message)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queues = {}
+
+
+class UnixSocketBroker(Broker):
+    """
+    Node <id> listens on <socket_dir>/<id>.sock. Frames are a 4-byte big-endian length
+    followed by a JSON message; one outbound connection per peer keeps them in order.
+    """
+
+    def __init__(self, socket_dir: str):
+        self.socket_dir = socket_dir
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Dict[str, asyncio.StreamWriter] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._handler: Optional[Handler] = None
+
+    def path(self, node_id: str) -> str:
+        return os.path.join(self.socket_dir, f"{node_id}.sock")
+
+    async def start(self, node_id: str, handler: Handler):
+        self._handler = handler
+        os.makedirs(self.socket_dir, exist_ok=True)
+        path = self.path(node_id)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._serve, path=path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                (size,) = _LEN.unpack(await reader.readexactly(_LEN.size))
+                await self._handler(json.loads(await reader.readexactly(size)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _writer(self, node_id: str) -> asyncio.StreamWriter:
+        writer = self._writers.get(node_id)
+        if writer is not None and not writer.is_closing():
+            return writer
+        lock = self._locks.setdefault(node_id, asyncio.Lock())
+        async with lock:
+            writer = self._writers.get(node_id)
+            if writer is None or writer.is_closing():
+                try:
+                    _, writer = await asyncio.open_unix_connection(self.path(node_id))
+                except OSError as exc:
+                    raise BrokerUnavailable(node_id) from exc
+                self._writers[node_id] = writer
+        return writer
+
+    async def send(self, node_id: str, message: Dict[str, Any]):
+        data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        writer = await self._writer(node_id)
+        try:
+            writer.write(_LEN.pack(len(data)) + data)
+            await writer.drain()
+        except ConnectionError as exc:
+            self._writers.pop(node_id, None)
+            raise BrokerUnavailable(node_id) from exc
+
+    async def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+
+# Remote connections ----------------------------
+
+class RemoteSocket:
+    """
+    Owner-side stand-in for a websocket connected to another node. Quacks like the
+    parts of WebSocket the game code uses (send_text / close), plus send_table_text for
+    table-state frames, which the client's node queues as droppable; inbound messages are
+    handled one at a time, in arrival order, like the real receive loop does.
+    """
+
+    def __init__(self, broker: Broker, origin: str, conn_id: str, handle: Callable[["RemoteSocket", Dict[str, Any]], Awaitable[None]]):
+        self.broker = broker
+        self.origin = origin
+        self.conn_id = conn_id
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(handle))
+
+    async def _run(self, handle: Callable[["RemoteSocket", Dict[str, Any]], Awaitable[None]]):
+        while True:
+            await handle(self, await self.inbox.get())
+
+    async def send_text(self, frame: str):
+        await self.broker.send(self.origin, {"op": "frame", "conn": self.conn_id, "frame": frame})
+
+    async def send_table_text(self, frame: str, table_id: str):
+        await self.broker.send(self.origin, {"op": "frame", "conn": self.conn_id, "frame": frame, "tableId": table_id})
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        await self.broker.send(self.origin, {"op": "close", "conn": self.conn_id, "code": code, "reason": reason})
+
+    def stop(self):
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+
+class ShardRouter:
+    def __init__(self, node_id: str, nodes: Sequence[str], broker: Broker):
+        self.node_id = node_id
+        self.ring = HashRing(nodes)
+        self.broker = broker
+
+    @property
+    def peers(self) -> list[str]:
+        return [n for n in self.ring.nodes if n != self.node_id]
+
+    def owner(self, table_id: str) -> str:
+        return self.ring.owner(table_id)
+
+    def is_local(self, table_id: str) -> bool:
+        return len(self.ring.nodes) == 1 or self.ring.owner(table_id) == self.node_id
+
+    async def start(self, handler: Handler):
+        await self.broker.start(self.node_id, handler)
+
+    async def send(self, node_id: str, message: Dict[str, Any]):
+        await self.broker.send(node_id, message)
+
+    async def close(self):
+        await self.broker.close()
+
+
+def router_from_env() -> ShardRouter:
+    """
+    POKER_NODE_ID   this worker's id (default "node-0")
+    POKER_NODES     comma-separated ids of every worker (default: just this one)
+    POKER_IPC_DIR   directory for the workers' unix sockets
+    """
+    node_id = os.environ.get("POKER_NODE_ID", "node-0")
+    nodes = [n.strip() for n in os.environ.get("POKER_NODES", node_id).split(",") if n.strip()]
+    if node_id not in nodes:
+        raise ValueError(f"POKER_NODE_ID {node_id!r} is not listed in POKER_NODES")
+    if len(nodes) == 1:
+        return ShardRouter(node_id, nodes, InProcessBroker())
+    return ShardRouter(node_id, nodes, UnixSocketBroker(os.environ.get("POKER_IPC_DIR", "/tmp/poker-ipc")))
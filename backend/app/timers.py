@@ -0,0 +1,117 @@
+"""
+Turn timers for every table on one hashed timing wheel.
+
+A ring of `slots` buckets, one per tick: a timer due at tick t lives in bucket
+t % slots, keyed by its owner (the tableId). Setting, resetting and cancelling a
+timer are dict operations, O(1) however many tables are running, and one task
+advances the wheel a tick at a time, looking only at the bucket under the cursor.
+Deadlines further out than one turn of the wheel just stay in their bucket until
+the cursor comes round on the right lap.
+
+This replaces one call_later handle per turn (a heap insert and a cancelled entry
+left behind on every action) with a single task; it sleeps while no timer is set.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, Hashable, Optional
+
+TICK_MS = 100
+SLOTS = 512
+
+log = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    def __init__(
+        self,
+        on_expire: Callable[[Hashable], None],
+        tick_ms: float = TICK_MS,
+        slots: int = SLOTS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """on_expire(key) runs on the loop for each timer that fires."""
+        self.on_expire = on_expire
+        self.tick_ms = tick_ms
+        self.clock = clock
+        self._slots: list[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        # key -> deadline tick (its bucket is deadline % slots)
+        self._deadlines: Dict[Hashable, int] = {}
+        self._tick = self._now_tick()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"set": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def _now_tick(self) -> int:
+        return int(self.clock() * 1000 / self.tick_ms)
+
+    def set(self, key: Hashable, delay_ms: float):
+        """(Re)arm key's timer to fire in delay_ms, replacing any pending one."""
+        self.cancel(key)
+        if not self._deadlines:
+            # the cursor stood still while the wheel was empty
+            self._tick = self._now_tick()
+        # at least one tick out, so the cursor can't have passed it already
+        ticks = max(1, math.ceil(delay_ms / self.tick_ms))
+        deadline = max(self._now_tick() + ticks, self._tick + 1)
+        self._slots[deadline % len(self._slots)][key] = deadline
+        self._deadlines[key] = deadline
+        self.stats["set"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable):
+        deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            del self._slots[deadline % len(self._slots)][key]
+
+    def advance(self) -> list[Hashable]:
+        """Move the cursor up to now and return the keys that expired (already removed)."""
+        now = self._now_tick()
+        expired: list[Hashable] = []
+        slots = len(self._slots)
+        # after a long stall one lap visits every bucket; deadlines are checked against now
+        start = max(self._tick + 1, now - slots + 1)
+        for tick in range(start, now + 1):
+            bucket = self._slots[tick % slots]
+            if not bucket:
+                continue
+            due = [key for key, deadline in bucket.items() if deadline <= now]
+            for key in due:
+                del bucket[key]
+                del self._deadlines[key]
+            expired.extend(due)
+        self._tick = max(self._tick, now)
+        return expired
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if not self._deadlines:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await asyncio.sleep(self.tick_ms / 1000.0)
+            for key in self.advance():
+                self.stats["expired"] += 1
+                try:
+                    self.on_expire(key)
+                except Exception:
+                    log.exception("timer %r: expiry handler failed", key)
@@ -0,0 +1,101 @@
+"""
+Binary wire format.
+
+A client may ask for "msgpack" in AUTH; frames to that socket then go out as binary
+MessagePack instead of JSON text. Known field names are sent as small integer tags
+(their index in KEYS, one byte each) and card lists as one byte per card int
+(cards.py), packed as a bin value. Names not in KEYS pass through as strings, so new
+fields work before they get a tag. frontend/src/wire.js decodes with the same table.
+
+Messages are still encoded as JSON once; protocol.Frame packs the same message dict the
+first time a binary socket sends it and keeps the bytes on the frame, so a broadcast is
+packed once however many binary subscribers it has, and a server with no binary clients
+does no extra work.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+try:  # optional: without it every client gets JSON
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from .cards import CARD_INTS, ints_to_cards
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+# tag = index. Append only: clients decode with the same list.
+KEYS = (
+    # message
+    "type", "payload", "requestId",
+    # table (TableState.to_public)
+    "tableId", "name", "status", "maxSeats", "createdAt", "dealerUserId", "handNumber",
+    "seats", "buttonSeatIndex", "smallBlindSeatIndex", "bigBlindSeatIndex", "street",
+    "communityCards", "pot", "currentBet", "minRaiseTo", "actingSeatIndex",
+    "actionClockMs", "playersInHand", "playerState", "lastEvent", "version",
+    # seats / playerState / lastEvent
+    "seatIndex", "userId", "displayName", "chips", "isConnected", "isSittingOut",
+    "inHand", "hasFolded", "isAllIn", "stack", "betThisStreet", "betThisHand",
+    "actedThisStreet", "eventId", "at", "summary",
+    # STATE / STATE_DELTA / HOLE_CARDS
+    "table", "fromVersion", "set", "items", "cards",
+    # lobby
+    "tables", "total", "offset", "lobbyVersion", "playerCount", "players",
+    # odds
+    "heroSeatIndex", "winPct", "tiePct", "losePct", "mostLikelyWinMethod", "topOutcomes",
+    "hand", "pct", "simulations",
+    # errors / auth
+    "code", "message", "details", "encoding",
+    # RESUMED
+    "replayed",
+)
+TAGS: Dict[str, int] = {key: i for i, key in enumerate(KEYS)}
+# values sent as one byte per card
+CARD_KEYS = frozenset({"communityCards", "cards"})
+_CARD_TAGS = tuple(TAGS[key] for key in CARD_KEYS)
+_NESTED = (dict, list)
+_tag = TAGS.get
+
+WIRE_STATS: Dict[str, int] = {"packed": 0, "reused": 0}
+
+
+def encodings() -> tuple[str, ...]:
+    """Encodings this server can send."""
+    return (JSON, MSGPACK) if msgpack is not None else (JSON,)
+
+
+def compact(value: Any) -> Any:
+    """Field names -> tags and card lists -> bytes, recursively (dicts and lists of them)."""
+    if type(value) is dict:
+        out = {_tag(key, key): compact(item) if type(item) in _NESTED else item for key, item in value.items()}
+        for tag in _CARD_TAGS:
+            cards = out.get(tag)
+            if type(cards) is list:
+                out[tag] = bytes([CARD_INTS[c] for c in cards])
+        return out
+    return [compact(item) if type(item) in _NESTED else item for item in value]
+
+
+def _expand(value: Dict[Any, Any]) -> Dict[str, Any]:
+    """msgpack object_hook: one decoded map, innermost first."""
+    out = {}
+    for key, item in value.items():
+        if type(key) is int:
+            key = KEYS[key]
+        if type(item) is bytes and key in CARD_KEYS:
+            item = ints_to_cards(item)
+        out[key] = item
+    return out
+
+
+def pack(msg: Any) -> bytes:
+    return msgpack.packb(compact(msg), use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    """A binary frame (from either side) back to the JSON-shaped message."""
+    return msgpack.unpackb(data, raw=False, strict_map_key=False, object_hook=_expand)
+
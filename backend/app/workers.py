@@ -0,0 +1,173 @@
+"""
+Process pool for CPU-heavy jobs (equity simulation).
+
+The event loop only enqueues jobs and awaits futures; the simulation itself runs in
+worker processes so it never holds the loop's GIL.
+
+  * bounded queue: submit() raises PoolBusy instead of piling up work
+  * coalescing: a job whose key is already queued/running shares that job's future
+  * cancellation: cancel_group() drops every job of a group (e.g. a table whose street
+    advanced); queued jobs never start, running ones have their result discarded
+  * staleness: each job carries an is_current() check that runs when the job is
+    dequeued, so work for a table version that has moved on is dropped before any
+    compute is spent
+  * batching: a dispatcher drains whatever is queued (after a short window) and sends
+    it to one worker as a single batch_fn call
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class PoolBusy(Exception):
+    """The job queue is full."""
+
+
+class JobDropped(Exception):
+    """The job was cancelled or went stale before it produced a result."""
+
+
+@dataclass
+class _Job:
+    key: Hashable
+    group: Hashable
+    payload: Any
+    is_current: Callable[[], bool]
+    future: asyncio.Future = field(repr=False)
+
+
+class BatchPool:
+    def __init__(
+        self,
+        batch_fn: Callable[[list[Any]], list[Any]],
+        max_workers: int = 2,
+        max_queue: int = 256,
+        max_batch: int = 64,
+        window_ms: float = 5.0,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        """
+        batch_fn runs in a worker process: it receives a list of job payloads and must
+        return one result per payload, in order. It has to be a picklable top-level function.
+        """
+        self.batch_fn = batch_fn
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.window_ms = window_ms
+        self.initializer = initializer
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._jobs: Dict[Hashable, _Job] = {}
+
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "dropped": 0, "batches": 0}
+
+    def start(self):
+        """Create the executor and dispatchers. Needs a running loop; submit() calls it lazily."""
+        if self._queue is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+        )
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.max_workers)]
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(
+        self,
+        key: Hashable,
+        group: Hashable,
+        payload: Any,
+        is_current: Callable[[], bool] = lambda: True,
+    ) -> Any:
+        """Queue a job (or join an identical one) and await its result."""
+        self.start()
+        job = self._jobs.get(key)
+        if job is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(job.future)
+
+        if self._queue.full():
+            self.stats["rejected"] += 1
+            raise PoolBusy()
+
+        job = _Job(key, group, payload, is_current, asyncio.get_running_loop().create_future())
+        self._jobs[key] = job
+        self._queue.put_nowait(job)
+        self.stats["submitted"] += 1
+        return await asyncio.shield(job.future)
+
+    def cancel_group(self, group: Hashable):
+        for key, job in list(self._jobs.items()):
+            if job.group == group:
+                self._drop(job)
+
+    def _drop(self, job: _Job):
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        if not job.future.done():
+            job.future.set_exception(JobDropped())
+            # nobody may be awaiting it any more; don't warn about it
+            job.future.exception()
+        self.stats["dropped"] += 1
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            queued = [await self._queue.get()]
+            if self.window_ms:
+                await asyncio.sleep(self.window_ms / 1000.0)
+            while len(queued) < self.max_batch and not self._queue.empty():
+                queued.append(self._queue.get_nowait())
+
+            # staleness is checked as late as possible: right before compute
+            batch: list[_Job] = []
+            for job in queued:
+                if job.future.done():
+                    continue
+                if not job.is_current():
+                    self._drop(job)
+                    continue
+                batch.append(job)
+            if not batch:
+                continue
+
+            self.stats["batches"] += 1
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, [j.payload for j in batch])
+            except Exception as exc:
+                for job in batch:
+                    if self._jobs.get(job.key) is job:
+                        del self._jobs[job.key]
+                    if not job.future.done():
+                        job.future.set_exception(exc)
+                continue
+
+            for job, result in zip(batch, results):
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+                if not job.future.done():
+                    job.future.set_result(result)
+
+    def shutdown(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._queue = None
+        for job in list(self._jobs.values()):
+            self._drop(job)
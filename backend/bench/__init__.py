@@ -0,0 +1 @@
+"""Benchmarks. Run from backend/, e.g. `python -m bench.persistence`."""
@@ -0,0 +1,78 @@
+"""
+Game-core throughput and rules regression: bots playing through app.engine, no server.
+
+    python -m bench.engine [--hands 200000] [--workers N] [--policies passive,loose,...]
+                           [--stack 1000] [--check] [--seed 1] [--json]
+
+Plays --hands hands split over --workers processes (default: one per core; 1 runs in
+this process) and reports hands per hour, chips won per policy, and the pot and stack
+distributions. With --check every action is checked against engine.invariants() and the
+run exits non-zero if any rule was broken.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from app.engine import POLICIES, run_parallel, simulate
+
+
+def percentiles(counts: dict, points=(50, 90, 99)) -> dict:
+    total = sum(counts.values())
+    out, seen = {}, 0
+    targets = list(points)
+    for value in sorted(counts):
+        seen += counts[value]
+        while targets and seen * 100 >= targets[0] * total:
+            out[f"p{targets.pop(0)}"] = value
+    return out
+
+
+def report(result: dict) -> dict:
+    return {
+        "hands": result["hands"],
+        "actions": result["actions"],
+        "seconds": round(result["seconds"], 3),
+        "handsPerHour": round(result["hands"] / result["seconds"] * 3600) if result["seconds"] else 0,
+        "showdownRate": round(result["showdowns"] / max(1, result["hands"]), 3),
+        "rebuys": result["rebuys"],
+        "wonPerHand": {k: round(v / result["played"][k], 2) for k, v in sorted(result["won"].items())},
+        "pot": percentiles(result["pots"]),
+        "stack": percentiles(result["stacks"]),
+        "violations": result["violations"],
+        "examples": result["examples"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=0, help="processes (0 = one per core)")
+    parser.add_argument("--policies", default="passive,loose,aggressive,loose,passive,aggressive",
+                        help=f"one per seat, from: {', '.join(POLICIES)}")
+    parser.add_argument("--stack", type=int, default=1000)
+    parser.add_argument("--check", action="store_true", help="check rule invariants after every action")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    kwargs = {"policies": args.policies.split(","), "stack": args.stack, "check": args.check}
+    if args.workers == 1:
+        result = simulate(args.hands, seed=args.seed, **kwargs)
+    else:
+        result = run_parallel(args.hands, workers=args.workers or None, seed=args.seed, **kwargs)
+
+    out = report(result)
+    if args.json:
+        print(json.dumps(out))
+    else:
+        for key, value in out.items():
+            print(f"{key:16} {value}")
+    if out["violations"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
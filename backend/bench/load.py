@@ -0,0 +1,430 @@
+"""
+WebSocket load test: synthetic players and spectators driving /ws through the real protocol.
+
+    python -m bench.load [--scenario default] [--tables N] [--players P] [--spectators S]
+                         [--hands H] [--think-ms MS] [--server spawn|inproc|ws://host:port/ws]
+                         [--flush-ms MS] [--encoding json|msgpack] [--json]
+
+Each table gets --players clients (AUTH, JOIN_TABLE, TAKE_SEAT; the first to sit is the
+dealer and sends START_HAND until --hands hands have been played) and --spectators
+clients that only JOIN_TABLE. Players check/call, with the odd bet or fold, as soon as
+a STATE/STATE_DELTA says it is their turn.
+
+Reports action-to-STATE latency (ACTION sent until the acting player sees a newer
+version), messages per second to and from the server, the mean size of the frames
+received (--encoding picks the wire format the clients ask for at AUTH), server CPU per
+hand and server RSS per table (the growth from before the clients connect to after
+every table is seated).
+
+--server spawn (default) starts uvicorn in a subprocess with a throwaway POKER_DATA_DIR;
+inproc runs it on a thread of this process, so CPU then includes the clients; a ws://
+URL targets a running server (pass --pid for CPU/RSS). CPU and RSS need psutil.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Optional
+
+import websockets
+
+from app.wire import unpack
+
+try:  # optional: server CPU and RSS
+    import psutil
+except ImportError:
+    psutil = None
+
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "smoke": {"tables": 2, "players": 3, "spectators": 1, "hands": 5},
+    "default": {"tables": 50, "players": 4, "spectators": 2, "hands": 20},
+    # few tables, big audiences: broadcast fan-out
+    "fanout": {"tables": 4, "players": 6, "spectators": 100, "hands": 20},
+    # many small tables: per-table overhead
+    "tables": {"tables": 400, "players": 2, "spectators": 0, "hands": 5},
+}
+
+BET = 20
+
+
+# Clients ----------------------------
+
+class Client:
+    """One socket. Keeps the table up to date from STATE / STATE_DELTA frames."""
+
+    def __init__(self, run: "Run", name: str, table_id: str):
+        self.run = run
+        self.name = name
+        self.table_id = table_id
+        self.user_id: Optional[str] = None
+        self.table: Optional[Dict[str, Any]] = None
+        self.ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._waiting: Dict[str, asyncio.Future] = {}
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.run.url, max_size=None)
+        self._reader = asyncio.create_task(self._read())
+        auth = await self.request(
+            "AUTH",
+            {"token": f"load-{self.name}", "displayName": self.name, "encoding": self.run.encoding},
+            "AUTH_OK",
+        )
+        self.user_id = auth["userId"]
+        await self.request("JOIN_TABLE", {"tableId": self.table_id}, "STATE")
+
+    async def send(self, msg_type: str, payload: Dict[str, Any]):
+        self.run.sent += 1
+        await self.ws.send(json.dumps({"type": msg_type, "payload": payload}))
+
+    async def request(self, msg_type: str, payload: Dict[str, Any], reply: str) -> Dict[str, Any]:
+        future = self._waiting[reply] = asyncio.get_running_loop().create_future()
+        await self.send(msg_type, payload)
+        return await asyncio.wait_for(future, 30)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                self.run.received += 1
+                self.run.received_bytes += len(raw)
+                # text frames are JSON, binary ones MessagePack
+                msg = json.loads(raw) if isinstance(raw, str) else unpack(raw)
+                msg_type, payload = msg["type"], msg["payload"]
+                if msg_type == "STATE":
+                    self.table = payload["table"]
+                    self.on_state()
+                elif msg_type == "STATE_DELTA":
+                    self.apply_delta(payload)
+                elif msg_type == "ERROR":
+                    self.on_error(payload)
+                future = self._waiting.pop(msg_type, None)
+                if future is not None and not future.done():
+                    future.set_result(payload)
+        except websockets.ConnectionClosed:
+            pass
+
+    def apply_delta(self, delta: Dict[str, Any]):
+        table = self.table
+        if table is None or delta["version"] <= table["version"]:
+            return
+        if delta["fromVersion"] != table["version"]:
+            # missed a frame: ask for the full state
+            self.run.resyncs += 1
+            asyncio.create_task(self.send("RESYNC", {"tableId": self.table_id}))
+            return
+        table.update(delta["set"])
+        for field, patches in delta["items"].items():
+            items = table[field] = list(table[field])
+            for i, patch in patches.items():
+                items[int(i)] = {**items[int(i)], **patch}
+        self.on_state()
+
+    def on_state(self):
+        pass
+
+    def on_error(self, payload: Dict[str, Any]):
+        self.run.errors += 1
+
+
+class Player(Client):
+    def __init__(self, run: "Run", name: str, table_id: str, seat: int, rng: random.Random):
+        super().__init__(run, name, table_id)
+        self.seat = seat
+        self.rng = rng
+        # version the table was at when our ACTION / START_HAND went out
+        self.pending: Optional[int] = None
+        self.timed = False
+        self.sent_at = 0.0
+        self.hands = 0
+        self.done: Optional[asyncio.Event] = None
+
+    def on_state(self):
+        table = self.table
+        if self.pending is not None:
+            if table["version"] <= self.pending:
+                return
+            if self.timed:
+                self.run.latencies.append(time.perf_counter() - self.sent_at)
+            self.pending = None
+        if table["status"] == "IN_HAND":
+            if table["actingSeatIndex"] == self.seat:
+                self.act(table)
+        elif self.done is not None and not self.done.is_set():
+            # the dealer: next hand, or done
+            if table["lastEvent"].get("type") == "HAND_ENDED":
+                self.hands += 1
+            if self.hands >= self.run.hands:
+                self.done.set()
+            else:
+                self.submit("START_HAND", {"tableId": self.table_id})
+
+    def act(self, table: Dict[str, Any]):
+        me = next(p for p in table["playerState"] if p["seatIndex"] == self.seat)
+        owed = table["currentBet"] - me["betThisStreet"]
+        roll = self.rng.random()
+        if owed and roll < 0.05:
+            payload = {"action": "FOLD"}
+        elif roll > 0.9:
+            payload = {"action": "RAISE" if owed else "BET", "amount": owed + BET}
+        else:
+            payload = {"action": "CALL" if owed else "CHECK"}
+        payload["tableId"] = self.table_id
+        self.run.actions += 1
+        self.submit("ACTION", payload)
+
+    def submit(self, msg_type: str, payload: Dict[str, Any]):
+        self.pending = self.table["version"]
+        self.timed = msg_type == "ACTION"
+        self.sent_at = time.perf_counter()
+        asyncio.create_task(self._submit(msg_type, payload))
+
+    async def _submit(self, msg_type: str, payload: Dict[str, Any]):
+        if self.run.think_s:
+            await asyncio.sleep(self.run.think_s)
+            self.sent_at = time.perf_counter()
+        await self.send(msg_type, payload)
+
+    def on_error(self, payload: Dict[str, Any]):
+        super().on_error(payload)
+        # a stale decision (the turn moved on): wait for the next state
+        self.pending = None
+
+
+# Run ----------------------------
+
+class Run:
+    def __init__(self, url: str, hands: int, think_ms: float, encoding: str):
+        self.url = url
+        self.hands = hands
+        self.think_s = think_ms / 1000.0
+        self.encoding = encoding
+        self.sent = 0
+        self.received = 0
+        self.received_bytes = 0
+        self.actions = 0
+        self.errors = 0
+        self.resyncs = 0
+        self.latencies: list[float] = []
+
+
+def percentile(values: list[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class ServerProcess:
+    """CPU seconds and RSS of the server process (None without psutil or a pid)."""
+
+    def __init__(self, pid: Optional[int]):
+        self.proc = psutil.Process(pid) if psutil is not None and pid else None
+
+    def cpu(self) -> Optional[float]:
+        if self.proc is None:
+            return None
+        times = self.proc.cpu_times()
+        return times.user + times.system
+
+    def rss(self) -> Optional[int]:
+        return self.proc.memory_info().rss if self.proc is not None else None
+
+
+async def drive(args, url: str, server: ServerProcess) -> Dict[str, Any]:
+    run = Run(url, args.hands, args.think_ms, args.encoding)
+    rng = random.Random(args.seed)
+    tag = f"{os.getpid()}-{int(time.time())}"
+    rss_before = server.rss()
+
+    players: list[Player] = []
+    clients: list[Client] = []
+    dealers = []
+    for t in range(args.tables):
+        table_id = f"load_{tag}_{t}"
+        seated = [Player(run, f"p{t}_{i}", table_id, i, random.Random(rng.random())) for i in range(args.players)]
+        spectators = [Client(run, f"s{t}_{i}", table_id) for i in range(args.spectators)]
+        await asyncio.gather(*(c.connect() for c in seated + spectators))
+        for p in seated:
+            await p.request("TAKE_SEAT", {"tableId": table_id, "seatIndex": p.seat}, "STATE_DELTA")
+        seated[0].done = asyncio.Event()
+        dealers.append(seated[0])
+        players += seated
+        clients += seated + spectators
+    setup = {"rss": server.rss(), "sent": run.sent, "received": run.received}
+    run.latencies.clear()
+
+    cpu_before = server.cpu()
+    sent_before, received_before, bytes_before = run.sent, run.received, run.received_bytes
+    started = time.perf_counter()
+    for dealer in dealers:
+        dealer.submit("START_HAND", {"tableId": dealer.table_id})
+    try:
+        await asyncio.wait_for(asyncio.gather(*(d.done.wait() for d in dealers)), args.timeout)
+        timed_out = False
+    except asyncio.TimeoutError:
+        timed_out = True
+    elapsed = time.perf_counter() - started
+    cpu_after = server.cpu()
+
+    hands = sum(d.hands for d in dealers)
+    await asyncio.gather(*(c.close() for c in clients))
+
+    latencies_ms = [x * 1000 for x in run.latencies]
+    return {
+        "tables": args.tables,
+        "players": args.players,
+        "spectators": args.spectators,
+        "sockets": len(clients),
+        "hands": hands,
+        "actions": run.actions,
+        "seconds": round(elapsed, 3),
+        "timedOut": timed_out,
+        "handsPerSecond": round(hands / elapsed, 2),
+        "latencyMs": {
+            "p50": _round(percentile(latencies_ms, 50)),
+            "p99": _round(percentile(latencies_ms, 99)),
+            "max": _round(max(latencies_ms, default=None)),
+            "samples": len(latencies_ms),
+        },
+        "messagesPerSecond": {
+            "in": round((run.sent - sent_before) / elapsed),
+            "out": round((run.received - received_before) / elapsed),
+        },
+        "bytesPerFrameOut": (
+            round((run.received_bytes - bytes_before) / (run.received - received_before), 1)
+            if run.received > received_before
+            else None
+        ),
+        "cpuMsPerHand": _round((cpu_after - cpu_before) * 1000 / hands) if cpu_before is not None and hands else None,
+        "rssKbPerTable": (
+            round((setup["rss"] - rss_before) / 1024 / args.tables, 1) if rss_before is not None else None
+        ),
+        "errors": run.errors,
+        "resyncs": run.resyncs,
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+# Servers ----------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_healthy(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def server_stats(url: str) -> Optional[Dict[str, Any]]:
+    http = url.replace("ws://", "http://", 1).rsplit("/ws", 1)[0]
+    try:
+        with urllib.request.urlopen(f"{http}/stats", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="default")
+    parser.add_argument("--tables", type=int, help="override the scenario")
+    parser.add_argument("--players", type=int, help="seated players per table (2-6)")
+    parser.add_argument("--spectators", type=int, help="watchers per table")
+    parser.add_argument("--hands", type=int, help="hands per table")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="delay before each ACTION")
+    parser.add_argument("--server", default="spawn", help="spawn, inproc or a ws:// URL")
+    parser.add_argument("--pid", type=int, help="server pid for CPU/RSS with a ws:// URL")
+    parser.add_argument("--flush-ms", type=float, help="POKER_FLUSH_MS for a spawned/inproc server")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json", help="wire format asked for at AUTH")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+    for key, value in SCENARIOS[args.scenario].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    data_dir = tempfile.mkdtemp(prefix="poker-load-")
+    env = {**os.environ, "POKER_DATA_DIR": data_dir}
+    if args.flush_ms is not None:
+        env["POKER_FLUSH_MS"] = str(args.flush_ms)
+    proc = None
+    uvicorn_server = None
+    try:
+        if args.server == "spawn":
+            port = free_port()
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                env=env,
+            )
+            wait_healthy(port)
+            url, pid = f"ws://127.0.0.1:{port}/ws", proc.pid
+        elif args.server == "inproc":
+            import uvicorn
+
+            # app.main reads its settings at import
+            os.environ.update(env)
+            from app.main import app
+
+            port = free_port()
+            uvicorn_server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+            threading.Thread(target=uvicorn_server.run, daemon=True).start()
+            wait_healthy(port)
+            url, pid = f"ws://127.0.0.1:{port}/ws", os.getpid()
+        else:
+            url, pid = args.server, args.pid
+
+        result = asyncio.run(drive(args, url, ServerProcess(pid)))
+        result["scenario"] = args.scenario
+        result["encoding"] = args.encoding
+        result["server"] = args.server if args.server in ("spawn", "inproc") else "url"
+        result["serverStats"] = server_stats(url)
+    finally:
+        if uvicorn_server is not None:
+            uvicorn_server.should_exit = True
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            if key != "serverStats":
+                print(f"{key:18} {value}")
+
+
+if __name__ == "__main__":
+    main()
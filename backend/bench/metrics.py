@@ -0,0 +1,109 @@
+"""
+Cost of the /metrics instrumentation on the per-action path.
+
+    python -m bench.metrics [--seats 6] [--subscribers 8] [--tables 10000] [--repeat 5] [--json]
+
+Plays check-down hands through apply_action twice: bare, and with what the server
+records around each action (the message-latency observation plus one broadcast's
+encode time and fan-out, i.e. no coalescing). Reports ns per action for both and the
+difference; compare it with cpuMsPerHand from bench.load for the whole server path.
+Also times the per-table byte count each outbox does per frame it sends (next to a
+socket write), and one /metrics render with --tables tables in that counter.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import timeit
+
+from app.game import apply_action, create_deck, start_hand
+from app.engine import new_table
+from app.metrics import SIZE_BUCKETS, Counter, Histogram, Registry
+
+
+def hands(seats: int, subscribers: int, instrumented: bool):
+    """A callable playing one check-down hand, with or without the per-action recording."""
+    table = new_table([1500] * seats)
+    names = [s.displayName for s in table.seats]
+    deck = create_deck()
+    registry = Registry()
+    message = registry.add(Histogram("message_seconds", "", ("type",)))
+    encode = registry.add(Histogram("encode_seconds", ""))
+    fanout = registry.add(Histogram("fanout", "", buckets=SIZE_BUCKETS))
+    perf_counter = time.perf_counter
+
+    def bare():
+        start_hand(table, list(deck), "bench")
+        while table.status == "IN_HAND":
+            seat = table.actingSeatIndex
+            apply_action(table, seat, "CHECK", 0, names[seat])
+
+    def measured():
+        start_hand(table, list(deck), "bench")
+        while table.status == "IN_HAND":
+            seat = table.actingSeatIndex
+            started = perf_counter()
+            apply_action(table, seat, "CHECK", 0, names[seat])
+            encode_started = perf_counter()
+            encode.observe(perf_counter() - encode_started)
+            fanout.observe(subscribers)
+            message.observe(perf_counter() - started, ("ACTION",))
+
+    return measured if instrumented else bare
+
+
+def ns_per_action(fn, actions: int, repeat: int) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number / actions * 1e9
+
+
+def frame_count_ns() -> float:
+    table_bytes: dict = {}
+    return min(timeit.repeat(lambda: table_bytes.__setitem__("t", table_bytes.get("t", 0) + 400), number=100_000, repeat=5)) * 1e4
+
+
+def render_ms(tables: int) -> float:
+    registry = Registry()
+    per_table = {(f"tbl_{i}",): i * 100 for i in range(tables)}
+    registry.add(Counter("table_sent_bytes_total", "", ("table",), fn=lambda: per_table))
+    histogram = registry.add(Histogram("message_seconds", "", ("type",)))
+    for msg_type in ("AUTH", "JOIN_TABLE", "TAKE_SEAT", "START_HAND", "ACTION", "RESYNC"):
+        histogram.observe(0.001, (msg_type,))
+    started = time.perf_counter()
+    registry.render()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", type=int, default=6)
+    parser.add_argument("--subscribers", type=int, default=8, help="frames counted per broadcast")
+    parser.add_argument("--tables", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    actions = args.seats * 4
+    bare = ns_per_action(hands(args.seats, args.subscribers, False), actions, args.repeat)
+    measured = ns_per_action(hands(args.seats, args.subscribers, True), actions, args.repeat)
+    result = {
+        "actionNs": round(bare, 1),
+        "instrumentedActionNs": round(measured, 1),
+        "overheadNs": round(measured - bare, 1),
+        "overheadPct": round((measured - bare) / bare * 100, 1),
+        "perFrameSentNs": round(frame_count_ns(), 1),
+        "renderMs": round(render_ms(args.tables), 2),
+        "tables": args.tables,
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f"{key:22} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Microbenchmarks for the game-core hot paths, compared against a stored baseline.
+
+    python -m bench.micro [--seats 2,6,10] [--only NAME,...] [--repeat 3]
+                          [--baseline bench/baselines/micro.json] [--save] [--fail-above PCT] [--json]
+
+Times each function on a mid-hand table at every --seats size (ns per call, best of
+--repeat runs) and prints the change against the baseline file. `action` is the cost of
+one betting action through apply_action, measured over check-down hands. --save records
+the current numbers as the new baseline; the stored one was taken on a development box,
+so re-record it on the machine you compare on. --fail-above exits non-zero if any
+benchmark got slower by more than PCT percent.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from typing import Any, Callable, Dict, Optional
+
+from app.engine import Action, deal, new_table, step
+from app.game import (
+    TableState,
+    apply_action,
+    betting_round_complete,
+    bump_event,
+    create_deck,
+    find_ps,
+    make_id,
+    next_seat_in_hand,
+    now_iso,
+    shuffle_deck,
+    start_hand,
+)
+
+try:  # optional, the server's encoder when installed
+    import orjson
+except ImportError:
+    orjson = None
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+
+def mid_hand(seats: int) -> TableState:
+    """A preflop table where every seat but the last has checked: the last seat is to act."""
+    table = new_table([1500] * seats)
+    table, _ = step(table, deal(random.Random(seats)))
+    for seat in range(seats - 1):
+        table, _ = step(table, Action("CHECK", seat))
+    return table
+
+
+def check_down(seats: int) -> tuple[Callable[[], None], int]:
+    """A callable playing one whole hand of checks, and the number of actions in it."""
+    table = new_table([1500] * seats)
+    names = [s.displayName for s in table.seats]
+    deck = create_deck()
+
+    def hand():
+        start_hand(table, list(deck), "bench")
+        while table.status == "IN_HAND":
+            seat = table.actingSeatIndex
+            apply_action(table, seat, "CHECK", 0, names[seat])
+
+    return hand, seats * 4
+
+
+# setup(seats) -> (callable, calls per run)
+Setup = Callable[[int], tuple[Callable[[], Any], int]]
+
+
+def _one(fn: Callable[[], Any]) -> tuple[Callable[[], Any], int]:
+    return fn, 1
+
+
+def _state_json(seats: int):
+    public = {"table": mid_hand(seats).to_public()}
+    return _one(lambda: json.dumps({"type": "STATE", "payload": public}))
+
+
+def _state_orjson(seats: int):
+    public = {"table": mid_hand(seats).to_public()}
+    return _one(lambda: orjson.dumps({"type": "STATE", "payload": public}, option=orjson.OPT_NON_STR_KEYS))
+
+
+def _find_ps(seats: int):
+    table = mid_hand(seats)
+    return _one(lambda: find_ps(table, seats - 1))
+
+
+def _next_seat(seats: int):
+    table = mid_hand(seats)
+    return _one(lambda: next_seat_in_hand(table, seats - 1))
+
+
+def _round_complete(seats: int):
+    table = mid_hand(seats)
+    return _one(lambda: betting_round_complete(table))
+
+
+def _bump_event(seats: int):
+    table = mid_hand(seats)
+    return _one(lambda: bump_event(table, "PLAYER_ACTION", "bot0 checked"))
+
+
+# name -> (setup, whether it is timed at each seat count)
+BENCHMARKS: Dict[str, tuple[Setup, bool]] = {
+    "to_public": (lambda seats: _one(mid_hand(seats).to_public), True),
+    "state_json": (_state_json, True),
+    "state_orjson": (_state_orjson, True),
+    "deck": (lambda seats: _one(lambda: shuffle_deck(create_deck())), False),
+    "find_ps": (_find_ps, True),
+    "next_seat_in_hand": (_next_seat, True),
+    "betting_round_complete": (_round_complete, True),
+    "make_id": (lambda seats: _one(lambda: make_id("evt")), False),
+    "now_iso": (lambda seats: _one(now_iso), False),
+    "bump_event": (_bump_event, True),
+    "action": (check_down, True),
+}
+
+
+def measure(fn: Callable[[], Any], calls: int, repeat: int) -> float:
+    """Best ns per call over `repeat` runs of about 0.2s each."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number / calls * 1e9
+
+
+def run(seat_counts: list[int], names: list[str], repeat: int) -> Dict[str, float]:
+    results = {}
+    for name in names:
+        setup, per_seat = BENCHMARKS[name]
+        if name == "state_orjson" and orjson is None:
+            continue
+        for seats in seat_counts if per_seat else [None]:
+            fn, calls = setup(seats or 6)
+            key = name if seats is None else f"{name}/{seats}"
+            results[key] = round(measure(fn, calls, repeat), 1)
+    return results
+
+
+def load_baseline(path: str) -> Optional[Dict[str, float]]:
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", default="2,6,10", help="table sizes")
+    parser.add_argument("--only", help=f"comma-separated, from: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--fail-above", type=float, help="exit 1 if anything is this many percent slower")
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    results = run([int(n) for n in args.seats.split(",")], names, args.repeat)
+    baseline = load_baseline(args.baseline) or {}
+    change = {
+        key: round((ns - baseline[key]) / baseline[key] * 100, 1) for key, ns in results.items() if baseline.get(key)
+    }
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=1, sort_keys=True)
+            f.write("\n")
+
+    if args.json:
+        print(json.dumps({"ns": results, "baseline": baseline, "changePct": change}))
+    else:
+        print(f"{'benchmark':28} {'ns':>10} {'baseline':>10} {'change':>8}")
+        for key, ns in results.items():
+            base = baseline.get(key)
+            pct = f"{change[key]:+.1f}%" if key in change else ""
+            print(f"{key:28} {ns:>10.1f} {base if base is not None else '':>10} {pct:>8}")
+
+    if args.fail_above is not None and any(pct > args.fail_above for pct in change.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
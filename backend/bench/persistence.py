@@ -0,0 +1,177 @@
+"""
+Persistence benchmark: per-action log cost, snapshot cost and restore time.
+
+    python -m bench.persistence [--tables 10000] [--actions 200000] [--tail 50000] [--json]
+
+Builds --tables tables (4 players each) through the same game + history calls the
+server makes, plays --actions betting actions across them, snapshots, plays --tail more
+actions, then restores from snapshot + log tail (and from the full log, for comparison)
+and checks a sample of restored tables against the live ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from app.game import Seat, TableState, apply_action, create_deck, seat_player, start_hand
+from app.history import HandHistory
+from app.persistence import SnapshotStore, Snapshotter, restore
+
+PLAYERS = 4
+# group-commit batch size used to price fsync per action
+BATCH_ACTIONS = 500
+
+
+def build_tables(history: HandHistory, n: int) -> list[TableState]:
+    tables = []
+    for i in range(n):
+        t = TableState(tableId=f"tbl_{i}", name=f"Bench {i}")
+        t.seats = [Seat(seatIndex=j) for j in range(t.maxSeats)]
+        history.table(t)
+        for j in range(PLAYERS):
+            seat_player(t, j, f"usr_{i}_{j}", f"P{j}", 1500)
+            history.seat(t, j)
+        t.dealerUserId = f"usr_{i}_0"
+        history.dealer(t)
+        tables.append(t)
+    return tables
+
+
+def play(history: HandHistory, tables: list[TableState], actions: int, rng: random.Random) -> tuple[float, float]:
+    """Play `actions` actions on random tables. Returns (seconds in game rules, seconds in history appends)."""
+    rules = log = 0.0
+    done = 0
+    while done < actions:
+        t = tables[rng.randrange(len(tables))]
+        seat = t.actingSeatIndex
+        ps = t.seatStates[seat] if t.status == "IN_HAND" and seat is not None else None
+        if ps is None or not ps.can_act:
+            # between hands, or a hand whose turn passed to a seat that can't act: deal again
+            deck = create_deck()
+            rng.shuffle(deck)
+            start_hand(t, list(deck), "P0")
+            history.hand_start(t, deck, "P0")
+            continue
+        if rng.random() < 0.15:
+            action = "FOLD"
+        else:
+            action = "CHECK" if ps.betThisStreet == t.currentBet else "CALL"
+        name = t.seats[seat].displayName
+        t0 = time.perf_counter()
+        apply_action(t, seat, action, 0, name)
+        t1 = time.perf_counter()
+        history.action(t, seat, action, 0, name)
+        t2 = time.perf_counter()
+        rules += t1 - t0
+        log += t2 - t1
+        done += 1
+    return rules, log
+
+
+def fsync_cost(directory: str, rng: random.Random, tables: list[TableState], batches: int = 20) -> float:
+    """Mean seconds per batch to write + fsync BATCH_ACTIONS actions."""
+    history = HandHistory(os.path.join(directory, "fsync"), fsync=True)
+    spent = 0.0
+    for _ in range(batches):
+        play(history, tables, BATCH_ACTIONS, rng)
+        batch = history._take()
+        t0 = time.perf_counter()
+        history._write(batch)
+        spent += time.perf_counter() - t0
+    history.close()
+    return spent / batches
+
+
+def same(a: TableState, b: TableState) -> bool:
+    pa, pb = a.to_public(), b.to_public()
+    # event ids are random and not logged; a replayed createdAt is the TABLE record's time
+    for p in (pa, pb):
+        p["lastEvent"] = dict(p["lastEvent"], eventId=None)
+        p["createdAt"] = None
+    return pa == pb and a.holeCards == b.holeCards and a.deck == b.deck
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    root = tempfile.mkdtemp(prefix="poker-bench-")
+    history_dir = os.path.join(root, "history")
+    snapshot_dir = os.path.join(root, "snapshots")
+    try:
+        history = HandHistory(history_dir)
+        tables = build_tables(history, args.tables)
+        rules, log = play(history, tables, args.actions, rng)
+        await history.flush()
+
+        store = SnapshotStore(snapshot_dir)
+        snapshotter = Snapshotter(store, history, lambda: tables)
+        await snapshotter.snapshot()
+        cold = dict(snapshotter.last)
+        # second snapshot after a little play: only dirty tables are re-encoded
+        play(history, tables, args.tables // 100, rng)
+        await snapshotter.snapshot()
+        warm = dict(snapshotter.last)
+
+        play(history, tables, args.tail, rng)
+        history.close()
+
+        t0 = time.perf_counter()
+        restored = restore(snapshot_dir, history_dir)
+        restore_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        replayed = restore(os.path.join(root, "none"), history_dir)
+        replay_s = time.perf_counter() - t0
+
+        sample = rng.sample(tables, min(200, len(tables)))
+        mismatches = sum(1 for t in sample if not same(t, restored[t.tableId]) or not same(t, replayed[t.tableId]))
+
+        per_batch = fsync_cost(root, rng, tables)
+        return {
+            "tables": args.tables,
+            "actions": args.actions,
+            "tailActions": args.tail,
+            "actionRulesUs": round(rules / args.actions * 1e6, 2),
+            "actionLogUs": round(log / args.actions * 1e6, 2),
+            "fsyncBatchMs": round(per_batch * 1000, 3),
+            "fsyncPerActionUs": round(per_batch / BATCH_ACTIONS * 1e6, 2),
+            "historyBytes": history.stats["bytes"],
+            "snapshotColdCaptureMs": cold["captureMs"],
+            "snapshotColdTotalMs": cold["totalMs"],
+            "snapshotWarmCaptureMs": warm["captureMs"],
+            "snapshotWarmTotalMs": warm["totalMs"],
+            "snapshotBytes": store.stats["bytes"],
+            "restoreMs": round(restore_s * 1000, 1),
+            "fullReplayMs": round(replay_s * 1000, 1),
+            "restoredTables": len(restored),
+            "sampleMismatches": mismatches,
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=10_000)
+    parser.add_argument("--actions", type=int, default=200_000)
+    parser.add_argument("--tail", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f"{key:24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Turn-clock benchmark: one timing wheel vs a call_later handle per turn.
+
+    python -m bench.timers [--tables 50000] [--resets 500000] [--json]
+
+Arms a clock on every table, then resets random tables' clocks (one reset per
+ACTION) and reports the cost per reset, the loop's scheduled-handle count, and the
+cost of the wheel's per-tick sweep while --tables clocks are live.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.game import ACTION_CLOCK_MS
+from app.timers import TICK_MS, TimerWheel
+
+
+def noop(_):
+    pass
+
+
+async def bench_wheel(tables: int, resets: int, rng: random.Random) -> dict:
+    wheel = TimerWheel(noop)
+    keys = [f"tbl_{i}" for i in range(tables)]
+    for key in keys:
+        wheel.set(key, rng.uniform(0, ACTION_CLOCK_MS))
+    picks = [keys[rng.randrange(tables)] for _ in range(resets)]
+
+    t0 = time.perf_counter()
+    for key in picks:
+        wheel.set(key, ACTION_CLOCK_MS)
+    reset_s = time.perf_counter() - t0
+
+    # sweep cost: advance tick by tick across one full clock period with every table armed
+    now = [time.monotonic()]
+    wheel.clock = lambda: now[0]
+    wheel._tick = wheel._now_tick()
+    for key in keys:
+        wheel.set(key, rng.uniform(0, ACTION_CLOCK_MS))
+    ticks = int(ACTION_CLOCK_MS / TICK_MS)
+    expired = 0
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        now[0] += TICK_MS / 1000.0
+        for key in wheel.advance():
+            expired += 1
+            # the expired turn moves to the next player: re-arm
+            wheel.set(key, ACTION_CLOCK_MS)
+    sweep_s = time.perf_counter() - t0
+    return {
+        "resetUs": round(reset_s / resets * 1e6, 3),
+        "tickMs": round(sweep_s / ticks * 1000, 3),
+        "expiredPerTick": round(expired / ticks, 1),
+        "loopHandles": len(asyncio.get_running_loop()._scheduled),
+    }
+
+
+async def bench_call_later(tables: int, resets: int, rng: random.Random) -> dict:
+    loop = asyncio.get_running_loop()
+    keys = [f"tbl_{i}" for i in range(tables)]
+    handles = {key: loop.call_later(rng.uniform(0, ACTION_CLOCK_MS) / 1000.0, noop, key) for key in keys}
+    picks = [keys[rng.randrange(tables)] for _ in range(resets)]
+
+    t0 = time.perf_counter()
+    for key in picks:
+        handles[key].cancel()
+        handles[key] = loop.call_later(ACTION_CLOCK_MS / 1000.0, noop, key)
+    reset_s = time.perf_counter() - t0
+    scheduled = len(loop._scheduled)
+    for handle in handles.values():
+        handle.cancel()
+    return {"resetUs": round(reset_s / resets * 1e6, 3), "loopHandles": scheduled}
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    return {
+        "tables": args.tables,
+        "resets": args.resets,
+        "wheel": await bench_wheel(args.tables, args.resets, rng),
+        "callLater": await bench_call_later(args.tables, args.resets, rng),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=50_000)
+    parser.add_argument("--resets", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for name in ("wheel", "callLater"):
+            for key, value in result[name].items():
+                print(f"{name + '.' + key:24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Frame sizes and encode/decode cost, JSON vs MessagePack (app/wire.py).
+
+    python -m bench.wire [--seats 2,6,10] [--repeat 3] [--json]
+
+For a full STATE, the STATE_DELTA of one CHECK, and HOLE_CARDS at each --seats size:
+bytes on the wire in each encoding, ns to encode the JSON frame (what every broadcast
+pays), ns to pack the same message dict for binary sockets (Frame.packed: paid once per
+broadcast when any subscriber is binary), and ns to decode each form in Python.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+
+from app.cards import ints_to_cards
+from app.engine import Action, step
+from app.protocol import diff_public, dumps, encode_message
+from app.wire import msgpack, pack, unpack
+from bench.micro import mid_hand
+
+try:  # optional, what the server decodes JSON with when installed
+    import orjson
+except ImportError:
+    orjson = None
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def messages(seats: int) -> dict:
+    table = mid_hand(seats)
+    before = table.to_public()
+    table, _ = step(table, Action("CHECK", seats - 1))
+    after = table.to_public()
+    changed, items = diff_public(before, after)
+    hole = ints_to_cards(next(iter(table.holeCards.values())))
+    return {
+        "STATE": ("STATE", {"table": after}),
+        "STATE_DELTA": (
+            "STATE_DELTA",
+            {
+                "tableId": after["tableId"],
+                "fromVersion": before["version"],
+                "version": after["version"],
+                "set": changed,
+                "items": items,
+            },
+        ),
+        "HOLE_CARDS": ("HOLE_CARDS", {"cards": hole}),
+    }
+
+
+def ns(fn, repeat: int) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+
+def run(seat_counts: list[int], repeat: int) -> dict:
+    results = {}
+    for seats in seat_counts:
+        for name, (msg_type, payload) in messages(seats).items():
+            frame = encode_message(msg_type, payload)
+            msg = frame.msg
+            packed = pack(msg)
+            results[f"{name}/{seats}"] = {
+                "jsonBytes": len(frame.text.encode("utf-8")),
+                "msgpackBytes": len(packed),
+                "jsonEncodeNs": round(ns(lambda: dumps({"type": msg_type, "payload": payload}), repeat)),
+                "toMsgpackNs": round(ns(lambda: pack(msg), repeat)),
+                "jsonDecodeNs": round(ns(lambda: loads(frame.text), repeat)),
+                "msgpackDecodeNs": round(ns(lambda: unpack(packed), repeat)),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", default="2,6,10", help="table sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+    if msgpack is None:
+        raise SystemExit("msgpack is not installed")
+
+    results = run([int(n) for n in args.seats.split(",")], args.repeat)
+    if args.json:
+        print(json.dumps(results))
+        return
+    columns = list(next(iter(results.values())))
+    print(f"{'frame':16}" + "".join(f"{c:>16}" for c in columns))
+    for key, row in results.items():
+        print(f"{key:16}" + "".join(f"{row[c]:>16}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
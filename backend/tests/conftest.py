@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# run from anywhere: `python -m pytest backend/tests`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# app.main writes hand history and snapshots under POKER_DATA_DIR as soon as it is imported
+os.environ.setdefault("POKER_DATA_DIR", tempfile.mkdtemp(prefix="poker-tests-"))
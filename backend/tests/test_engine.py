@@ -0,0 +1,48 @@
+import copy
+import random
+
+import pytest
+
+from app.engine import Action, IllegalAction, deal, new_table, step
+
+
+def preflop(seats: int = 3):
+    table, _ = step(new_table([1000] * seats), deal(random.Random(seats)))
+    return table
+
+
+def facing_a_bet():
+    table, _ = step(preflop(), Action("BET", 0, 50))
+    return table
+
+
+@pytest.mark.parametrize(
+    "setup, action",
+    [
+        (preflop, Action("CHECK", 2)),  # not seat 2's turn
+        (preflop, Action("BET", 0, 0)),
+        (preflop, Action("SHOVE", 0)),
+        (preflop, Action("START_HAND", deck=tuple(range(52)))),  # a hand is already running
+        (facing_a_bet, Action("CHECK", 1)),
+    ],
+)
+def test_rejected_action_leaves_the_state_unchanged(setup, action):
+    table = setup()
+    before = copy.deepcopy(table)
+    with pytest.raises(IllegalAction):
+        step(table, action)
+    assert table == before
+    assert table.to_public() == before.to_public()
+
+
+def test_step_returns_a_new_state_and_leaves_the_old_one_alone():
+    table = preflop()
+    before = copy.deepcopy(table)
+    acting = table.actingSeatIndex
+    after, events = step(table, Action("CHECK", acting))
+    assert table == before
+    assert after is not table
+    assert after.version > table.version and after.actingSeatIndex != acting
+    assert [e["type"] for e in events] == ["PLAYER_ACTION"]
+    # the copy's seat index points at its own hand state
+    assert all(after.seatStates[ps.seatIndex] is ps for ps in after.playerState)
@@ -0,0 +1,13 @@
+from app import main
+
+
+def test_table_bytes_label_is_bounded(monkeypatch):
+    monkeypatch.setattr(main, "TABLE_BYTES", {"tbl_1": 100, "tbl_2": 50, "anything": 7, "else": 3})
+
+    assert main.table_bytes() == {("tbl_1",): 100, ("tbl_2",): 50, ("other",): 10}
+    lines = [line for line in main.METRICS.render().splitlines() if line.startswith("poker_table_sent_bytes_total")]
+    assert sorted(lines) == [
+        'poker_table_sent_bytes_total{table="other"} 10',
+        'poker_table_sent_bytes_total{table="tbl_1"} 100',
+        'poker_table_sent_bytes_total{table="tbl_2"} 50',
+    ]
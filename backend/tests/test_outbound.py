@@ -0,0 +1,60 @@
+import asyncio
+
+from app.outbound import Outbox
+from app.protocol import Frame, encode_message
+from app.sharding import Broker, RemoteSocket
+
+
+class RecordingBroker(Broker):
+    def __init__(self):
+        self.sent = []
+
+    async def start(self, node_id, handler):
+        pass
+
+    async def send(self, node_id, message):
+        self.sent.append((node_id, message))
+
+
+class BlockedSocket:
+    """A client that never finishes a send, so everything stays queued."""
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+
+async def idle(proxy, msg):
+    pass
+
+
+def test_remote_socket_relays_table_id_of_state_frames():
+    async def run():
+        broker = RecordingBroker()
+        proxy = RemoteSocket(broker, "n0", "c1", idle)
+        outbox = Outbox(proxy, lambda table_id: None)
+        outbox.start()
+        outbox.put(encode_message("STATE", {"table": {"version": 1}}), "tbl_1")
+        outbox.put(encode_message("HOLE_CARDS", {"cards": ["Ah", "Kd"]}))
+        await asyncio.sleep(0.01)
+        outbox.close()
+        proxy.stop()
+        return broker.sent
+
+    sent = asyncio.run(run())
+    assert [message.get("tableId") for _, message in sent] == ["tbl_1", None]
+    assert all(node == "n0" and message["op"] == "frame" for node, message in sent)
+
+
+def test_relayed_state_frames_conflate_into_one_snapshot():
+    async def run():
+        outbox = Outbox(BlockedSocket(), lambda table_id: None, max_frames=4)
+        outbox.start()
+        for version in range(1, 9):
+            text = encode_message("STATE", {"table": {"version": version}}).text
+            assert outbox.put(Frame(text), "tbl_1")
+        depth = outbox.depth
+        outbox.close()
+        return depth, outbox.dropped
+
+    depth, dropped = asyncio.run(run())
+    assert depth < 4 and dropped > 0
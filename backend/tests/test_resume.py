@@ -0,0 +1,49 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def auth(ws, name):
+    ws.send_json({"type": "AUTH", "payload": {"token": f"t-{name}", "displayName": name}})
+    receive(ws, "AUTH_OK")
+
+
+def receive(ws, msg_type):
+    while True:
+        msg = ws.receive_json()
+        if msg["type"] == msg_type:
+            return msg
+        assert msg["type"] != "ERROR", msg
+
+
+def test_resume_after_every_subscriber_dropped_replays_deltas():
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as a, client.websocket_connect("/ws") as b, client.websocket_connect("/ws") as spectator:
+            for ws, name in ((a, "A"), (b, "B"), (spectator, "S")):
+                auth(ws, name)
+                ws.send_json({"type": "JOIN_TABLE", "payload": {"tableId": "tbl_resume"}})
+                receive(ws, "STATE")
+            a.send_json({"type": "TAKE_SEAT", "payload": {"seatIndex": 0}})
+            b.send_json({"type": "TAKE_SEAT", "payload": {"seatIndex": 1}})
+            time.sleep(0.2)
+            spectator.send_json({"type": "RESYNC", "payload": {}})
+            version = receive(spectator, "STATE")["payload"]["table"]["version"]
+        # everyone left; the PLAYER_DISCONNECTED changes were broadcast to nobody
+        time.sleep(0.3)
+
+        with client.websocket_connect("/ws") as back:
+            auth(back, "S")
+            back.send_json({"type": "RESUME", "payload": {"tableId": "tbl_resume", "version": version}})
+            replayed = []
+            while True:
+                msg = back.receive_json()
+                assert msg["type"] not in ("STATE", "ERROR"), msg
+                if msg["type"] == "RESUMED":
+                    break
+                replayed.append(msg)
+
+    assert msg["payload"]["replayed"] == len(replayed) > 0
+    assert replayed[0]["payload"]["fromVersion"] == version
+    assert all(m["type"] == "STATE_DELTA" for m in replayed)
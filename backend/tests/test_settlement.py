@@ -0,0 +1,86 @@
+from app.cards import cards_to_ints
+from app.game import Seat, TableState, create_deck, seat_player, settle_showdown, start_hand
+from app.settlement import Pot, award, build_pots
+
+
+def table_with(seats: list[int], max_seats: int = 6) -> TableState:
+    table = TableState(tableId="tbl_test", maxSeats=max_seats)
+    table.seats = [Seat(seatIndex=i) for i in range(max_seats)]
+    for seat in seats:
+        seat_player(table, seat, f"usr_{seat}", f"P{seat}", 1000)
+    return table
+
+
+def test_button_moves_to_the_next_seated_player_each_hand():
+    table = table_with([0, 2, 4])
+    buttons = []
+    for _ in range(4):
+        start_hand(table, create_deck(), "P0")
+        buttons.append(table.buttonSeatIndex)
+    assert buttons == [0, 2, 4, 0]
+
+
+def test_odd_chip_of_a_split_pot_goes_left_of_the_button():
+    table = table_with([0, 1, 2])
+    for button, odd_chip_to in ((0, 1), (1, 0)):
+        # unshuffled deck: seat 0 gets As Ac, seat 1 Ad Ah, seat 2 Ks Kc
+        start_hand(table, create_deck(), "P0")
+        assert table.buttonSeatIndex == button
+        table.communityCards = cards_to_ints(["2h", "3d", "5c", "7s", "9h"])
+        for ps in table.playerState:
+            ps.betThisHand = 5
+        table.playerState[2].hasFolded = True
+
+        payouts, _ = settle_showdown(table)
+
+        assert sorted(payouts.values()) == [7, 8]
+        assert payouts[odd_chip_to] == 8
+
+
+# build_pots / award, worked by hand ----------------------------
+
+def test_short_all_in_with_a_folded_caller():
+    # seat 0 all-in for 50, seat 1 put in 100 and folded to seat 2's 300
+    pots = build_pots([(0, 50, False), (1, 100, True), (2, 300, False)])
+    # main: 50 from each; the rest (seat 1's other 50, seat 2's other 250) only seat 2 can win
+    assert pots == [Pot(150, [0, 2]), Pot(300, [2])]
+    assert award(pots, {0: 9, 2: 1}) == {0: 150, 2: 300}
+    assert award(pots, {0: 1, 2: 9}) == {2: 450}
+
+
+def test_three_way_split_with_a_remainder():
+    # seats 1, 3 and 5 each put in 7; seat 0 folded after 2
+    pots = build_pots([(0, 2, True), (1, 7, False), (3, 7, False), (5, 7, False)])
+    assert pots == [Pot(23, [1, 3, 5])]
+    tie = {1: 5, 3: 5, 5: 5}
+    # 23 = 3 * 7 + 2: the two odd chips go to the first winners left of the button
+    assert award(pots, tie, button=3) == {1: 8, 3: 7, 5: 8}
+    assert award(pots, tie, button=5) == {1: 8, 3: 8, 5: 7}
+    # no button: lowest seats first
+    assert award(pots, tie) == {1: 8, 3: 8, 5: 7}
+
+
+def test_uncalled_bet_comes_back():
+    # seat 0 bet 100, seat 1 called all-in for 40
+    pots = build_pots([(0, 100, False), (1, 40, False)])
+    assert pots == [Pot(80, [0, 1]), Pot(60, [0])]
+    assert award(pots, {0: 1, 1: 9}) == {1: 80, 0: 60}
+
+
+def test_side_pots_for_two_all_ins():
+    pots = build_pots([(0, 30, False), (1, 80, False), (2, 200, False), (3, 200, False)])
+    assert pots == [Pot(120, [0, 1, 2, 3]), Pot(150, [1, 2, 3]), Pot(240, [2, 3])]
+    # seat 0 has the best hand, then seat 2
+    assert award(pots, {0: 9, 1: 1, 2: 5, 3: 3}) == {0: 120, 2: 390}
+
+
+def test_folded_chips_above_the_biggest_live_bet_join_the_last_pot():
+    # seat 0 bet 100 then folded to two 40 all-ins
+    pots = build_pots([(0, 100, True), (1, 40, False), (2, 40, False)])
+    assert pots == [Pot(180, [1, 2])]
+
+
+def test_nothing_bet():
+    pots = build_pots([(0, 0, False), (1, 0, True), (2, 0, False)])
+    assert pots == [Pot(0, [0, 2])]
+    assert award(pots, {0: 3, 2: 3}) == {0: 0, 2: 0}
@@ -0,0 +1,22 @@
+import asyncio
+
+from app import main
+
+
+def test_snapshot_of_a_remote_table_asks_its_owner(monkeypatch):
+    forwarded = []
+
+    async def forward_message(ws, msg_type, request_id, payload):
+        forwarded.append((ws, msg_type, payload))
+        return True
+
+    monkeypatch.setattr(main, "forward_message", forward_message)
+    monkeypatch.setattr(main.SHARDS, "is_local", lambda table_id: table_id != "tbl_remote")
+
+    async def run():
+        frame = main.snapshot_frame("ws", "tbl_remote")
+        await asyncio.sleep(0)
+        return frame
+
+    assert asyncio.run(run()) is None
+    assert forwarded == [("ws", "RESYNC", {"tableId": "tbl_remote"})]
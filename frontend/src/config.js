@@ -1,4 +1,6 @@
 export const CONFIG = {
   WS_URL: "ws://localhost:8000/ws",
   DEFAULT_TABLE_ID: "tbl_test",
+  // wire encoding asked for at AUTH: "msgpack" (binary) or "json"
+  ENCODING: "msgpack",
 };
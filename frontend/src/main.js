@@ -10,7 +10,7 @@ function getDevToken() {
 
 import "./style.css";
 import { connectWS, onWSMessage, send } from "./ws";
-import { setState, subscribe, getState, addAction } from "./store";
+import { setState, subscribe, getState, addAction, applyTableDelta, applyLobbyDelta } from "./store";
 import { renderApp } from "./render";
 
 const root = document.querySelector("#app");
@@ -35,14 +35,37 @@ onWSMessage((msg) => {
   if (msg.type === "AUTH_OK") {
     setState({ me: msg.payload });
     addAction(`✓ Authenticated as ${msg.payload.displayName}`);
-    // Request table list after authentication
-    send("LIST_TABLES", {});
+    // Table list now, pushed LOBBY_DELTA updates after
+    send("SUBSCRIBE_LOBBY", {});
+
+    // reconnected while at a table: catch up from the version we have
+    const table = getState().table;
+    if (table) {
+      send("RESUME", { tableId: table.tableId, version: table.version });
+    }
+  }
+
+  if (msg.type === "RESUMED") {
+    if (msg.payload.replayed) {
+      addAction(`↻ Caught up on ${msg.payload.replayed} update(s)`);
+    }
   }
 
   if (msg.type === "TABLES_LIST") {
     setState({ tables: msg.payload.tables, view: "lobby", table: null, myHoleCards: [] });
   }
 
+  if (msg.type === "LOBBY_SNAPSHOT") {
+    setState({ tables: msg.payload.tables, lobbyVersion: msg.payload.lobbyVersion });
+  }
+
+  if (msg.type === "LOBBY_DELTA") {
+    if (!applyLobbyDelta(msg.payload)) {
+      // missed an update: take a fresh snapshot
+      send("SUBSCRIBE_LOBBY", {});
+    }
+  }
+
   if (msg.type === "STATE") {
     setState({ table: msg.payload.table, view: "table" });
     
@@ -55,6 +78,22 @@ onWSMessage((msg) => {
     }
   }
 
+  if (msg.type === "STATE_DELTA") {
+    if (!applyTableDelta(msg.payload)) {
+      // missed an update: ask for a full snapshot
+      send("RESYNC", { tableId: msg.payload.tableId });
+      return;
+    }
+
+    if (msg.payload.set?.status && msg.payload.set.status !== "IN_HAND") {
+      setState({ myHoleCards: [] });
+    }
+
+    if (msg.payload.set?.lastEvent?.summary) {
+      addAction(msg.payload.set.lastEvent.summary);
+    }
+  }
+
   if (msg.type === "HOLE_CARDS") {
     setState({ myHoleCards: msg.payload.cards });
     addAction(`🃏 You were dealt: ${msg.payload.cards.join(", ")}`);
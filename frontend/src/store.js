@@ -1,6 +1,7 @@
 const state = {
   view: "lobby", // 'lobby' or 'table'
   tables: [],
+  lobbyVersion: null,
   table: null,
   me: { userId: null, displayName: null },
   lastMsg: null,
@@ -19,6 +20,43 @@ export function setState(patch) {
   for (const fn of listeners) fn(state);
 }
 
+// Apply a STATE_DELTA payload to state.table.
+// Returns false when the delta does not start from our version (caller should RESYNC).
+export function applyTableDelta(delta) {
+  const table = state.table;
+  if (!table || table.tableId !== delta.tableId) return false;
+  if (delta.version <= table.version) return true; // already covered by a snapshot
+  if (delta.fromVersion !== table.version) return false;
+
+  const next = { ...table, ...delta.set };
+  for (const [field, patches] of Object.entries(delta.items ?? {})) {
+    const list = [...next[field]];
+    for (const [index, patch] of Object.entries(patches)) {
+      list[Number(index)] = { ...list[Number(index)], ...patch };
+    }
+    next[field] = list;
+  }
+
+  setState({ table: next });
+  return true;
+}
+
+// Apply a LOBBY_DELTA payload to state.tables (changed entries replace, new ones append).
+// Returns false when the delta does not start from our lobbyVersion (caller re-subscribes).
+export function applyLobbyDelta(delta) {
+  if (delta.fromVersion !== state.lobbyVersion) return false;
+
+  const tables = [...state.tables];
+  for (const [tableId, entry] of Object.entries(delta.tables)) {
+    const index = tables.findIndex((t) => t.tableId === tableId);
+    if (index === -1) tables.push(entry);
+    else tables[index] = entry;
+  }
+
+  setState({ tables, lobbyVersion: delta.version });
+  return true;
+}
+
 export function subscribe(fn) {
   listeners.add(fn);
   return () => listeners.delete(fn);
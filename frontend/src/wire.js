@@ -0,0 +1,110 @@
+// Binary (MessagePack) frames, see "Wire Encoding" in backend/docs/protocol.md.
+// Field names arrive as their index in KEYS and card lists as one byte per card;
+// decode() turns a frame back into the same message the JSON encoding carries.
+
+// Must match KEYS in backend/app/wire.py (append only).
+const KEYS = [
+  // message
+  "type", "payload", "requestId",
+  // table (TableState)
+  "tableId", "name", "status", "maxSeats", "createdAt", "dealerUserId", "handNumber",
+  "seats", "buttonSeatIndex", "smallBlindSeatIndex", "bigBlindSeatIndex", "street",
+  "communityCards", "pot", "currentBet", "minRaiseTo", "actingSeatIndex",
+  "actionClockMs", "playersInHand", "playerState", "lastEvent", "version",
+  // seats / playerState / lastEvent
+  "seatIndex", "userId", "displayName", "chips", "isConnected", "isSittingOut",
+  "inHand", "hasFolded", "isAllIn", "stack", "betThisStreet", "betThisHand",
+  "actedThisStreet", "eventId", "at", "summary",
+  // STATE / STATE_DELTA / HOLE_CARDS
+  "table", "fromVersion", "set", "items", "cards",
+  // lobby
+  "tables", "total", "offset", "lobbyVersion", "playerCount", "players",
+  // odds
+  "heroSeatIndex", "winPct", "tiePct", "losePct", "mostLikelyWinMethod", "topOutcomes",
+  "hand", "pct", "simulations",
+  // errors / auth
+  "code", "message", "details", "encoding",
+  // RESUMED
+  "replayed",
+];
+const CARD_KEYS = new Set(["communityCards", "cards"]);
+
+// card int = rank * 4 + suit
+const CARD_STRS = [];
+for (const r of "23456789TJQKA") for (const s of "hdcs") CARD_STRS.push(r + s);
+
+const utf8 = new TextDecoder();
+
+export function decode(buffer) {
+  const bytes = new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  function str(n) {
+    const s = utf8.decode(bytes.subarray(pos, pos + n));
+    pos += n;
+    return s;
+  }
+
+  function bin(n) {
+    const b = bytes.subarray(pos, pos + n);
+    pos += n;
+    return b;
+  }
+
+  function array(n) {
+    const out = new Array(n);
+    for (let i = 0; i < n; i++) out[i] = value();
+    return out;
+  }
+
+  function map(n) {
+    const out = {};
+    for (let i = 0; i < n; i++) {
+      let key = value();
+      if (typeof key === "number") key = KEYS[key];
+      const item = value();
+      out[key] = CARD_KEYS.has(key) && item instanceof Uint8Array ? Array.from(item, (c) => CARD_STRS[c]) : item;
+    }
+    return out;
+  }
+
+  function value() {
+    const t = bytes[pos++];
+    if (t < 0x80) return t;
+    if (t < 0x90) return map(t & 0x0f);
+    if (t < 0xa0) return array(t & 0x0f);
+    if (t < 0xc0) return str(t & 0x1f);
+    if (t >= 0xe0) return t - 0x100;
+
+    let v;
+    switch (t) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(bytes[pos++]);
+      case 0xc5: v = view.getUint16(pos); pos += 2; return bin(v);
+      case 0xc6: v = view.getUint32(pos); pos += 4; return bin(v);
+      case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+      case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+      case 0xcc: return bytes[pos++];
+      case 0xcd: v = view.getUint16(pos); pos += 2; return v;
+      case 0xce: v = view.getUint32(pos); pos += 4; return v;
+      case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+      case 0xd0: v = view.getInt8(pos); pos += 1; return v;
+      case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+      case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+      case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+      case 0xd9: return str(bytes[pos++]);
+      case 0xda: v = view.getUint16(pos); pos += 2; return str(v);
+      case 0xdb: v = view.getUint32(pos); pos += 4; return str(v);
+      case 0xdc: v = view.getUint16(pos); pos += 2; return array(v);
+      case 0xdd: v = view.getUint32(pos); pos += 4; return array(v);
+      case 0xde: v = view.getUint16(pos); pos += 2; return map(v);
+      case 0xdf: v = view.getUint32(pos); pos += 4; return map(v);
+      default: throw new Error(`unsupported msgpack type 0x${t.toString(16)}`);
+    }
+  }
+
+  return value();
+}
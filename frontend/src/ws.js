@@ -1,14 +1,22 @@
 import { CONFIG } from "./config";
+import { decode } from "./wire";
 
 let ws = null;
 let onMessageCb = null;
+// reconnect delay, doubled per failed attempt up to RECONNECT_MAX_MS
+const RECONNECT_MIN_MS = 500;
+const RECONNECT_MAX_MS = 10000;
+let reconnectMs = RECONNECT_MIN_MS;
 
 export function connectWS({ displayName, token }) {
   ws = new WebSocket(CONFIG.WS_URL);
+  // binary frames (MessagePack, if the server accepts it at AUTH) as ArrayBuffers
+  ws.binaryType = "arraybuffer";
 
   ws.onopen = () => {
     console.log("[WS] connected");
-    send("AUTH", {token, displayName, }); 
+    reconnectMs = RECONNECT_MIN_MS;
+    send("AUTH", { token, displayName, encoding: CONFIG.ENCODING });
   };
 
   ws.onmessage = async (e) => {
@@ -16,10 +24,10 @@ export function connectWS({ displayName, token }) {
       let data = e.data;
 
       if (data instanceof Blob) {
-        data = await data.text();
+        data = await data.arrayBuffer();
       }
 
-      const msg = typeof data === "string" ? JSON.parse(data) : data;
+      const msg = typeof data === "string" ? JSON.parse(data) : decode(data);
 
       if (onMessageCb) onMessageCb(msg);
     } catch (err) {
@@ -28,7 +36,12 @@ export function connectWS({ displayName, token }) {
   };
 
   ws.onerror = (e) => console.error("[WS] error", e);
-  ws.onclose = () => console.log("[WS] closed");
+  ws.onclose = () => {
+    // AUTH_OK on the new socket resumes the table we were at (main.js)
+    console.log(`[WS] closed, reconnecting in ${reconnectMs}ms`);
+    setTimeout(() => connectWS({ displayName, token }), reconnectMs);
+    reconnectMs = Math.min(reconnectMs * 2, RECONNECT_MAX_MS);
+  };
 }
 
 export function onWSMessage(cb) {